@@ -1,5 +1,14 @@
+import unicodedata
+
 import emoji as emoji_library
-from Emoji.config import emoji2sentiment
+import numpy as np
+from itertools import chain, repeat
+from Emoji.emoji_table import load_emoji_sentiments
+from Text.deepmoji.emoji_sequences import (EMOJI_SEQUENCES, PICTOGRAPHS, emoji_components,
+                                           extract_emojis_and_text)
+
+# Memory-mapped binary table built from config.py, or config.py itself if the table is stale
+emoji2sentiment = load_emoji_sentiments()
 
 # Curated overrides for specific emojis that should always map to a clear
 # negative sentiment. This is a small, conservative list to fix obvious
@@ -15,14 +24,25 @@ EMOJI_OVERRIDES = {
 
 def get_emojis_in_sentence(sentence):
     """
-    Return list of emojis in sentence
+    Return list of emojis in sentence, skin-toned and ZWJ sequences are kept whole
     :param sentence:
     :return: emojis
     """
-    emojis = [c for c in sentence if c in emoji_library.UNICODE_EMOJI]
+    emojis, _ = extract_emojis_and_text(sentence)
     return emojis
 
 
+def _emoji_name(emoji_char):
+    """
+    :param emoji_char: emoji character
+    :return: emoji library name, or the Unicode name for emojis newer than the library
+    """
+    name = emoji_library.demojize(emoji_char)
+    if name == emoji_char and len(emoji_char) == 1:
+        name = unicodedata.name(emoji_char, emoji_char)
+    return name
+
+
 def get_emoji_sentiment_fallback(emoji_char):
     """
     Fallback method to estimate sentiment for unknown emojis
@@ -32,7 +52,7 @@ def get_emoji_sentiment_fallback(emoji_char):
     """
     try:
         # Try to get emoji name from emoji library
-        emoji_name = emoji_library.demojize(emoji_char)
+        emoji_name = _emoji_name(emoji_char)
         
         # Estimate sentiment based on emoji name keywords
         name_lower = emoji_name.lower()
@@ -60,66 +80,220 @@ def get_emoji_sentiment_fallback(emoji_char):
     except:
         return None
 
+def _resolve_emoji_sentiment(emoji):
+    """
+    Final sentiment of a single emoji, as used by get_emoji_sentiments
+    Curated override, then config, then fallback, then the negative keyword override and the
+    conversion of config values to the [-1, 1] range
+    :param emoji: emoji character
+    :return: sentiment score or None if the emoji is ignored
+    """
+    # Curated override takes highest precedence
+    if emoji in EMOJI_OVERRIDES:
+        sentiment = EMOJI_OVERRIDES[emoji]
+    else:
+        # Try to get sentiment from config
+        sentiment = emoji2sentiment.get(emoji)
+
+    # If not found, use fallback method
+    if sentiment is None:
+        sentiment = get_emoji_sentiment_fallback(emoji)
+
+    if sentiment is not None:
+        # Conservative negative override: if emoji name contains
+        # clearly negative keywords, force a negative score.
+        try:
+            name_lower = emoji_library.demojize(emoji).lower()
+            negative_override_keys = [
+                'sad', 'sadness', 'cry', 'crying', 'sob', 'sobbing', 'tear', 'tears',
+                'disappointed', 'unhappy', 'broken', 'weep', 'weeping', 'angry', 'mad', 'frown'
+            ]
+            if any(k in name_lower for k in negative_override_keys):
+                # Strong-ish negative override to ensure negative polarity
+                sentiment = -0.5
+        except Exception:
+            # ignore demojize errors and continue
+            pass
+
+        # The emoji config values are in range [0, 1] (dataset ratio).
+        # Convert values from [0,1] -> [-1,1] to match text model output
+        # while leaving fallback values (which may already be negative)
+        # intact.
+        try:
+            # convert numeric config scores (0..1) to -1..1
+            if isinstance(sentiment, (int, float)) and 0.0 <= sentiment <= 1.0:
+                sentiment = (sentiment * 2) - 1
+        except Exception:
+            # if conversion fails, keep original sentiment
+            pass
+
+    return sentiment
+
+
+def _resolve_sequence_sentiment(sequence, emoji_scores):
+    """
+    Sentiment of an emoji sequence (skin tone, ZWJ, keycap, flag) without a score of its own
+    Average of the scores of the emojis it is built from, skin tones and joiners carry no sentiment
+    :param sequence: emoji sequence
+    :param emoji_scores: final scores of single emojis
+    :return: sentiment score or None if none of its emojis has a score
+    """
+    components = emoji_components(sequence)
+    if not components:
+        # Lone skin tone modifiers, joiners and selectors
+        return None
+    if sequence in EMOJI_OVERRIDES or sequence in emoji2sentiment:
+        return _resolve_emoji_sentiment(sequence)
+    sentiment_list = []
+    for emoji in components:
+        if len(emoji) > 1:
+            sentiment = None
+        elif emoji in emoji_scores or ord(emoji) not in PICTOGRAPHS:
+            sentiment = emoji_scores.get(emoji)
+        else:
+            # Emojis newer than the emoji library
+            sentiment = _resolve_emoji_sentiment(emoji)
+        if sentiment is not None:
+            sentiment_list.append(sentiment)
+    if sentiment_list:
+        return sum(sentiment_list) / len(sentiment_list)
+    return None
+
+
+def build_emoji_score_table():
+    """
+    Resolve the final sentiment of every emoji and emoji sequence known to the emoji library, the
+    config and the overrides once
+    :return: dict of emoji -> sentiment score (None for ignored emojis)
+    """
+    emojis = set(emoji2sentiment) | set(EMOJI_OVERRIDES)
+    emojis.update(emoji for emoji in EMOJI_SEQUENCES if len(emoji) == 1)
+    emoji_scores = {emoji: _resolve_emoji_sentiment(emoji) if emoji_components(emoji) else None
+                    for emoji in emojis}
+    for sequence in EMOJI_SEQUENCES:
+        if len(sequence) > 1:
+            emoji_scores[sequence] = _resolve_sequence_sentiment(sequence, emoji_scores)
+    return emoji_scores
+
+
+# Final score table and its id/array form for batch scoring, built on first use. Call
+# reset_emoji_score_table after changing EMOJI_OVERRIDES or emoji2sentiment at runtime
+_emoji_scores = None
+_emoji_ids = None
+
+
+def get_emoji_score_table():
+    """
+    :return: dict of emoji -> final sentiment score, built on first use
+    """
+    global _emoji_scores
+    if _emoji_scores is None:
+        _emoji_scores = build_emoji_score_table()
+    return _emoji_scores
+
+
+def get_emoji_id_table():
+    """
+    :return: dict of emoji -> id, float array of the score of every id (NaN for ignored emojis),
+             built from the score table on first use
+    """
+    global _emoji_ids
+    if _emoji_ids is None:
+        emoji_scores = get_emoji_score_table()
+        ids = {emoji: i for i, emoji in enumerate(emoji_scores)}
+        scores = np.array([np.nan if score is None else score for score in emoji_scores.values()],
+                          dtype=np.float64)
+        _emoji_ids = ids, scores
+    return _emoji_ids
+
+
+def reset_emoji_score_table():
+    global _emoji_scores, _emoji_ids
+    _emoji_scores = None
+    _emoji_ids = None
+
+
+def _resolve_missing_emoji(emoji, emoji_scores):
+    """
+    Sentiment of an emoji that is not in the score table, resolved per call
+    :param emoji:
+    :param emoji_scores: score table
+    :return: sentiment score or None if the emoji is ignored
+    """
+    if emoji_components(emoji) != [emoji]:
+        return _resolve_sequence_sentiment(emoji, emoji_scores)
+    return _resolve_emoji_sentiment(emoji)
+
+
 def get_emoji_sentiments(emojis_list):
     """
     Get average sentiment of emojis given a list containing lists of emojis from each sentence
     Uses fallback method for unknown emojis
+    Scores are looked up in the precompiled table, emojis missing from it are resolved per call
     :param emojis_list:
     :return: average_sentiment_list
     """
-    sentiment_lists = []
-    
+    emoji_scores = get_emoji_score_table()
+    average_sentiment_list = []
+
     for emoji_list in emojis_list:
         sentiment_list = []
         for emoji in emoji_list:
-            # Curated override takes highest precedence
-            if emoji in EMOJI_OVERRIDES:
-                sentiment = EMOJI_OVERRIDES[emoji]
-            else:
-                # Try to get sentiment from config
-                sentiment = emoji2sentiment.get(emoji)
-
-            # If not found, use fallback method
-            if sentiment is None:
-                sentiment = get_emoji_sentiment_fallback(emoji)
-
+            try:
+                sentiment = emoji_scores[emoji]
+            except KeyError:
+                sentiment = _resolve_missing_emoji(emoji, emoji_scores)
             if sentiment is not None:
-                # Conservative negative override: if emoji name contains
-                # clearly negative keywords, force a negative score.
-                try:
-                    name_lower = emoji_library.demojize(emoji).lower()
-                    negative_override_keys = [
-                        'sad', 'sadness', 'cry', 'crying', 'sob', 'sobbing', 'tear', 'tears',
-                        'disappointed', 'unhappy', 'broken', 'weep', 'weeping', 'angry', 'mad', 'frown'
-                    ]
-                    if any(k in name_lower for k in negative_override_keys):
-                        # Strong-ish negative override to ensure negative polarity
-                        sentiment = -0.5
-                except Exception:
-                    # ignore demojize errors and continue
-                    pass
-
-                # The emoji config values are in range [0, 1] (dataset ratio).
-                # Convert values from [0,1] -> [-1,1] to match text model output
-                # while leaving fallback values (which may already be negative)
-                # intact.
-                try:
-                    # convert numeric config scores (0..1) to -1..1
-                    if isinstance(sentiment, (int, float)) and 0.0 <= sentiment <= 1.0:
-                        sentiment = (sentiment * 2) - 1
-                except Exception:
-                    # if conversion fails, keep original sentiment
-                    pass
-
                 sentiment_list.append(sentiment)
-        
-        sentiment_lists.append(sentiment_list)
 
-    average_sentiment_list = []
-    for sentiment_list in sentiment_lists:
         if sentiment_list:
             average_sentiment_list.append(sum(sentiment_list) / len(sentiment_list))
         else:
             average_sentiment_list.append(None)
 
     return average_sentiment_list
+
+
+def get_emoji_sentiments_batch(emojis_list):
+    """
+    Vectorized get_emoji_sentiments for large batches
+    All emojis of the batch are mapped to table ids in one pass and scored with one array lookup,
+    the per-sentence means are taken over the flattened scores and sentence offsets
+    :param emojis_list: list containing lists of emojis from each sentence
+    :return: float array of average sentiments, NaN where get_emoji_sentiments returns None, the
+             averages match get_emoji_sentiments up to float rounding
+    """
+    emoji_ids, id_scores = get_emoji_id_table()
+    lengths = np.fromiter(map(len, emojis_list), dtype=np.int64, count=len(emojis_list))
+    ids = np.fromiter(list(map(emoji_ids.get, chain.from_iterable(emojis_list), repeat(-1))),
+                      dtype=np.int64, count=lengths.sum())
+
+    missing_positions = np.flatnonzero(ids < 0)
+    if len(missing_positions):
+        # Emojis missing from the table get batch-local ids after the table's
+        emoji_scores = get_emoji_score_table()
+        emojis = list(chain.from_iterable(emojis_list))
+        missing = {}
+        for i in missing_positions:
+            ids[i] = missing.setdefault(emojis[i], len(id_scores) + len(missing))
+        missing_scores = [_resolve_missing_emoji(emoji, emoji_scores) for emoji in missing]
+        id_scores = np.concatenate([id_scores, np.array(
+            [np.nan if score is None else score for score in missing_scores], dtype=np.float64)])
+
+    scores = id_scores[ids]
+    scored = ~np.isnan(scores)
+    scores[~scored] = 0.0
+
+    # Sentences without emojis have no segment in the flattened scores
+    starts = np.cumsum(lengths) - lengths
+    rows = np.flatnonzero(lengths)
+    counts = np.zeros(len(lengths), dtype=np.int64)
+    sums = np.zeros(len(lengths))
+    if len(rows):
+        # reduceat sums floats pairwise, the means can differ from the list API in the last bit
+        counts[rows] = np.add.reduceat(scored.astype(np.int64), starts[rows])
+        sums[rows] = np.add.reduceat(scores, starts[rows])
+
+    averages = np.full(len(lengths), np.nan)
+    np.divide(sums, counts, out=averages, where=counts > 0)
+    return averages
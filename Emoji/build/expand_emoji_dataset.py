@@ -9,6 +9,9 @@ import csv
 import os
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from Emoji.emoji_table import build_emoji_table
+
 def convert_position_to_sentiment(position):
     """
     Convert position (0-1 range) to sentiment score (-1 to +1 range)
@@ -120,12 +123,16 @@ def main():
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(config_code)
     
+    table_path = os.path.splitext(output_path)[0] + '.bin'
+    build_emoji_table(output_path, table_path)
+
     print(f"Generated expanded config file: {output_path}")
+    print(f"Generated binary table: {table_path}")
     print(f"Total emojis: {len(emoji_data)}")
     print("\nTo use the expanded dataset:")
     print("1. Backup the current config.py")
-    print("2. Replace config.py with config_expanded.py")
-    print("   OR merge the new emojis into the existing config.py")
+    print("2. Replace config.py with config_expanded.py and emoji2sentiment.bin with config_expanded.bin")
+    print("   OR merge the new emojis into the existing config.py with merge_emoji_configs.py")
 
 if __name__ == '__main__':
     main()
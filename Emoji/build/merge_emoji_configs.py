@@ -10,6 +10,9 @@ import os
 import sys
 import csv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from Emoji.emoji_table import build_emoji_table, EMOJI_TABLE_PATH
+
 def convert_position_to_sentiment(position):
     """Convert position (0-1) to sentiment score (-1 to +1)"""
     return (float(position) - 0.5) * 2
@@ -186,9 +189,13 @@ def main():
     
     # Merge configs
     merge_configs(existing_config, csv_path, output_path)
+
+    # Binary table loaded at runtime, config.py stays as the fallback
+    count = build_emoji_table(output_path, EMOJI_TABLE_PATH)
     print(f"\nSuccessfully merged emoji datasets!")
     print(f"   Original config backed up to: config.py.backup")
     print(f"   New config saved to: config.py")
+    print(f"   Binary table with {count} emojis saved to: {os.path.basename(EMOJI_TABLE_PATH)}")
 
 if __name__ == '__main__':
     main()
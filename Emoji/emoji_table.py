@@ -0,0 +1,196 @@
+"""
+Binary, memory-mapped emoji sentiment table
+Holds the emoji2sentiment mapping of config.py as a sorted uint32 codepoint array and a float64
+score array behind a small header, so it is mapped instead of compiled or unmarshalled on import
+and its pages are shared by every worker process. config.py stays the source of truth: the table
+stores the CRC32, size and mtime of the config.py it was built from and is ignored if config.py has
+changed since. config.py is only read and hashed when its size or mtime differ from the stored
+ones, e.g. after a checkout, and a matching hash updates the stored mtime so later loads only stat
+it. Only modules that are cheap to import are used here, the point is fast startup.
+
+Usage:
+    python -m Emoji.emoji_table   # rebuild the table from config.py
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from bisect import bisect_left
+
+EMOJI_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(EMOJI_DIR, 'config.py')
+EMOJI_TABLE_PATH = os.path.join(EMOJI_DIR, 'emoji2sentiment.bin')
+
+TABLE_MAGIC = b'EMOJISNT'
+TABLE_VERSION = 2
+# magic, version, count, CRC32 and size of config.py, mtime of config.py in ns
+HEADER = struct.Struct('<8sIIIIq')
+MTIME_OFFSET = HEADER.size - 8
+
+
+def config_hash(config_path=CONFIG_PATH):
+    """
+    :param config_path:
+    :return: (CRC32, size) of the config file
+    """
+    with open(config_path, 'rb') as f:
+        content = f.read()
+    return zlib.crc32(content), len(content)
+
+
+def config_stamp(config_path=CONFIG_PATH):
+    """
+    :param config_path:
+    :return: (size, mtime in ns) of the config file
+    """
+    stat = os.stat(config_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class EmojiSentimentTable:
+    """
+    Read-only emoji -> score mapping over the binary table, lookups are a binary search
+    Supports the read-only dict interface used for emoji2sentiment
+    """
+
+    def __init__(self, buffer):
+        """
+        :param buffer: bytes-like table contents, e.g. an mmap
+        """
+        magic, version, count, source_crc, source_size, source_mtime = HEADER.unpack_from(buffer)
+        self.source_hash = (source_crc, source_size)
+        self.source_stamp = (source_size, source_mtime)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError('Not an emoji sentiment table (version {})'.format(TABLE_VERSION))
+        scores_offset = HEADER.size + (4 * count + 7) // 8 * 8
+        view = memoryview(buffer)
+        self.buffer = buffer
+        self.codepoints = view[HEADER.size:HEADER.size + 4 * count].cast('I')
+        self.scores = view[scores_offset:scores_offset + 8 * count].cast('d')
+
+    def _index(self, emoji):
+        if not isinstance(emoji, str) or len(emoji) != 1:
+            return -1
+        codepoint = ord(emoji)
+        i = bisect_left(self.codepoints, codepoint)
+        if i < len(self.codepoints) and self.codepoints[i] == codepoint:
+            return i
+        return -1
+
+    def __getitem__(self, emoji):
+        i = self._index(emoji)
+        if i < 0:
+            raise KeyError(emoji)
+        return self.scores[i]
+
+    def get(self, emoji, default=None):
+        i = self._index(emoji)
+        return self.scores[i] if i >= 0 else default
+
+    def __contains__(self, emoji):
+        return self._index(emoji) >= 0
+
+    def __iter__(self):
+        return (chr(codepoint) for codepoint in self.codepoints)
+
+    def __len__(self):
+        return len(self.codepoints)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return list(self.scores)
+
+    def items(self):
+        return list(zip(self, self.scores))
+
+
+def write_emoji_table(emoji2sentiment, path=EMOJI_TABLE_PATH, source_hash=(0, 0), source_mtime=0):
+    """
+    Write the binary table
+    :param emoji2sentiment: dict of single-codepoint emoji -> score
+    :param path:
+    :param source_hash: config_hash() of the config.py the mapping was read from
+    :param source_mtime: mtime in ns of that config.py
+    """
+    invalid = [emoji for emoji in emoji2sentiment if len(emoji) != 1]
+    if invalid:
+        raise ValueError('Only single-codepoint emojis are supported, got {}'.format(invalid[:5]))
+
+    items = sorted((ord(emoji), float(score)) for emoji, score in emoji2sentiment.items())
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(items), *source_hash, source_mtime))
+        f.write(struct.pack('<{}I'.format(len(items)), *[codepoint for codepoint, _ in items]))
+        f.write(b'\0' * ((-4 * len(items)) % 8))
+        f.write(struct.pack('<{}d'.format(len(items)), *[score for _, score in items]))
+
+
+def build_emoji_table(config_path=CONFIG_PATH, path=EMOJI_TABLE_PATH):
+    """
+    Write the binary table for a config.py, reading the scores exactly as importing it would
+    :param config_path:
+    :param path:
+    :return: number of emojis written
+    """
+    import runpy
+    emoji2sentiment = runpy.run_path(config_path)['emoji2sentiment']
+    write_emoji_table(emoji2sentiment, path, source_hash=config_hash(config_path),
+                      source_mtime=config_stamp(config_path)[1])
+    return len(emoji2sentiment)
+
+
+def _is_fresh(table, path, config_path):
+    """
+    :return: whether the table was built from the current config.py, hashing it only if its size
+             or mtime changed
+    """
+    stamp = config_stamp(config_path)
+    if stamp == table.source_stamp:
+        return True
+    if table.source_hash != config_hash(config_path):
+        return False
+    # Same content with a new mtime, store it so the next load skips the hash
+    try:
+        with open(path, 'r+b') as f:
+            f.seek(MTIME_OFFSET)
+            f.write(struct.pack('<q', stamp[1]))
+    except OSError:
+        pass
+    return True
+
+
+def load_emoji_table(path=EMOJI_TABLE_PATH, config_path=CONFIG_PATH):
+    """
+    Memory-map the binary table
+    :param path:
+    :param config_path: the table is rejected if this file no longer matches the table
+    :return: EmojiSentimentTable, or None if the table is missing, invalid or stale
+    """
+    if sys.byteorder != 'little' or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            table = EmojiSentimentTable(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError, struct.error, TypeError):
+        return None
+    if os.path.exists(config_path) and not _is_fresh(table, path, config_path):
+        return None
+    return table
+
+
+def load_emoji_sentiments():
+    """
+    :return: emoji -> score mapping from the binary table, or the config.py dict as fallback
+    """
+    table = load_emoji_table()
+    if table is not None:
+        return table
+    from Emoji.config import emoji2sentiment
+    return emoji2sentiment
+
+
+if __name__ == '__main__':
+    count = build_emoji_table()
+    print(f"Wrote {count} emojis to {EMOJI_TABLE_PATH}")
@@ -12,6 +12,14 @@ from math import floor
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+IMAGE_MODEL_PATH = 'Image/c3d_sentiment.hdf5'
+
+# Frozen inference-only model written by freeze_models.py, memory-mapped at load
+FROZEN_IMAGE_MODEL_PATH = 'Image/c3d_sentiment.frozen'
+
+# Output semantics stored in the frozen artifact
+IMAGE_OUTPUTS = ['positive', 'negative']
+
 
 def load_gif_data(file_path):
     """
@@ -51,14 +59,39 @@ def load_gif_data(file_path):
     return np.array(np_frames)
 
 
-def load_c3d_sentiment_model():
+def load_c3d_sentiment_model(quantization=None, frozen=True):
     """
     Load saved Keras model
+    Prefers the frozen artifact written by freeze_models.py
     Falls back to None if model file is missing
-    :return: Keras model or None
+    :param quantization: 'float16' or 'int8' to load the weights written by quantize_models.py instead
+    :param frozen: use the frozen artifact if present
+    :return: Keras model or None, its source_paths attribute lists the files it was loaded from
     """
     import os
-    model_path = 'Image/c3d_sentiment.hdf5'
+    model_path = IMAGE_MODEL_PATH
+
+    if quantization is not None:
+        from deepmoji.quantization import quantized_path, load_quantized_keras_model
+        quantized_model_path = quantized_path(model_path, quantization)
+        if os.path.exists(quantized_model_path):
+            model = load_quantized_keras_model(quantized_model_path)
+            model.source_paths = [quantized_model_path]
+            return model
+        print(f"Warning: Quantized image model not found at {quantized_model_path}, "
+              "run quantize_models.py; loading the unquantized model instead")
+
+    if frozen and os.path.exists(FROZEN_IMAGE_MODEL_PATH):
+        from deepmoji.frozen import load_frozen_keras_model, read_frozen_metadata, stale_sources
+        try:
+            metadata = read_frozen_metadata(FROZEN_IMAGE_MODEL_PATH)
+            if 'sources' not in metadata or stale_sources(metadata):
+                raise ValueError(f"{FROZEN_IMAGE_MODEL_PATH} is older than {model_path}, re-run freeze_models.py")
+            model, _ = load_frozen_keras_model(FROZEN_IMAGE_MODEL_PATH)
+            model.source_paths = [FROZEN_IMAGE_MODEL_PATH]
+            return model
+        except Exception as e:
+            print(f"Warning: Could not load frozen image model: {e}")
     
     if not os.path.exists(model_path):
         print("=" * 60)
@@ -74,6 +107,7 @@ def load_c3d_sentiment_model():
         return None
     
     model = load_model(model_path)
+    model.source_paths = [model_path]
     return model
 
 
@@ -102,19 +136,41 @@ def download_gifs(image_urls, path):
     return sorted_gif_paths
 
 
-def get_gifs_sentiment(gif_paths, model):
+def load_gifs(gif_paths):
     """
-    Get sentiment score for gif using Keras model
+    Load and process gifs for input into the C3D model
     :param gif_paths: list of gif filepaths
+    :return: numpy array of mean normalised 16-frame clips
+    """
+    return np.array([load_gif_data(gif_path) for gif_path in gif_paths])
+
+
+def predict_gifs_sentiment(images, model):
+    """
+    Get sentiment scores for gifs already loaded with load_gifs
+    :param images: numpy array returned by load_gifs
     :param model: C3D sentiment model (can be None)
     :return: sentiment score in range -1, 1 | (very negative, very positive)
     """
     if model is None:
         # Return neutral scores if model is not available
-        return [0.0] * len(gif_paths)
-    
-    images = np.array([load_gif_data(gif_path) for gif_path in gif_paths])
+        return [0.0] * len(images)
+
     predictions = model.predict(images)
     sentiment_scores = [(prediction[0] - prediction[1]) for prediction in predictions]
     # prediction[0] - prediction[1] | positive probability - negative probability
     return sentiment_scores
+
+
+def get_gifs_sentiment(gif_paths, model):
+    """
+    Get sentiment score for gif using Keras model
+    :param gif_paths: list of gif filepaths
+    :param model: C3D sentiment model (can be None)
+    :return: sentiment score in range -1, 1 | (very negative, very positive)
+    """
+    if model is None:
+        # Return neutral scores if model is not available
+        return [0.0] * len(gif_paths)
+    
+    return predict_gifs_sentiment(load_gifs(gif_paths), model)
@@ -1,21 +1,67 @@
-from Image.ImageSentiment import load_c3d_sentiment_model, get_gifs_sentiment, download_gifs
-from Text.sentiment.TextSentiment import load_finetuned_models, get_texts_sentiment
-from Emoji.EmojiSentiment import get_emoji_sentiments, get_emojis_in_sentence
+# The image and text modules pull in Keras/Tensorflow, imgpy and PIL, they are imported when
+# their modality is first used so emoji-only callers start without them
+from Emoji.EmojiSentiment import extract_emojis_and_text, get_emoji_sentiments, get_emoji_sentiments_batch
+from SentimentCache import models_fingerprint
+from SmoothingRules import get_smoothing_rules
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import queue
 import re
+import shutil
+import tempfile
+import threading
+import time
 
 # Global weight for combining emoji and text sentiment. Tweak to prefer emoji or text.
 # Recommended value found by search: 0.2 (trust text more than emoji for this eval set)
 EMOJI_WEIGHT = 0.2
 
+# Number of inference inputs skipped by batch-level deduplication, per modality
+DEDUP_SAVED = {'emoji': 0, 'image': 0, 'text': 0}
 
-def load_models():
+# Number of images not downloaded or scored because the row already had an emoji or text score
+IMAGE_STATS = {'skipped': 0}
+
+# Guards the counters above and the executor creation, get_sentiments may run on several threads at once
+_stats_lock = threading.Lock()
+
+# Batches with at least this many emoji lists are scored with the vectorized batch mode, for
+# smaller batches the fixed NumPy overhead outweighs the per-emoji savings. Measured with 1-6
+# emojis per message: 0.75x at 100 lists, 1.05x at 300, 1.2x at 1000 and 1.3-1.5x from 3000
+EMOJI_BATCH_MIN_SIZE = 1000
+
+# Thread pool for running the emoji and image download/decode stages next to text inference
+_executor = None
+
+# Modalities that can be enabled in load_models
+MODALITIES = ('emoji', 'text', 'image')
+
+
+def load_models(modalities=MODALITIES, quantization=None, frozen=True):
     """
     Load required Keras models
-    :return: image_model, text_model_ensemble
+    Only the modules of the enabled modalities are imported, so e.g. an emoji-only setup does not
+    need Keras/Tensorflow. Emoji scoring needs no model and is always available, the text rules
+    of the post-processing smoothing still run without the text model.
+    :param modalities: modalities to enable, any of MODALITIES
+    :param quantization: 'float16' or 'int8' to load the models quantized by quantize_models.py
+    :param frozen: prefer the frozen inference-only artifacts written by freeze_models.py
+    :return: image_model, text_model_ensemble (None for disabled modalities)
     """
+    unknown = set(modalities) - set(MODALITIES)
+    if unknown:
+        raise ValueError(f"Unknown modalities {sorted(unknown)}, expected any of {MODALITIES}")
+
     print("Loading models...")
-    image_model = load_c3d_sentiment_model()
-    text_model_ensemble = load_finetuned_models()
+    get_smoothing_rules()
+    image_model = None
+    text_model_ensemble = None
+    if 'image' in modalities:
+        from Image.ImageSentiment import load_c3d_sentiment_model
+        image_model = load_c3d_sentiment_model(quantization, frozen=frozen)
+    if 'text' in modalities:
+        from Text.sentiment.TextSentiment import load_finetuned_models
+        text_model_ensemble = load_finetuned_models(quantization, frozen=frozen)
     print("Finished loading models!\n")
     return image_model, text_model_ensemble
 
@@ -32,15 +78,11 @@ def parse_media(sentences):
 
     for sentence in sentences:
         # Parse media from sentence
-        emojis = get_emojis_in_sentence(sentence)
+        emojis, text = extract_emojis_and_text(sentence)
         image_tags = re.search(r'<img>(.*)<\/img>', sentence)
-        text = sentence
 
         if emojis:
             emojis_list.append(emojis)
-            for emoji in emojis:
-                sentence = sentence.replace(emoji, "")
-            text = sentence
         else:
             emojis_list.append(None)
 
@@ -103,133 +145,364 @@ def calculate_scores(emojis_list, images_list, texts_list):
     return sentiment_scores
 
 
-def _has_positive_emoji(emoji_tokens):
-    """Heuristic: does the emoji token list contain clearly positive emojis?"""
-    if not emoji_tokens:
-        return False
-    positive = set(list("😁😀😊🙂😃😄😆😎😍🤗👍🎉❤️💕💖✨🥳😺😸"))
-    try:
-        # Handle both list of emojis and single emoji string
-        if isinstance(emoji_tokens, str):
-            emoji_tokens = [emoji_tokens]
-        return any((e in positive) for e in emoji_tokens)
-    except Exception:
-        return False
-
-
-def _has_sad_keywords(text):
-    """Detect if text contains strong negative/sad keywords"""
-    if not text:
-        return False
-    # Match sad keywords (without negation)
-    pattern = re.compile(r"\b(sad|depressed|upset|miserable|unhappy|crying|devastated|heartbroken|awful|terrible|horrible)\b",
-                         re.IGNORECASE)
-    return bool(pattern.search(text))
-
-
-def _has_soft_negation(text):
-    """Detect patterns like 'not (that|so|really) sad|upset|angry|depressed|unhappy|down|bad'"""
-    if not text:
-        return False
-    # Widened pattern: allow optional modifiers and match negative keywords anywhere in phrase
-    pattern = re.compile(r"\bnot\s+(?:that\s+|so\s+|really\s+|very\s+|too\s+)?(sad|upset|depressed|angry|mad|unhappy|down|bad)",
-                         re.IGNORECASE)
-    return bool(pattern.search(text))
-
-
 def _postprocess_smoothing(initial_scores, original_texts, original_emojis):
     """Apply light post-processing: handle emoji-text conflicts and soft negation.
-    
-    Rules:
+
+    Rules (see smoothing_rules.json):
     1. If happy emoji + sad text (conflicting sentiment) → neutral
     2. If moderate negative + soft negation + positive emoji → pull toward neutral
-    
-    This reduces false negatives on ambiguous inputs.
+
+    This reduces false negatives on ambiguous inputs. The rules are compiled once by
+    SmoothingRules, which only evaluates the matchers needed to decide each message.
     """
     if not initial_scores:
         return initial_scores
 
+    rules = get_smoothing_rules()
     smoothed = list(initial_scores)
     for i, score in enumerate(initial_scores):
+        if score is None:
+            continue
+        text = original_texts[i] if i < len(original_texts) else None
+        emojis = original_emojis[i] if i < len(original_emojis) else None
         try:
-            if score is None:
-                continue
-                
-            text = original_texts[i] if i < len(original_texts) else None
-            emojis = original_emojis[i] if i < len(original_emojis) else None
-            
-            has_pos_emoji = _has_positive_emoji(emojis)
-            has_sad_text = _has_sad_keywords(text)
-            has_negation = _has_soft_negation(text)
-            
-            # Rule 1: Emoji-text conflict (happy emoji + sad text without negation) → neutral
-            if has_pos_emoji and has_sad_text and not has_negation:
-                smoothed[i] = 0.0
-                continue
-            
-            # Rule 2: Soft negation smoothing (moderate negative + negation + positive emoji)
-            if -0.6 < score < -0.05:
-                if has_negation and has_pos_emoji:
-                    # Pull toward neutral: shrink magnitude and add a small positive bias
-                    adjusted = (score * 0.4) + 0.1
-                    # Clamp to [-1, 1]
-                    adjusted = max(-1.0, min(1.0, adjusted))
-                    smoothed[i] = adjusted
+            smoothed[i] = rules.smooth(score, text, emojis)
         except Exception:
             # On any unexpected issue, keep original score
             pass
     return smoothed
 
 
-def get_sentiments(sentences, image_model, text_model_ensemble):
+def _deduplicate(items, modality, key=None):
+    """
+    Drop repeated entries before inference and count the saved inference inputs
+    :param items: list of entries
+    :param modality: key of DEDUP_SAVED to update
+    :param key: function making an entry hashable
+    :return: unique_items, inverse (index into unique_items for each entry)
+    """
+    positions = {}
+    unique_items = []
+    inverse = []
+    for item in items:
+        item_key = key(item) if key is not None else item
+        if item_key not in positions:
+            positions[item_key] = len(unique_items)
+            unique_items.append(item)
+        inverse.append(positions[item_key])
+    with _stats_lock:
+        DEDUP_SAVED[modality] += len(items) - len(unique_items)
+    return unique_items, inverse
+
+
+def _scatter(unique_scores, inverse):
     """
+    Map scores of unique entries back to every original entry
+    Stops at the first entry without a score (e.g. image model unavailable), like the
+    replacement loops that consume the result
+    """
+    scores = []
+    for i in inverse:
+        if i >= len(unique_scores):
+            break
+        scores.append(unique_scores[i])
+    return scores
 
-    :param sentences:
+
+def _get_executor():
+    global _executor
+    with _stats_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='modality')
+    return _executor
+
+
+def _load_images(image_urls, image_model):
+    """
+    Download and decode gifs
+    :param image_urls: list of unique image urls
+    :param image_model: images are skipped if the model is unavailable
+    :return: dict of url -> decoded clip
+    """
+    if not image_urls or image_model is None:
+        return {}
+    from Image.ImageSentiment import download_gifs, load_gifs
+    # download_gifs empties its folder, so concurrent calls (threads or pool workers) each get their own
+    download_path = tempfile.mkdtemp(prefix='downloads-')
+    try:
+        image_paths = download_gifs(image_urls, path=download_path)
+        if not image_paths:
+            return {}
+        return dict(zip(image_urls, load_gifs(image_paths)))
+    finally:
+        shutil.rmtree(download_path, ignore_errors=True)
+
+
+def _score_emojis(emojis_list):
+    """
+    Score emoji lists, large batches with the vectorized batch mode
+    :param emojis_list: list of unique emoji lists
+    :return: emoji sentiment scores, None for lists without a scored emoji
+    """
+    if len(emojis_list) < EMOJI_BATCH_MIN_SIZE:
+        return get_emoji_sentiments(emojis_list)
+    averages = get_emoji_sentiments_batch(emojis_list)
+    scores = averages.tolist()
+    for i in np.flatnonzero(np.isnan(averages)):
+        scores[i] = None
+    return scores
+
+
+def _score_texts(texts, text_model_ensemble):
+    """
+    Score texts with the text ensemble
+    :param texts: list of unique texts
+    :param text_model_ensemble: texts are skipped if the text modality is disabled
+    :return: text sentiment scores
+    """
+    if not texts or text_model_ensemble is None:
+        return []
+    from Text.sentiment.TextSentiment import get_texts_sentiment
+    return get_texts_sentiment(texts, text_model_ensemble)
+
+
+def _score_images(image_urls, image_model, loaded_images):
+    """
+    Score images with C3D, downloading any that were not loaded in advance
+    :param image_urls: list of unique image urls
     :param image_model:
-    :param text_model_ensemble:
-    :return:
+    :param loaded_images: dict of url -> decoded clip
+    :return: image sentiment scores
+    """
+    if not image_urls or image_model is None:
+        return []
+    missing_urls = [url for url in image_urls if url not in loaded_images]
+    if missing_urls:
+        loaded_images = dict(loaded_images)
+        loaded_images.update(_load_images(missing_urls, image_model))
+    if any(url not in loaded_images for url in image_urls):
+        return []
+    from Image.ImageSentiment import predict_gifs_sentiment
+    images = np.array([loaded_images[url] for url in image_urls])
+    return predict_gifs_sentiment(images, image_model)
+
+
+def score_components(sentences, image_model, text_model_ensemble, score_all_images=False, concurrent=False):
+    """
+    Run every modality on the sentences and fuse the results
+    Emoji and text are scored first, images only for rows still lacking a score
+    :param sentences: list of sentences
+    :param image_model: None disables image scoring
+    :param text_model_ensemble: None disables text scoring
+    :param score_all_images: score every image even if it is not used, e.g. for analytics
+    :param concurrent: run the emoji stage and the image download/decode stage on a thread pool
+                       while the text model runs
+    :return: final_scores, emoji_scores, image_scores, text_scores
     """
     emojis_list, images_list, texts_list = parse_media(sentences)
 
-    # Preserve originals for post-processing rules (deep copy to avoid overwrite)
-    import copy
-    original_emojis = copy.deepcopy(emojis_list)
-    original_texts = copy.deepcopy(texts_list)
+    # Preserve originals for post-processing rules, entries are replaced rather than
+    # mutated so a shallow copy is enough
+    original_emojis = list(emojis_list)
+    original_texts = list(texts_list)
+
+    if text_model_ensemble is None:
+        texts_list = [None] * len(texts_list)
 
     # get indexes of entries that are not None
     emojis_indexes = [i for i in range(len(emojis_list)) if emojis_list[i] is not None]
-    images_indexes = [i for i in range(len(images_list)) if images_list[i] is not None]
     texts_indexes = [i for i in range(len(texts_list)) if texts_list[i] is not None]
 
     # get entries that are not None
     clean_emojis_list = [emojis_list[i] for i in emojis_indexes]
-    clean_images_list = [images_list[i] for i in images_indexes]
     clean_texts_list = [texts_list[i] for i in texts_indexes]
 
-    # get sentiment for entries
-    clean_emojis_sentiment = get_emoji_sentiments(clean_emojis_list)
-    if clean_images_list and image_model is not None:
-        image_paths = download_gifs(clean_images_list, path="downloads")
-        if image_paths:
-            clean_images_sentiment = get_gifs_sentiment(image_paths, image_model)
-        else:
-            clean_images_sentiment = []
+    # get sentiment for entries, duplicates within the batch are scored once
+    unique_emojis, emojis_inverse = _deduplicate(clean_emojis_list, 'emoji', key=tuple)
+    unique_texts, texts_inverse = _deduplicate(clean_texts_list, 'text')
+
+    if concurrent:
+        # Every parsed text gets a score, so rows that will need their image are known up front.
+        # Keras models stay on this thread, only downloading, decoding and emoji lookup move off it
+        prefetch_urls = list(dict.fromkeys(
+            images_list[i] for i in range(len(images_list)) if images_list[i] is not None and
+            (score_all_images or (emojis_list[i] is None and texts_list[i] is None))))
+        executor = _get_executor()
+        emojis_future = executor.submit(_score_emojis, unique_emojis)
+        images_future = executor.submit(_load_images, prefetch_urls, image_model)
+        unique_texts_sentiment = _score_texts(unique_texts, text_model_ensemble)
+        unique_emojis_sentiment = emojis_future.result()
+        loaded_images = images_future.result()
     else:
-        clean_images_sentiment = []
-    clean_texts_sentiment = get_texts_sentiment(clean_texts_list, text_model_ensemble)
+        unique_emojis_sentiment = _score_emojis(unique_emojis)
+        unique_texts_sentiment = _score_texts(unique_texts, text_model_ensemble)
+        loaded_images = {}
+
+    clean_emojis_sentiment = _scatter(unique_emojis_sentiment, emojis_inverse)
+    clean_texts_sentiment = _scatter(unique_texts_sentiment, texts_inverse)
 
     # replace entries with sentiment scores
     for i in range(len(clean_emojis_sentiment)):
         emojis_list[emojis_indexes[i]] = clean_emojis_sentiment[i]
 
-    for i in range(len(clean_images_sentiment)):
-        images_list[images_indexes[i]] = clean_images_sentiment[i]
-
     for i in range(len(clean_texts_sentiment)):
         texts_list[texts_indexes[i]] = clean_texts_sentiment[i]
 
+    # Image scores are only used for rows without emoji and text scores, so only those
+    # images are downloaded and run through C3D unless all of them are requested
+    images_indexes = [i for i in range(len(images_list)) if images_list[i] is not None and
+                      (score_all_images or (emojis_list[i] is None and texts_list[i] is None))]
+    clean_images_list = [images_list[i] for i in images_indexes]
+    with _stats_lock:
+        IMAGE_STATS['skipped'] += sum(url is not None for url in images_list) - len(images_indexes)
+    images_list = [None] * len(images_list)
+
+    unique_images, images_inverse = _deduplicate(clean_images_list, 'image')
+    unique_images_sentiment = _score_images(unique_images, image_model, loaded_images)
+    clean_images_sentiment = _scatter(unique_images_sentiment, images_inverse)
+
+    for i in range(len(clean_images_sentiment)):
+        images_list[images_indexes[i]] = clean_images_sentiment[i]
+
     initial_scores = calculate_scores(emojis_list, images_list, texts_list)
 
     # Apply light rule-based smoothing for soft negation + positive emoji cases
     final_scores = _postprocess_smoothing(initial_scores, original_texts, original_emojis)
-    return final_scores
+    return final_scores, emojis_list, images_list, texts_list
+
+
+def get_sentiments(sentences, image_model, text_model_ensemble, cache=None, score_all_images=False,
+                   concurrent=False):
+    """
+
+    :param sentences:
+    :param image_model:
+    :param text_model_ensemble:
+    :param cache: optional SentimentCache, only sentences missing from it are scored
+    :param score_all_images: score every image even if it is not used, e.g. for analytics
+    :param concurrent: overlap emoji lookup and image download/decode with text inference
+    :return:
+    """
+    if cache is None:
+        return score_components(sentences, image_model, text_model_ensemble, score_all_images, concurrent)[0]
+
+    sentences = list(sentences)
+    # Entries are keyed by everything the scores depend on besides the message: the emoji weight,
+    # the files the models were loaded from (which also tells apart quantized, pruned and frozen
+    # models), disabled modalities and the image component of score_all_images
+    variant = '{}:{}'.format(EMOJI_WEIGHT, models_fingerprint(image_model, text_model_ensemble))
+    disabled = [name for name, model in (('text', text_model_ensemble), ('image', image_model)) if model is None]
+    if disabled:
+        variant += ':without-' + '-'.join(disabled)
+    if score_all_images:
+        variant += ':all-images'
+    cached = cache.get_many(sentences, variant=variant)
+    missing_indexes = [i for i in range(len(sentences)) if cached[i] is None]
+
+    if missing_indexes:
+        missing_sentences = [sentences[i] for i in missing_indexes]
+        components = score_components(missing_sentences, image_model, text_model_ensemble,
+                                      score_all_images, concurrent)
+        results = [dict(zip(('score', 'emoji', 'image', 'text'), scores)) for scores in zip(*components)]
+        cache.put_many(missing_sentences, results, variant=variant)
+        for i, result in zip(missing_indexes, results):
+            cached[i] = result
+
+    return [result['score'] for result in cached]
+
+
+class _StreamError:
+    def __init__(self, error):
+        self.error = error
+
+
+_STREAM_END = object()
+
+
+def _put_until_stopped(items, item, stop, poll=0.1):
+    """
+    Put item into a bounded queue, giving up once stop is set
+    :return: whether the item was queued
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _read_stream(sentences, items, stop):
+    """
+    Feed sentences from an iterable into a bounded queue, followed by _STREAM_END
+    Stops reading and closes the iterable once stop is set, i.e. the consumer went away
+    """
+    iterator = iter(sentences)
+    try:
+        for sentence in iterator:
+            if not _put_until_stopped(items, sentence, stop):
+                return
+    except Exception as e:
+        _put_until_stopped(items, _StreamError(e), stop)
+    else:
+        _put_until_stopped(items, _STREAM_END, stop)
+    finally:
+        if stop.is_set() and hasattr(iterator, 'close'):
+            iterator.close()
+
+
+def stream_sentiments(sentences, image_model, text_model_ensemble, batch_size=64, max_wait=0.5, **kwargs):
+    """
+    Score an unbounded iterable of sentences lazily in micro-batches
+    A batch is scored once it holds batch_size sentences or max_wait seconds passed since its
+    first sentence arrived, so memory stays constant and slow streams are not held back
+    :param sentences: iterable of sentences, e.g. lines of a chat export
+    :param image_model:
+    :param text_model_ensemble:
+    :param batch_size: maximum number of sentences per get_sentiments call
+    :param max_wait: maximum seconds to wait for a batch to fill
+    :param kwargs: passed on to get_sentiments (cache, score_all_images, concurrent)
+    :return: generator of (index, score) in input order
+    """
+    # The iterable is read on a separate thread so the time window also applies to blocking sources.
+    # If the generator is closed or garbage collected early, the reader is told to stop; a source
+    # blocked inside next() only notices once it yields its next sentence
+    items = queue.Queue(maxsize=batch_size)
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_stream, args=(sentences, items, stop), daemon=True)
+    reader.start()
+
+    try:
+        index = 0
+        finished = False
+        error = None
+        while not finished:
+            batch = []
+            deadline = None
+            while len(batch) < batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = items.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STREAM_END:
+                    finished = True
+                    break
+                if isinstance(item, _StreamError):
+                    # Sentences read before the error are still scored
+                    error = item.error
+                    finished = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + max_wait
+
+            if batch:
+                for score in get_sentiments(batch, image_model, text_model_ensemble, **kwargs):
+                    yield index, score
+                    index += 1
+        if error is not None:
+            raise error
+    finally:
+        stop.set()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+Persistent sentiment cache backed by sqlite
+Stores the final get_sentiments score and the per-modality component scores of each message so
+that restarts of batch jobs and app.py do not re-score the same history.
+
+Usage:
+    python SentimentCache.py warm messages.txt   # score one message per line into the cache
+    python SentimentCache.py inspect             # print entry counts and file size
+    python SentimentCache.py compact             # drop expired/stale entries and shrink the file
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = 'cache/sentiment_cache.sqlite'
+DEFAULT_MAX_ENTRIES = 1000000
+
+# Number of inserted entries after which put_many evicts down to max_entries
+DEFAULT_EVICT_INTERVAL = 1000
+
+# Code and data files whose contents determine the scores, any change makes existing entries stale.
+# The model files are not listed here: get_sentiments keys entries by the files the loaded models
+# were actually read from (their source_paths), see models_fingerprint
+FINGERPRINT_FILES = [
+    'Emoji/config.py',
+    'Emoji/emoji2sentiment.bin',
+    'Emoji/emoji_table.py',
+    'Emoji/EmojiSentiment.py',
+    'Text/deepmoji/emoji_sequences.py',
+    'SentimentAnalysis.py',
+    'SmoothingRules.py',
+    'smoothing_rules.json',
+]
+
+COMPONENTS = ('score', 'emoji', 'image', 'text')
+
+
+def files_fingerprint(paths=FINGERPRINT_FILES):
+    """
+    Fingerprint the model files, vocabulary and emoji table by path, size and modification time
+    :param paths:
+    :return: hex digest
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update('{}:{}'.format(stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def models_fingerprint(*models):
+    """
+    Fingerprint the files the models were loaded from, as recorded in their source_paths
+    :param models: loaded models, None for disabled modalities
+    :return: hex digest
+    """
+    paths = [path for model in models if model is not None for path in getattr(model, 'source_paths', [])]
+    return files_fingerprint(paths)
+
+
+def normalize_message(sentence):
+    """
+    Normalize a message before hashing so trivially different copies share an entry
+    :param sentence:
+    :return: normalized sentence
+    """
+    return unicodedata.normalize('NFC', sentence).strip()
+
+
+class SentimentCache:
+    """
+    sqlite-backed cache of sentiment results keyed by a content hash of the normalized message
+    and the fingerprint of the files the scores depend on
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl=None, fingerprint=None,
+                 evict_interval=DEFAULT_EVICT_INTERVAL):
+        """
+        :param path: sqlite file
+        :param max_entries: least recently used entries above this count are evicted
+        :param ttl: seconds an entry stays valid, None keeps entries forever
+        :param fingerprint: defaults to files_fingerprint()
+        :param evict_interval: put_many evicts after this many inserted entries, so the file stays
+                               within max_entries (plus at most one interval)
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fingerprint = fingerprint if fingerprint is not None else files_fingerprint()
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        # The connection is shared by the threads calling get_sentiments, e.g. the executor of
+        # serve.py, sqlite3 connections must not be used by two threads at once
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, fingerprint TEXT, score REAL, emoji REAL, image REAL, text REAL, '
+            'created REAL, accessed REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self.connection.commit()
+
+    def key(self, sentence, variant=''):
+        """
+        :param sentence:
+        :param variant: extra settings the score depends on, e.g. the emoji weight
+        :return: cache key
+        """
+        digest = hashlib.sha1()
+        for part in (self.fingerprint, variant, normalize_message(sentence)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get_many(self, sentences, variant=''):
+        """
+        Look up cached results
+        :param sentences: list of sentences
+        :param variant:
+        :return: list of dicts with score, emoji, image and text entries, None for misses
+        """
+        keys = [self.key(sentence, variant) for sentence in sentences]
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                rows = self.connection.execute(
+                    'SELECT key, created, score, emoji, image, text FROM entries WHERE key IN ({})'
+                    .format(','.join('?' * len(chunk))), chunk).fetchall()
+                for row in rows:
+                    if self.ttl is None or now - row[1] <= self.ttl:
+                        found[row[0]] = dict(zip(COMPONENTS, row[2:]))
+
+            if found:
+                self.connection.executemany('UPDATE entries SET accessed = ? WHERE key = ?',
+                                            [(now, key) for key in found])
+                self.connection.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, sentences, results, variant=''):
+        """
+        Store results, evicting every evict_interval inserted entries
+        :param sentences: list of sentences
+        :param results: list of dicts with score, emoji, image and text entries
+        :param variant:
+        """
+        now = time.time()
+        rows = []
+        for sentence, result in zip(sentences, results):
+            values = [None if result.get(c) is None else float(result[c]) for c in COMPONENTS]
+            rows.append([self.key(sentence, variant), self.fingerprint] + values + [now, now])
+        with self._lock:
+            self.connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.connection.commit()
+            self._inserts += len(rows)
+            if self._inserts >= self.evict_interval:
+                self.evict()
+
+    def evict(self):
+        """
+        Delete expired entries, entries from other fingerprints and the least recently used
+        entries above max_entries
+        :return: number of deleted entries
+        """
+        with self._lock:
+            deleted = self.connection.execute('DELETE FROM entries WHERE fingerprint != ?',
+                                              (self.fingerprint,)).rowcount
+            if self.ttl is not None:
+                deleted += self.connection.execute('DELETE FROM entries WHERE created < ?',
+                                                   (time.time() - self.ttl,)).rowcount
+            count = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            if count > self.max_entries:
+                deleted += self.connection.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)',
+                    (count - self.max_entries,)).rowcount
+            self.connection.commit()
+            self._inserts = 0
+        return deleted
+
+    def compact(self):
+        """
+        Evict and then shrink the sqlite file
+        :return: number of deleted entries
+        """
+        with self._lock:
+            deleted = self.evict()
+            self.connection.execute('VACUUM')
+        return deleted
+
+    def stats(self):
+        """
+        :return: dict of entry counts, file size and hit/miss counters
+        """
+        with self._lock:
+            entries = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            current = self.connection.execute('SELECT COUNT(*) FROM entries WHERE fingerprint = ?',
+                                              (self.fingerprint,)).fetchone()[0]
+        return {'path': self.path, 'entries': entries, 'current_entries': current,
+                'stale_entries': entries - current, 'size_bytes': os.path.getsize(self.path),
+                'max_entries': self.max_entries, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def warm(cache, messages_path, batch_size=256):
+    """
+    Score every line of a file into the cache
+    :param cache:
+    :param messages_path: text file with one message per line
+    :param batch_size:
+    """
+    from SentimentAnalysis import load_models, get_sentiments
+
+    image_model, text_model_ensemble = load_models()
+    with open(messages_path, 'r', encoding='utf-8') as f:
+        batch = []
+        for line in f:
+            line = line.rstrip('\n')
+            if line.strip():
+                batch.append(line)
+            if len(batch) >= batch_size:
+                get_sentiments(batch, image_model, text_model_ensemble, cache=cache)
+                batch = []
+        if batch:
+            get_sentiments(batch, image_model, text_model_ensemble, cache=cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the persistent sentiment cache')
+    parser.add_argument('command', choices=['warm', 'inspect', 'compact'])
+    parser.add_argument('messages', nargs='?', help='text file with one message per line (warm only)')
+    parser.add_argument('--path', default=DEFAULT_CACHE_PATH)
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument('--ttl', type=float, default=None, help='entry lifetime in seconds')
+    args = parser.parse_args()
+
+    cache = SentimentCache(args.path, max_entries=args.max_entries, ttl=args.ttl)
+    if args.command == 'warm':
+        if not args.messages:
+            parser.error('warm needs a messages file')
+        warm(cache, args.messages)
+        print(f"Warmed cache: {cache.misses} scored, {cache.hits} already cached")
+    elif args.command == 'compact':
+        deleted = cache.compact()
+        print(f"Deleted {deleted} entries")
+
+    for name, value in cache.stats().items():
+        print(f"{name:16} {value}")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
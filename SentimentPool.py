@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Multi-process worker pool for get_sentiments
+Batches are split into chunks that are spread across the workers.
+
+Two engines are supported:
+    numpy  the NumPy DeepMoji ensemble is loaded once in the parent and the workers are forked
+           afterwards, so the weight arrays stay shared copy-on-write (reference counting only
+           writes to the array headers, not to the weight pages). Images are not scored, C3D
+           only exists as a Keras model.
+    keras  TF1 sessions and graphs are not fork-safe, so every worker is spawned and loads its
+           own Keras models. The weights are not shared.
+
+Usage:
+    python SentimentPool.py messages.txt --workers 4 --engine numpy
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+# Models inherited by forked workers, or loaded by each spawned worker
+_models = None
+
+ENGINES = ('numpy', 'keras')
+
+
+def _current_rss():
+    """
+    Resident set size of this process in bytes
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the peak RSS in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _init_worker(loader):
+    global _models
+    if _models is None:
+        _models = loader()
+
+
+def _score_chunk(args):
+    """
+    Score one chunk in a worker
+    :return: scores, pid, number of sentences, elapsed seconds, rss bytes
+    """
+    from SentimentAnalysis import get_sentiments
+    sentences, kwargs = args
+    image_model, text_model_ensemble = _models
+    start = time.perf_counter()
+    scores = get_sentiments(sentences, image_model, text_model_ensemble, **kwargs)
+    return scores, os.getpid(), len(sentences), time.perf_counter() - start, _current_rss()
+
+
+def _keras_loader():
+    from SentimentAnalysis import load_models
+    return load_models()
+
+
+def _numpy_loader():
+    from SmoothingRules import get_smoothing_rules
+    from Text.sentiment.TextSentiment import load_numpy_models
+    get_smoothing_rules()
+    return None, load_numpy_models()
+
+
+DEFAULT_LOADERS = {'numpy': _numpy_loader, 'keras': _keras_loader}
+
+
+class SentimentWorkerPool:
+    """
+    Pool of worker processes, see the module docstring for how each engine loads its models
+    """
+
+    def __init__(self, n_workers=None, engine='numpy', loader=None, chunk_size=64):
+        """
+        :param n_workers: number of worker processes, defaults to the number of cores
+        :param engine: 'numpy' to fork workers sharing the parent's NumPy models, 'keras' to spawn
+                       workers that load their own Keras models
+        :param loader: function returning (image_model, text_model_ensemble), defaults to the
+                       engine's loader; must be picklable for the keras engine
+        :param chunk_size: number of sentences sent to a worker at a time
+        """
+        global _models
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if loader is None:
+            loader = DEFAULT_LOADERS[engine]
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.worker_stats = {}
+
+        if engine == 'numpy' and 'fork' in multiprocessing.get_all_start_methods():
+            # Load before forking so every worker shares the same weight pages
+            _models = loader()
+            context = multiprocessing.get_context('fork')
+        else:
+            # Keras models are loaded after the start, in every worker
+            context = multiprocessing.get_context('spawn')
+        self.pool = context.Pool(self.n_workers, initializer=_init_worker, initargs=(loader,))
+
+    def get_sentiments(self, sentences, **kwargs):
+        """
+        Score sentences across the workers
+        :param sentences: list of sentences
+        :param kwargs: passed on to get_sentiments in the workers
+        :return: scores in input order
+        """
+        sentences = list(sentences)
+        chunks = [(sentences[i:i + self.chunk_size], kwargs) for i in range(0, len(sentences), self.chunk_size)]
+        scores = []
+        for chunk_scores, pid, n_sentences, elapsed, rss in self.pool.imap(_score_chunk, chunks):
+            scores.extend(chunk_scores)
+            stats = self.worker_stats.setdefault(pid, {'chunks': 0, 'sentences': 0, 'busy_time': 0.0})
+            stats['chunks'] += 1
+            stats['sentences'] += n_sentences
+            stats['busy_time'] += elapsed
+            stats['rss_bytes'] = rss
+        return scores
+
+    def stats(self):
+        """
+        :return: dict of worker pid -> chunks, sentences, busy_time, throughput (sentences/s) and rss_bytes
+        """
+        report = {}
+        for pid, stats in self.worker_stats.items():
+            report[pid] = dict(stats)
+            report[pid]['throughput'] = stats['sentences'] / stats['busy_time'] if stats['busy_time'] else 0.0
+        return report
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a file of messages with a pool of workers')
+    parser.add_argument('messages', help='text file with one message per line')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--engine', choices=ENGINES, default='numpy')
+    args = parser.parse_args()
+
+    with open(args.messages, 'r', encoding='utf-8') as f:
+        sentences = [line.rstrip('\n') for line in f if line.strip()]
+
+    with SentimentWorkerPool(args.workers, engine=args.engine, chunk_size=args.chunk_size) as pool:
+        start = time.perf_counter()
+        pool.get_sentiments(sentences)
+        elapsed = time.perf_counter() - start
+
+        print(f"{'='*60}")
+        print(f"Scored {len(sentences)} messages in {elapsed:.2f}s "
+              f"({len(sentences) / elapsed:.1f} messages/s) with {pool.n_workers} workers")
+        for pid, stats in sorted(pool.stats().items()):
+            print(f"  worker {pid}: {stats['sentences']:6d} messages | "
+                  f"{stats['throughput']:8.1f} messages/s | RSS {stats['rss_bytes'] / 2 ** 20:.0f} MB")
+        print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
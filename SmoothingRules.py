@@ -0,0 +1,170 @@
+"""
+Compiled rule engine for the post-processing smoothing of get_sentiments
+Matchers (emoji lexicons, word lexicons and regex patterns) and the rules that combine them are
+read from smoothing_rules.json, so rules can be extended without editing SentimentAnalysis.py.
+Everything is compiled once, the matchers of all rules are evaluated together per message and
+their flags are returned together. Each text matcher keeps its own regex: one combined regex with
+an alternative per matcher is slower under re than a search per matcher.
+
+A rule applies to a score when all of its "when" matchers match, none of its "unless" matchers
+match and the score lies strictly inside its optional "score_range". The first applicable rule
+replaces the score by score * scale + shift, clamped to [-1, 1].
+"""
+import json
+import os
+import re
+
+from Text.deepmoji.emoji_sequences import emoji_components
+
+SMOOTHING_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'smoothing_rules.json')
+
+
+def _matcher_pattern(name, matcher):
+    """
+    :param name: matcher name, for error messages
+    :param matcher: text matcher with a "pattern" or a "words" lexicon and optional "ignore_case"
+    :return: regex source
+    """
+    if 'pattern' in matcher:
+        pattern = matcher['pattern']
+    elif 'words' in matcher:
+        pattern = r'\b(?:{})\b'.format('|'.join(re.escape(word) for word in matcher['words']))
+    else:
+        raise ValueError(f"Matcher {name!r} needs 'emojis', 'words' or 'pattern'")
+    if matcher.get('ignore_case'):
+        pattern = '(?i:{})'.format(pattern)
+    return pattern
+
+
+class SmoothingRules:
+    """
+    Matchers and rules of the post-processing smoothing, compiled once
+    """
+
+    def __init__(self, matchers, rules):
+        """
+        :param matchers: dict of matcher name -> matcher, see smoothing_rules.json
+        :param rules: list of rules, applied in order, see smoothing_rules.json
+        """
+        self.matcher_names = list(matchers)
+        self.emoji_lexicons = {}
+        self.text_patterns = {}
+        for name, matcher in matchers.items():
+            if 'emojis' in matcher:
+                self.emoji_lexicons[name] = frozenset(matcher['emojis'])
+            else:
+                self.text_patterns[name] = re.compile(_matcher_pattern(name, matcher))
+
+        for rule in rules:
+            unknown = (set(rule.get('when', [])) | set(rule.get('unless', []))) - set(matchers)
+            if unknown:
+                raise ValueError(f"Rule {rule.get('name')!r} uses unknown matchers {sorted(unknown)}")
+        self.rules = rules
+
+        # Matchers each rule needs to (not) match, emoji lexicons first as they are the cheapest
+        self._ordered_rules = []
+        for rule in rules:
+            checks = [(name, True) for name in rule.get('when', [])] + \
+                     [(name, False) for name in rule.get('unless', [])]
+            checks.sort(key=lambda check: check[0] not in self.emoji_lexicons)
+            self._ordered_rules.append(dict(rule, _checks=checks))
+
+    @classmethod
+    def from_file(cls, path=SMOOTHING_RULES_PATH):
+        """
+        :param path: JSON file with "matchers" and "rules"
+        :return: SmoothingRules
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config['matchers'], config['rules'])
+
+    @staticmethod
+    def _has_emoji(lexicon, emojis):
+        # Handle both list of emojis and single emoji string
+        if isinstance(emojis, str):
+            emojis = [emojis]
+        # Skin tone and presentation variants match their base emoji
+        return any(emoji in lexicon or (len(emoji) > 1 and not lexicon.isdisjoint(emoji_components(emoji)))
+                   for emoji in emojis)
+
+    def _matches(self, name, text, emojis):
+        """
+        :return: whether the matcher called name matches the message
+        """
+        if name in self.emoji_lexicons:
+            return bool(emojis) and self._has_emoji(self.emoji_lexicons[name], emojis)
+        return bool(text) and self.text_patterns[name].search(text) is not None
+
+    def match(self, text, emojis):
+        """
+        :param text: message text or None
+        :param emojis: list of emojis of the message or None
+        :return: set of the names of the matching matchers
+        """
+        return set(name for name in self.matcher_names if self._matches(name, text, emojis))
+
+    def match_batch(self, texts, emojis_list):
+        """
+        :param texts: message texts (None for no text)
+        :param emojis_list: emoji lists of the messages (None for no emojis)
+        :return: list of sets of matching matcher names, one per message
+        Evaluates every matcher, get_sentiments uses the lazy smooth instead
+        """
+        return [self.match(text, emojis) for text, emojis in zip(texts, emojis_list)]
+
+    def _apply(self, score, matches):
+        for rule in self._ordered_rules:
+            if 'score_range' in rule:
+                low, high = rule['score_range']
+                if not low < score < high:
+                    continue
+            if all(matches(name) == required for name, required in rule['_checks']):
+                adjusted = (score * rule.get('scale', 1.0)) + rule.get('shift', 0.0)
+                return max(-1.0, min(1.0, adjusted))
+        return score
+
+    def apply(self, score, flags):
+        """
+        :param score: sentiment score
+        :param flags: matching matcher names of the message, as returned by match
+        :return: score after the first applicable rule, unchanged if none applies
+        """
+        return self._apply(score, flags.__contains__)
+
+    def smooth(self, score, text, emojis):
+        """
+        Same as apply(score, match(text, emojis)), but only the matchers needed to decide are
+        evaluated. Emoji matchers are checked before text matchers, so e.g. messages without a
+        positive emoji are not scanned for the text patterns of rules that need one
+        :param score: sentiment score
+        :param text: message text or None
+        :param emojis: list of emojis of the message or None
+        :return: score after the first applicable rule, unchanged if none applies
+        """
+        flags = {}
+
+        def matches(name):
+            if name not in flags:
+                flags[name] = self._matches(name, text, emojis)
+            return flags[name]
+
+        return self._apply(score, matches)
+
+
+_smoothing_rules = None
+
+
+def get_smoothing_rules():
+    """
+    :return: SmoothingRules of smoothing_rules.json, compiled on first use
+    """
+    global _smoothing_rules
+    if _smoothing_rules is None:
+        _smoothing_rules = SmoothingRules.from_file()
+    return _smoothing_rules
+
+
+def reset_smoothing_rules():
+    global _smoothing_rules
+    _smoothing_rules = None
@@ -18,7 +18,8 @@ from deepmoji.finetuning import (
     sampling_generator,
     finetuning_callbacks,
     train_by_chain_thaw,
-    find_f1_threshold)
+    find_f1_threshold,
+    notify_weights_changed)
 
 def relabel(y, current_label_nr, nb_classes):
     """ Makes a binary classification for a specific class in a
@@ -145,6 +146,7 @@ def class_avg_finetune(model, texts, labels, nb_classes, batch_size,
                                           init_weight_path=f1_init_path,
                                           checkpoint_weight_path=checkpoint_path,
                                           verbose=verbose)
+    notify_weights_changed(model)
     return model, result
 
 
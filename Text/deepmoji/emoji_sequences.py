@@ -0,0 +1,159 @@
+""" Single-pass extraction of full emoji sequences.
+
+Matching every character against emoji.UNICODE_EMOJI splits sequences such
+as skin-toned or ZWJ-joined emojis (e.g. u'\\U0001F926\\U0001F3FF\\u200d\\u2642\\ufe0f')
+into fragments and leaves the joiners and variation selectors in the text.
+Here the emoji library's sequence list is compiled once into a regex of the
+emoji sequence grammar: an element is an emoji with optional skin tone
+modifier and variation selector, a keycap or a flag, and a sequence is one
+or more ZWJ-joined elements. Each text is split into whole sequences and
+residual text in one left-to-right scan.
+
+The emoji library predates many emojis (e.g. u'\U0001F929', u'\U0001F9D7'),
+so every Extended_Pictographic codepoint above U+FFFF is a base as well.
+Extended_Pictographic symbols of the BMP the library does not know (e.g.
+u'\u2605') are mostly used as text and only count as emojis when followed by
+the emoji presentation selector.
+"""
+
+from __future__ import print_function, division
+
+import re
+
+import emoji
+
+ZWJ = u'\u200d'
+# Fitzpatrick skin tone modifiers
+SKIN_TONES = u'\U0001F3FB\U0001F3FC\U0001F3FD\U0001F3FE\U0001F3FF'
+# Text and emoji presentation selectors, and the combining keycap
+VARIATION_SELECTORS = u'\ufe0e\ufe0f'
+KEYCAP = u'\u20e3'
+REGIONAL_INDICATORS = (0x1F1E6, 0x1F1FF)
+
+# Extended_Pictographic codepoint ranges of the Unicode emoji data (emoji-data.txt)
+EXTENDED_PICTOGRAPHIC = [
+    (0x00A9, 0x00A9), (0x00AE, 0x00AE), (0x203C, 0x203C), (0x2049, 0x2049), (0x2122, 0x2122),
+    (0x2139, 0x2139), (0x2194, 0x2199), (0x21A9, 0x21AA), (0x231A, 0x231B), (0x2328, 0x2328),
+    (0x2388, 0x2388), (0x23CF, 0x23CF), (0x23E9, 0x23F3), (0x23F8, 0x23FA), (0x24C2, 0x24C2),
+    (0x25AA, 0x25AB), (0x25B6, 0x25B6), (0x25C0, 0x25C0), (0x25FB, 0x25FE), (0x2600, 0x2605),
+    (0x2607, 0x2612), (0x2614, 0x2685), (0x2690, 0x2705), (0x2708, 0x2712), (0x2714, 0x2714),
+    (0x2716, 0x2716), (0x271D, 0x271D), (0x2721, 0x2721), (0x2728, 0x2728), (0x2733, 0x2734),
+    (0x2744, 0x2744), (0x2747, 0x2747), (0x274C, 0x274C), (0x274E, 0x274E), (0x2753, 0x2755),
+    (0x2757, 0x2757), (0x2763, 0x2767), (0x2795, 0x2797), (0x27A1, 0x27A1), (0x27B0, 0x27B0),
+    (0x27BF, 0x27BF), (0x2934, 0x2935), (0x2B05, 0x2B07), (0x2B1B, 0x2B1C), (0x2B50, 0x2B50),
+    (0x2B55, 0x2B55), (0x3030, 0x3030), (0x303D, 0x303D), (0x3297, 0x3297), (0x3299, 0x3299),
+    (0x1F000, 0x1F0FF), (0x1F10D, 0x1F10F), (0x1F12F, 0x1F12F), (0x1F16C, 0x1F171),
+    (0x1F17E, 0x1F17F), (0x1F18E, 0x1F18E), (0x1F191, 0x1F19A), (0x1F1AD, 0x1F1E5),
+    (0x1F201, 0x1F20F), (0x1F21A, 0x1F21A), (0x1F22F, 0x1F22F), (0x1F232, 0x1F23A),
+    (0x1F23C, 0x1F23F), (0x1F249, 0x1F3FA), (0x1F400, 0x1F53D), (0x1F546, 0x1F64F),
+    (0x1F680, 0x1F6FF), (0x1F774, 0x1F77F), (0x1F7D5, 0x1F7FF), (0x1F80C, 0x1F80F),
+    (0x1F848, 0x1F84F), (0x1F85A, 0x1F85F), (0x1F888, 0x1F88F), (0x1F8AE, 0x1F8FF),
+    (0x1F90C, 0x1F93A), (0x1F93C, 0x1F945), (0x1F947, 0x1FAFF), (0x1FC00, 0x1FFFD),
+]
+PICTOGRAPHS = frozenset(c for start, end in EXTENDED_PICTOGRAPHIC for c in range(start, end + 1))
+
+# emoji 0.4.5 stores multi-codepoint emojis with spaces between the
+# codepoints, the spaces are not part of the sequence
+EMOJI_SEQUENCES = frozenset(e.replace(u' ', u'') for e in emoji.UNICODE_EMOJI)
+
+_emoji_regex = None
+
+
+def _char_class(codepoints):
+    """ Regex character class of the codepoints, consecutive codepoints are
+        merged into ranges.
+    """
+    ranges = []
+    for codepoint in sorted(set(codepoints)):
+        if ranges and ranges[-1][1] == codepoint - 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return u'[' + u''.join(re.escape(chr(start)) if start == end else
+                           re.escape(chr(start)) + u'-' + re.escape(chr(end))
+                           for start, end in ranges) + u']'
+
+
+def build_emoji_regex(sequences=EMOJI_SEQUENCES, pictographs=PICTOGRAPHS):
+    """ Compiles the emoji extractor.
+
+    # Arguments:
+        sequences: Emojis and emoji sequences to match. Sequences longer than
+            one codepoint must follow the element grammar, i.e. add skin
+            tones, variation selectors, keycaps or ZWJs to the single emojis,
+            or be two regional indicators.
+        pictographs: Codepoints matched as emojis in addition to the single
+            emojis of `sequences`. Those of the BMP only match when followed
+            by the emoji presentation selector.
+
+    # Returns:
+        Compiled regex matching one full emoji sequence in a group, for use
+        with split.
+    """
+    singles = set(ord(s) for s in sequences if len(s) == 1)
+    singles.update(c for c in pictographs if c > 0xFFFF)
+    presented = set(c for c in pictographs if c <= 0xFFFF) - singles
+    keycaps = set(ord(s[0]) for s in sequences if len(s) > 1 and s[-1] == KEYCAP)
+    regional = set(ord(c) for s in sequences if len(s) == 2 for c in s
+                   if REGIONAL_INDICATORS[0] <= ord(c) <= REGIONAL_INDICATORS[1])
+
+    # re tests the codepoints above U+FFFF of a class one range at a time,
+    # for every character of the text. The first character is tested against
+    # a superset with a single such range and verified by a lookbehind.
+    first = singles | presented | keycaps | regional
+    wide = [c for c in first if c > 0xFFFF]
+    first = set(c for c in first if c <= 0xFFFF)
+    if wide:
+        first.update(range(min(wide), max(wide) + 1))
+
+    element = u'{}(?:(?<={})[{}]?[{}]?|(?<={}){}|(?<={}){}?{}|(?<={}){})'.format(
+        _char_class(first),
+        _char_class(singles), SKIN_TONES, VARIATION_SELECTORS,
+        _char_class(presented or [ord(VARIATION_SELECTORS[1])]), re.escape(VARIATION_SELECTORS[1]),
+        _char_class(keycaps or [ord(KEYCAP)]), re.escape(VARIATION_SELECTORS[1]), KEYCAP,
+        _char_class(regional or [REGIONAL_INDICATORS[0]]), _char_class(regional or [REGIONAL_INDICATORS[0]]))
+    return re.compile(u'({0}(?:{1}{0})*)'.format(element, ZWJ))
+
+
+def get_emoji_regex():
+    """ Returns the extractor for the emoji library's sequences, compiled on
+        first use.
+    """
+    global _emoji_regex
+    if _emoji_regex is None:
+        _emoji_regex = build_emoji_regex()
+    return _emoji_regex
+
+
+def extract_emojis_and_text(text, emoji_regex=None):
+    """ Splits a text into its emoji sequences and the remaining text in one
+        scan.
+
+    # Arguments:
+        text: Text to split.
+        emoji_regex: Extractor to use, defaults to get_emoji_regex().
+
+    # Returns:
+        List of emoji sequences in order of appearance, text without them.
+    """
+    if emoji_regex is None:
+        emoji_regex = get_emoji_regex()
+    parts = emoji_regex.split(text)
+    if len(parts) == 1:
+        return [], text
+    return parts[1::2], u''.join(parts[::2])
+
+
+def emoji_components(sequence):
+    """ Splits an emoji sequence into the emojis it is built from, without
+        ZWJs, skin tone modifiers, variation selectors and keycaps.
+        E.g. a dark-skinned man facepalming gives the facepalm and the male
+        sign, a lone skin tone modifier gives no emojis.
+    """
+    components = []
+    for part in sequence.split(ZWJ):
+        part = u''.join(c for c in part if c not in SKIN_TONES
+                        and c not in VARIATION_SELECTORS and c != KEYCAP)
+        if part:
+            components.append(part)
+    return components
@@ -4,9 +4,9 @@ import sys
 import numpy as np
 import re
 import string
-import emoji
 from deepmoji.tokenizer import RE_MENTION, RE_URL
 from deepmoji.global_variables import SPECIAL_TOKENS
+from deepmoji.emoji_sequences import extract_emojis_and_text
 from itertools import groupby
 
 AtMentionRegex = re.compile(RE_MENTION)
@@ -103,14 +103,11 @@ def non_english_user(userid, non_english_user_set):
     return neu_found
 
 def separate_emojis_and_text(text):
-    emoji_chars = []
-    non_emoji_chars = []
-    for c in text:
-        if c in emoji.UNICODE_EMOJI:
-            emoji_chars.append(c)
-        else:
-            non_emoji_chars.append(c)
-    return ''.join(emoji_chars), ''.join(non_emoji_chars)
+    """ Splits a text into its emojis and the remaining text. Skin-toned and
+        ZWJ sequences are removed whole, see extract_emojis_and_text.
+    """
+    emojis, non_emoji_text = extract_emojis_and_text(text)
+    return ''.join(emojis), non_emoji_text
 
 def extract_emojis(text, wanted_emojis):
     text = remove_variation_selectors(text)
@@ -16,7 +16,7 @@ from sklearn.metrics import f1_score
 from keras.callbacks import ModelCheckpoint, EarlyStopping, CSVLogger
 from keras.optimizers import Adam
 from keras.utils.np_utils import to_categorical
-from keras.models import model_from_json
+from keras.models import model_from_json, Model
 
 from deepmoji.global_variables import (
     FINETUNING_METHODS,
@@ -312,6 +312,22 @@ def sampling_generator(X_in, y_in, batch_size, epoch_size=25000,
             yield (X[start:end], y[start:end])
 
 
+def notify_weights_changed(model):
+    """ Tells the owners of predictions cached for the model that its
+        weights changed, e.g. sentiment.TextSentiment.TextSentimentScorer.
+
+        Owners register weak references to a callback without arguments in
+        model.weights_changed_callbacks.
+
+    # Arguments:
+        model: Model whose weights changed.
+    """
+    for ref in getattr(model, 'weights_changed_callbacks', []):
+        callback = ref()
+        if callback is not None:
+            callback()
+
+
 def finetune(model, texts, labels, nb_classes, batch_size, method,
              metric='acc', epoch_size=5000, nb_epochs=1000,
              error_checking=True, verbose=1):
@@ -408,9 +424,60 @@ def finetune(model, texts, labels, nb_classes, batch_size, method,
                                 batch_size=batch_size,
                                 checkpoint_weight_path=checkpoint_path,
                                 evaluate=metric, verbose=verbose)
+    notify_weights_changed(model)
     return model, result
 
 
+def finetune_multihead(model, heads, batch_size, method='last',
+                       metric='acc', epoch_size=5000, nb_epochs=1000,
+                       error_checking=True, verbose=1):
+    """ Finetunes the task heads of a model built with deepmoji_multihead,
+        one head at a time on top of the shared encoder.
+
+        With the 'last' method the encoder is frozen, so every head is
+        trained against the same encoder and the result is equivalent to
+        finetuning separate models. With the other methods the encoder is
+        updated while training each head, so later heads see the encoder
+        as tuned by the earlier ones.
+
+    # Arguments:
+        model: Multi-head model to be finetuned.
+        heads: Dictionary mapping head (output layer) names to a
+            (texts, labels, nb_classes) tuple, where texts and labels are
+            given as for finetune(). Heads missing from the dictionary
+            are not trained.
+        batch_size: Batch size.
+        method: Finetuning method to be used. For available methods, see
+            FINETUNING_METHODS in global_variables.py.
+        metric: Evaluation metric to be used. For available metrics, see
+            FINETUNING_METRICS in global_variables.py.
+        epoch_size: Number of samples in an epoch.
+        nb_epochs: Number of epochs. Doesn't matter much as early stopping is used.
+        error_checking: If set to True, warnings will be printed when the label
+            list has the wrong dimensions.
+        verbose: Verbosity flag.
+
+    # Returns:
+        Model after finetuning,
+        dictionary of head name to score after finetuning using the provided metric.
+    """
+    results = {}
+    for name, (texts, labels, nb_classes) in heads.items():
+        if verbose:
+            print('Head:    {}'.format(name))
+
+        # Single-output view sharing the encoder layers with the full model
+        head_model = Model(inputs=model.inputs,
+                           outputs=[model.get_layer(name=name).output])
+        _, results[name] = finetune(head_model, texts, labels, nb_classes,
+                                    batch_size, method, metric=metric,
+                                    epoch_size=epoch_size, nb_epochs=nb_epochs,
+                                    error_checking=error_checking,
+                                    verbose=verbose)
+    notify_weights_changed(model)
+    return model, results
+
+
 def tune_trainable(model, nb_classes, train, val, test, epoch_size,
                    nb_epochs, batch_size, checkpoint_weight_path,
                    patience=5, evaluate='acc', verbose=1):
@@ -0,0 +1,173 @@
+""" Frozen, inference-only model artifacts.
+
+A frozen artifact is a single file holding a JSON header (model config,
+layer and weight names, array layout and free-form metadata such as maxlen
+and the vocabulary hash) followed by every weight array stored contiguously
+at a 64-byte aligned offset. Loading memory-maps the file, so the arrays are
+not read until they are used and the page cache is shared between processes
+that load the same artifact. No optimizer state is stored.
+"""
+
+from __future__ import print_function, division
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+FROZEN_MAGIC = b'DMFROZEN'
+FROZEN_VERSION = 1
+ALIGNMENT = 64
+
+
+def file_hash(path):
+    """ SHA1 of a file, used to tie an artifact to the vocabulary it was
+        exported with.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_identities(paths):
+    """ Size and modification time of the files an artifact is exported
+        from, stored in its metadata to detect retrained sources.
+
+    # Returns:
+        Dictionary of path to [size, mtime in ns], None for missing files.
+    """
+    identities = {}
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            identities[path] = [stat.st_size, stat.st_mtime_ns]
+        else:
+            identities[path] = None
+    return identities
+
+
+def stale_sources(metadata):
+    """ Returns the source files recorded in an artifact's metadata that
+        were changed, created or deleted since it was exported.
+    """
+    recorded = metadata.get('sources', {})
+    current = source_identities(recorded)
+    return [path for path in recorded if current[path] != recorded[path]]
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_frozen(path, layer_weights, metadata=None, model_config=None):
+    """ Writes a frozen artifact.
+
+    # Arguments:
+        path: Target file.
+        layer_weights: List of [layer name, weight names, weight values] as
+            returned by get_weights_from_hdf5.
+        metadata: JSON-serializable dictionary stored with the weights.
+        model_config: Keras model JSON, needed by load_frozen_keras_model.
+    """
+    layers = []
+    arrays = []
+    offset = 0
+    for l_name, weight_names, weight_values in layer_weights:
+        layout = []
+        for w in weight_values:
+            w = np.ascontiguousarray(w)
+            layout.append([w.dtype.str, list(w.shape), offset])
+            arrays.append((offset, w))
+            offset = _aligned(offset + w.nbytes)
+        layers.append([l_name, weight_names, layout])
+
+    header = json.dumps({'version': FROZEN_VERSION, 'layers': layers,
+                         'metadata': metadata or {},
+                         'model_config': model_config}).encode('utf8')
+    data_start = _aligned(len(FROZEN_MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(FROZEN_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for array_offset, w in arrays:
+            f.seek(data_start + array_offset)
+            f.write(w.tobytes())
+        f.truncate(data_start + offset)
+
+
+def _read_header(f):
+    if f.read(len(FROZEN_MAGIC)) != FROZEN_MAGIC:
+        raise ValueError('ERROR (frozen): {} is not a frozen model artifact.'.format(f.name))
+    header_size, = struct.unpack('<Q', f.read(8))
+    header = json.loads(f.read(header_size).decode('utf8'))
+    if header['version'] != FROZEN_VERSION:
+        raise ValueError('ERROR (frozen): Unsupported artifact version {}.'.format(header['version']))
+    return header, _aligned(len(FROZEN_MAGIC) + 8 + header_size)
+
+
+def read_frozen_metadata(path):
+    """ Returns the metadata dictionary of a frozen artifact without mapping
+        the weights.
+    """
+    with open(path, 'rb') as f:
+        header, _ = _read_header(f)
+    return header['metadata']
+
+
+def load_frozen(path):
+    """ Memory-maps a frozen artifact.
+
+    # Returns:
+        List of [layer name, weight names, weight values] where the values
+        are read-only arrays backed by the file, and the metadata dictionary.
+    """
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+
+    buffer = np.memmap(path, dtype='uint8', mode='r')
+    layer_weights = []
+    for l_name, weight_names, layout in header['layers']:
+        weight_values = []
+        for dtype, shape, offset in layout:
+            dtype = np.dtype(dtype)
+            start = data_start + offset
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            weight_values.append(np.ndarray(shape, dtype=dtype, buffer=buffer,
+                                            offset=start) if nbytes else np.zeros(shape, dtype))
+        layer_weights.append([l_name, weight_names, weight_values])
+    return layer_weights, header['metadata']
+
+
+def freeze_keras_model(model, path, metadata=None):
+    """ Writes a Keras model as a frozen artifact, with one entry per
+        top-level layer (nested models are stored as a single entry).
+    """
+    layer_weights = [[layer.name, [w.name for w in layer.weights], layer.get_weights()]
+                     for layer in model.layers if layer.weights]
+    save_frozen(path, layer_weights, metadata, model_config=model.to_json())
+
+
+def load_frozen_keras_model(path, custom_objects=None):
+    """ Rebuilds a Keras model from a frozen artifact. The model is not
+        compiled.
+
+    # Returns:
+        Keras model, metadata dictionary.
+    """
+    from keras.models import model_from_json
+
+    with open(path, 'rb') as f:
+        header, _ = _read_header(f)
+    if header['model_config'] is None:
+        raise ValueError('ERROR (frozen): {} has no model config.'.format(path))
+
+    model = model_from_json(header['model_config'], custom_objects=custom_objects)
+    layer_weights, metadata = load_frozen(path)
+    for l_name, _, weight_values in layer_weights:
+        model.get_layer(name=l_name).set_weights(weight_values)
+    return model, metadata
@@ -9,10 +9,11 @@ from keras.layers import Input, Bidirectional, Embedding, Dense, Dropout, Spatia
 from keras.regularizers import L1L2
 from deepmoji.attlayer import AttentionWeightedAverage
 from deepmoji.global_variables import NB_TOKENS, NB_EMOJI_CLASSES
+# get_weights_from_hdf5 moved to deepmoji.weights and is re-exported here
+from deepmoji.weights import get_shared_weights, get_weights_from_hdf5
 import numpy as np
 from copy import deepcopy
 from os.path import exists
-import h5py
 
 def deepmoji_feature_encoding(maxlen, weight_path, return_attention=False):
     """ Loads the pretrained Text model for extracting features
@@ -54,7 +55,7 @@ def deepmoji_emojis(maxlen, weight_path, return_attention=False):
     model = deepmoji_architecture(nb_classes=NB_EMOJI_CLASSES,
                                   nb_tokens=NB_TOKENS, maxlen=maxlen,
                                   return_attention=return_attention)
-    model.load_weights(weight_path, by_name=False)
+    load_specific_weights(model, weight_path, verbose=False)
     return model
 
 
@@ -99,28 +100,27 @@ def deepmoji_transfer(nb_classes, maxlen, weight_path=None, extend_embedding=0,
     return model
 
 
-def deepmoji_architecture(nb_classes, nb_tokens, maxlen, feature_output=False, embed_dropout_rate=0, final_dropout_rate=0, embed_l2=1E-6, return_attention=False):
-    """
-    Returns the Text architecture uninitialized and
-    without using the pretrained model weights.
+def deepmoji_encoder(model_input, nb_tokens, maxlen, embed_dropout_rate=0, embed_l2=1E-6, return_attention=False, activated_embedding=False):
+    """ Builds the shared Text encoder (embedding, both BiLSTM layers and the
+        attention layer) on top of the given input tensor. Layer names match
+        the pretrained weights.
 
     # Arguments:
-        nb_classes: Number of classes in the dataset.
+        model_input: Int32 input tensor of shape (maxlen,).
         nb_tokens: Number of tokens in the dataset (i.e. vocabulary size).
         maxlen: Maximum length of a token.
-        feature_output: If True the model returns the penultimate
-                        feature vector rather than Softmax probabilities
-                        (defaults to False).
         embed_dropout_rate: Dropout rate for the embedding layer.
-        final_dropout_rate: Dropout rate for the final Softmax layer.
         embed_l2: L2 regularization for the embedding layerl.
+        return_attention: If True, the attention weights are returned as well.
+        activated_embedding: If True, the embedding table already holds
+            tanh-activated vectors and no activation node is added.
 
     # Returns:
-        Model with the given parameters.
+        Encoded feature tensor,
+        attention weights tensor (None unless return_attention is True).
     """
     # define embedding layer that turns word tokens into vectors
     # an activation function is used to bound the values of the embedding
-    model_input = Input(shape=(maxlen,), dtype='int32')
     embed_reg = L1L2(l2=embed_l2) if embed_l2 != 0 else None
     embed = Embedding(input_dim=nb_tokens,
                       output_dim=256,
@@ -130,7 +130,8 @@ def deepmoji_architecture(nb_classes, nb_tokens, maxlen, feature_output=False, e
                       name='embedding')
 
     x = embed(model_input)
-    x = Activation('tanh')(x)
+    if not activated_embedding:
+        x = Activation('tanh')(x)
 
     # entire embedding channels are dropped out instead of the
     # normal Keras embedding dropout, which drops all channels for entire words
@@ -152,6 +153,37 @@ def deepmoji_architecture(nb_classes, nb_tokens, maxlen, feature_output=False, e
     if return_attention:
         x, weights = x
 
+    return x, weights
+
+
+def deepmoji_architecture(nb_classes, nb_tokens, maxlen, feature_output=False, embed_dropout_rate=0, final_dropout_rate=0, embed_l2=1E-6, return_attention=False, activated_embedding=False):
+    """
+    Returns the Text architecture uninitialized and
+    without using the pretrained model weights.
+
+    # Arguments:
+        nb_classes: Number of classes in the dataset.
+        nb_tokens: Number of tokens in the dataset (i.e. vocabulary size).
+        maxlen: Maximum length of a token.
+        feature_output: If True the model returns the penultimate
+                        feature vector rather than Softmax probabilities
+                        (defaults to False).
+        embed_dropout_rate: Dropout rate for the embedding layer.
+        final_dropout_rate: Dropout rate for the final Softmax layer.
+        embed_l2: L2 regularization for the embedding layerl.
+        activated_embedding: If True, the embedding weights are expected to
+            be tanh-activated already (see deepmoji_inference_model).
+
+    # Returns:
+        Model with the given parameters.
+    """
+    model_input = Input(shape=(maxlen,), dtype='int32')
+    x, weights = deepmoji_encoder(model_input, nb_tokens, maxlen,
+                                  embed_dropout_rate=embed_dropout_rate,
+                                  embed_l2=embed_l2,
+                                  return_attention=return_attention,
+                                  activated_embedding=activated_embedding)
+
     if feature_output == False:
         # output class probabilities
         if final_dropout_rate != 0:
@@ -172,6 +204,116 @@ def deepmoji_architecture(nb_classes, nb_tokens, maxlen, feature_output=False, e
     return Model(inputs=[model_input], outputs=outputs, name="Text")
 
 
+def deepmoji_multihead(heads, maxlen, weight_path=None, embed_dropout_rate=0,
+                       final_dropout_rate=0, embed_l2=1E-6):
+    """ Loads the pretrained Text encoder once and attaches several task heads
+        to it, e.g. Twitter SS, YouTube SS and the 64-class emoji head. The
+        encoder is computed once per batch no matter how many heads there are.
+
+        A head named 'softmax' with NB_EMOJI_CLASSES classes receives the
+        pretrained emoji softmax weights, all other heads are left randomly
+        initialized. Head names should contain 'softmax' so that the 'last'
+        finetuning method leaves them unfrozen.
+
+    # Arguments:
+        heads: List of (name, nb_classes) tuples, one for each head.
+        maxlen: Maximum length of a sentence (given in tokens).
+        weight_path: Path to model weights to be loaded.
+        embed_dropout_rate: Dropout rate for the embedding layer.
+        final_dropout_rate: Dropout rate for the final Softmax layers.
+        embed_l2: L2 regularization for the embedding layerl.
+
+    # Returns:
+        Model with one output per head, in the order given.
+    """
+    model = deepmoji_multihead_architecture(heads, nb_tokens=NB_TOKENS,
+                                            maxlen=maxlen,
+                                            embed_dropout_rate=embed_dropout_rate,
+                                            final_dropout_rate=final_dropout_rate,
+                                            embed_l2=embed_l2)
+
+    if weight_path is not None:
+        exclude_names = []
+        if dict(heads).get('softmax') != NB_EMOJI_CLASSES:
+            exclude_names.append('softmax')
+        load_specific_weights(model, weight_path, exclude_names=exclude_names)
+    return model
+
+
+def deepmoji_multihead_architecture(heads, nb_tokens, maxlen, embed_dropout_rate=0, final_dropout_rate=0, embed_l2=1E-6):
+    """
+    Returns the Text architecture with a single shared encoder feeding
+    several task heads, uninitialized and without using the pretrained
+    model weights.
+
+    # Arguments:
+        heads: List of (name, nb_classes) tuples, one for each head.
+        nb_tokens: Number of tokens in the dataset (i.e. vocabulary size).
+        maxlen: Maximum length of a token.
+        embed_dropout_rate: Dropout rate for the embedding layer.
+        final_dropout_rate: Dropout rate for the final Softmax layers.
+        embed_l2: L2 regularization for the embedding layerl.
+
+    # Returns:
+        Model with one output per head, in the order given.
+    """
+    model_input = Input(shape=(maxlen,), dtype='int32')
+    x, _ = deepmoji_encoder(model_input, nb_tokens, maxlen,
+                            embed_dropout_rate=embed_dropout_rate,
+                            embed_l2=embed_l2)
+
+    outputs = []
+    for name, nb_classes in heads:
+        head_x = x
+        if final_dropout_rate != 0:
+            head_x = Dropout(final_dropout_rate, name='{}_dropout'.format(name))(head_x)
+
+        if nb_classes > 2:
+            outputs.append(Dense(nb_classes, activation='softmax', name=name)(head_x))
+        else:
+            outputs.append(Dense(1, activation='sigmoid', name=name)(head_x))
+
+    return Model(inputs=[model_input], outputs=outputs, name="Text")
+
+
+def deepmoji_inference_model(model, kept_tokens=None):
+    """ Converts a trained Text model into an inference-only model. The tanh
+        applied to every embedding lookup is folded into the embedding table
+        once, and the dropout layers are left out. The activation is computed
+        with NumPy, so no constant is added to the backend graph; predictions
+        match the original model up to float32 rounding.
+
+    # Arguments:
+        model: Model built by deepmoji_architecture or deepmoji_transfer.
+        kept_tokens: Optional sorted array of token ids (see
+            deepmoji.vocab_pruning). Only these rows of the embedding are
+            kept and the model expects the pruned token ids.
+
+    # Returns:
+        Inference-only model with the same input and output.
+    """
+    embedding_weights = model.get_layer(name='embedding').get_weights()[0]
+    if kept_tokens is not None:
+        embedding_weights = embedding_weights[kept_tokens]
+    softmax_kernel = model.get_layer(name='softmax').get_weights()[0]
+    nb_outputs = softmax_kernel.shape[1]
+
+    inference_model = deepmoji_architecture(nb_classes=nb_outputs if nb_outputs > 2 else 2,
+                                            nb_tokens=embedding_weights.shape[0],
+                                            maxlen=model.input_shape[1],
+                                            embed_l2=0,
+                                            activated_embedding=True)
+
+    for layer in inference_model.layers:
+        if not layer.weights:
+            continue
+        weight_values = model.get_layer(name=layer.name).get_weights()
+        if layer.name == 'embedding':
+            weight_values = [np.tanh(embedding_weights)]
+        layer.set_weights(weight_values)
+    return inference_model
+
+
 def load_specific_weights(model, weight_path, exclude_names=[], extend_embedding=0, verbose=True):
     """ Loads model weights from the given file path, excluding any
         given layers.
@@ -196,8 +338,10 @@ def load_specific_weights(model, weight_path, exclude_names=[], extend_embedding
                          'without loading the embedding weights.')
 
     # Copy only weights from the temporary model that are wanted
-    # for the specific task (e.g. the Softmax is often ignored)
-    layer_weights = get_weights_from_hdf5(weight_path)
+    # for the specific task (e.g. the Softmax is often ignored).
+    # The parsed file is shared by every model built in this process,
+    # call deepmoji.weights.release_weights to free it.
+    layer_weights = get_shared_weights(weight_path)
     for i, w in enumerate(layer_weights):
         l_name = w[0]
         weight_names = w[1]
@@ -246,21 +390,3 @@ def append_to_embedding(pretrain_weights, random_init_weights):
 
     # must be returned as a list to be properly inserted into Keras model
     return [random_init_weights]
-
-
-def get_weights_from_hdf5(filepath):
-    """ Loads the weights from a saved Keras model into numpy arrays.
-        The weights are saved using Keras 2.0 so we don't need all the
-        conversion functionality for handling old weights.
-    """
-
-    with h5py.File(filepath, mode='r') as f:
-        layer_names = [n.decode('utf8') for n in f.attrs['layer_names']]
-        layer_weights = []
-        for k, l_name in enumerate(layer_names):
-            g = f[l_name]
-            weight_names = [n.decode('utf8') for n in g.attrs['weight_names']]
-            weight_values = [g[weight_name][:] for weight_name in weight_names]
-            if len(weight_values):
-                layer_weights.append([l_name, weight_names, weight_values])
-        return layer_weights
@@ -0,0 +1,235 @@
+""" NumPy implementation of the Text model forward pass for inference.
+
+Mirrors deepmoji_architecture (embedding with tanh, two bidirectional LSTM
+layers, skip-connection, AttentionWeightedAverage and the output layer)
+including masking of padded timesteps, without importing Keras or
+Tensorflow.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+from deepmoji.weights import get_shared_weights
+from deepmoji.quantization import QuantizedArray, load_quantized_weights, dequantize
+
+ENCODER_LAYERS = ['embedding', 'bi_lstm_0', 'bi_lstm_1', 'attlayer']
+
+
+def hard_sigmoid(x):
+    """ Keras' hard_sigmoid, the default LSTM recurrent activation.
+    """
+    return np.clip(0.2 * x + 0.5, 0., 1.)
+
+
+def sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+def softmax(x):
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+def lstm_forward(x, mask, kernel, recurrent_kernel, bias,
+                 recurrent_activation=hard_sigmoid, go_backwards=False):
+    """ Runs a Keras LSTM layer with return_sequences=True.
+
+    # Arguments:
+        x: Inputs of shape (batch, timesteps, features).
+        mask: Boolean mask of shape (batch, timesteps).
+        kernel, recurrent_kernel, bias: Keras LSTM weights, gates ordered
+            as input, forget, cell, output.
+        recurrent_activation: Activation of the gates.
+        go_backwards: Process the sequence in reverse (backward direction
+            of a Bidirectional layer). Outputs are returned in input order.
+
+    # Returns:
+        Outputs of shape (batch, timesteps, units). Masked timesteps repeat
+        the previous output and leave the state unchanged, as in Keras.
+    """
+    batch_size, timesteps, _ = x.shape
+    units = recurrent_kernel.shape[0]
+
+    # Input projections for all timesteps at once
+    x_proj = np.dot(x, kernel) + bias
+    h = np.zeros((batch_size, units), dtype=x_proj.dtype)
+    c = np.zeros((batch_size, units), dtype=x_proj.dtype)
+    outputs = np.zeros((batch_size, timesteps, units), dtype=x_proj.dtype)
+
+    steps = range(timesteps - 1, -1, -1) if go_backwards else range(timesteps)
+    for t in steps:
+        z = x_proj[:, t] + np.dot(h, recurrent_kernel)
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        c_new = f * c + i * np.tanh(z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        h_new = o * np.tanh(c_new)
+
+        m = mask[:, t][:, None]
+        h = np.where(m, h_new, h)
+        c = np.where(m, c_new, c)
+        outputs[:, t] = h
+    return outputs
+
+
+def attention_forward(x, mask, W):
+    """ Runs the AttentionWeightedAverage layer.
+
+    # Returns:
+        Weighted average over timesteps of shape (batch, features),
+        attention weights of shape (batch, timesteps).
+    """
+    logits = np.dot(x, W)[:, :, 0]
+    ai = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+    ai = ai * mask
+    att_weights = ai / np.sum(ai, axis=1, keepdims=True)
+    return np.sum(x * att_weights[:, :, None], axis=1), att_weights
+
+
+class NumpyDeepMoji():
+    """ Inference-only Text model running on NumPy.
+        Has the same predict() interface as the Keras model.
+    """
+    def __init__(self, layer_weights, output_name='softmax',
+                 recurrent_activation=hard_sigmoid, activated_embedding=False):
+        """ Needs the layer weights as a dictionary of layer name to list of
+            arrays, in the order Keras stores them.
+
+        # Arguments:
+            layer_weights: Dictionary of layer name to list of weight arrays.
+            output_name: Name of the output layer, None to return the
+                penultimate feature vector (as deepmoji_feature_encoding).
+            recurrent_activation: LSTM gate activation, Keras 2.0 uses
+                hard_sigmoid by default.
+            activated_embedding: If True, the embedding table already holds
+                tanh-activated vectors.
+
+            The embedding may be a QuantizedArray, it is then kept in int8
+            and only the looked up rows are dequantized.
+        """
+        missing = [name for name in ENCODER_LAYERS if name not in layer_weights]
+        if output_name is not None and output_name not in layer_weights:
+            missing.append(output_name)
+        if missing:
+            raise ValueError('ERROR (NumpyDeepMoji): Weights are missing '
+                             'for layers {}.'.format(missing))
+
+        # The tanh is a per-token function of the weights, so it is applied
+        # to the whole table once instead of on every lookup
+        self.embedding = layer_weights['embedding'][0]
+        self.activated_embedding = activated_embedding
+        if not activated_embedding and not isinstance(self.embedding, QuantizedArray):
+            self.embedding = np.tanh(self.embedding)
+            self.activated_embedding = True
+        self.lstm_0 = layer_weights['bi_lstm_0']
+        self.lstm_1 = layer_weights['bi_lstm_1']
+        self.attention = layer_weights['attlayer'][0]
+        self.output_name = output_name
+        self.output_weights = (layer_weights[output_name]
+                               if output_name is not None else None)
+        self.recurrent_activation = recurrent_activation
+
+    @classmethod
+    def from_hdf5(cls, weight_path, output_name='softmax', **kwargs):
+        """ Loads weights straight from a Keras weight or model file, through
+            the process-level weight store. The store keeps the raw embedding
+            next to the activated copy of this model, call
+            deepmoji.weights.release_weights(weight_path) once every model
+            needed is built.
+        """
+        layer_weights = {l_name: weight_values for l_name, _, weight_values
+                         in get_shared_weights(weight_path)}
+        return cls(layer_weights, output_name=output_name, **kwargs)
+
+    @classmethod
+    def from_quantized(cls, path, output_name='softmax', **kwargs):
+        """ Loads weights written by deepmoji.quantization.quantize_hdf5.
+            An int8 embedding stays quantized, all other weights are
+            dequantized to float32.
+        """
+        layer_weights = {}
+        for l_name, _, weight_values in load_quantized_weights(path, dequantize_weights=False):
+            if l_name != 'embedding':
+                weight_values = [dequantize(w) for w in weight_values]
+            layer_weights[l_name] = weight_values
+        return cls(layer_weights, output_name=output_name, **kwargs)
+
+    def get_weights(self):
+        """ Returns all weight arrays (without copying). The embedding is
+            returned tanh-activated unless it is quantized.
+        """
+        weights = [self.embedding] + list(self.lstm_0) + list(self.lstm_1) + [self.attention]
+        if self.output_weights is not None:
+            weights.extend(self.output_weights)
+        return weights
+
+    def embed(self, tokens):
+        """ Embedding lookup in the tanh-activated table.
+        """
+        if isinstance(self.embedding, QuantizedArray):
+            x = self.embedding.take(tokens)
+            return x if self.activated_embedding else np.tanh(x)
+        return self.embedding[tokens]
+
+    def bidirectional(self, x, mask, weights):
+        forward = lstm_forward(x, mask, *weights[:3],
+                               recurrent_activation=self.recurrent_activation)
+        backward = lstm_forward(x, mask, *weights[3:],
+                                recurrent_activation=self.recurrent_activation,
+                                go_backwards=True)
+        return np.concatenate([forward, backward], axis=-1)
+
+    def encode(self, tokens, return_attention=False):
+        """ Transforms token ids into the penultimate feature vector.
+
+        # Arguments:
+            tokens: Integer array of shape (batch, maxlen), 0 is masked.
+            return_attention: If true, also return the attention weights.
+
+        # Returns:
+            Feature array of shape (batch, 2304).
+        """
+        tokens = np.asarray(tokens)
+        mask = tokens != 0
+
+        # Padding after the longest sentence is masked everywhere and does
+        # not change the output, so it is not computed
+        lengths = np.sum(mask, axis=1)
+        maxlen = max(int(np.max(lengths)) if len(lengths) else 0, 1)
+        tokens = tokens[:, :maxlen]
+        mask = mask[:, :maxlen]
+
+        x = self.embed(tokens)
+        lstm_0_output = self.bidirectional(x, mask, self.lstm_0)
+        lstm_1_output = self.bidirectional(lstm_0_output, mask, self.lstm_1)
+        x = np.concatenate([lstm_1_output, lstm_0_output, x], axis=-1)
+
+        features, att_weights = attention_forward(x, mask, self.attention)
+        if return_attention:
+            return features, att_weights
+        return features
+
+    def predict(self, tokens, batch_size=32, **kwargs):
+        """ Returns class probabilities like Model.predict, or the feature
+            vector if the model has no output layer.
+        """
+        tokens = np.asarray(tokens)
+        results = []
+        for start in range(0, len(tokens), batch_size):
+            features = self.encode(tokens[start:start + batch_size])
+            if self.output_weights is None:
+                results.append(features)
+                continue
+
+            kernel, bias = self.output_weights
+            logits = np.dot(features, kernel) + bias
+            if kernel.shape[1] > 1:
+                results.append(softmax(logits))
+            else:
+                results.append(sigmoid(logits))
+
+        if not results:
+            width = (self.output_weights[0].shape[1] if self.output_weights is not None
+                     else self.attention.shape[0])
+            return np.zeros((0, width), dtype=self.attention.dtype)
+        return np.concatenate(results, axis=0)
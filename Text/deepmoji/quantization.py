@@ -0,0 +1,255 @@
+""" Compact float16 / int8 storage of model weights.
+
+Quantized weights are saved as .npz files next to the Keras model files.
+Arrays below a minimum size (biases, attention vector, small heads) are kept
+in float32. In int8 mode every row of the embedding gets its own scale, so an
+embedding lookup only dequantizes the rows it reads, and every output column
+of the other kernels gets its own scale.
+
+Only the NumPy engine (deepmoji.numpy_model) keeps int8 weights in memory.
+Keras layers need float32 weights, so load_quantized_keras_model dequantizes
+everything at load time: the Keras path gets a smaller file, not a smaller
+process.
+"""
+
+from __future__ import print_function, division
+
+import json
+import os
+
+import h5py
+import numpy as np
+from deepmoji.weights import get_weights_from_hdf5
+
+QUANTIZATION_MODES = ['float16', 'int8']
+
+# Arrays with fewer elements are not worth quantizing
+MIN_QUANTIZE_SIZE = 4096
+
+# Layers whose int8 scales are per row (one per token) instead of per column
+ROW_SCALED_LAYERS = ['embedding']
+
+
+class QuantizedArray():
+    """ Int8 array with a float32 scale broadcast along one axis.
+    """
+    def __init__(self, values, scale):
+        self.values = values
+        self.scale = scale
+
+    @classmethod
+    def quantize(cls, array, axis=-1):
+        """ Quantizes an array to int8 with one scale per entry of `axis`.
+
+        # Arguments:
+            array: Float array.
+            axis: Axis along which the scale varies. The scale is the
+                maximum absolute value over all other axes divided by 127.
+
+        # Returns:
+            QuantizedArray.
+        """
+        array = np.asarray(array, dtype='float32')
+        axis = axis % array.ndim
+        reduce_axes = tuple(a for a in range(array.ndim) if a != axis)
+        scale = np.max(np.abs(array), axis=reduce_axes, keepdims=True) / 127.
+        scale[scale == 0] = 1.
+        values = np.clip(np.round(array / scale), -127, 127).astype('int8')
+        return cls(values, scale.astype('float32'))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def size(self):
+        return self.values.size
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.scale.nbytes
+
+    def dequantize(self, dtype='float32'):
+        return (self.values * self.scale).astype(dtype)
+
+    def take(self, indices):
+        """ Dequantized rows (first axis) at `indices`, without dequantizing
+            the rest of the array.
+        """
+        scale = self.scale if self.scale.shape[0] == 1 else self.scale[indices]
+        return self.values[indices] * scale
+
+
+def dequantize(array, dtype='float32'):
+    """ Turns a stored array back into a plain float array.
+    """
+    if isinstance(array, QuantizedArray):
+        return array.dequantize(dtype)
+    return np.asarray(array, dtype=dtype)
+
+
+def quantize_array(array, mode, axis=-1, min_size=MIN_QUANTIZE_SIZE):
+    """ Quantizes one weight array.
+
+    # Arguments:
+        array: Float array.
+        mode: 'float16' or 'int8'.
+        axis: Axis of the int8 scales.
+        min_size: Arrays with fewer elements are kept in float32.
+
+    # Returns:
+        float16/float32 array or QuantizedArray.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError('ERROR (quantize): Mode must be one of {}, got {}.'
+                         .format(QUANTIZATION_MODES, mode))
+    array = np.asarray(array)
+    if array.size < min_size or not np.issubdtype(array.dtype, np.floating):
+        return array
+    if mode == 'float16':
+        return array.astype('float16')
+    # Vectors and 1D arrays have no meaningful row/column split
+    if array.ndim < 2:
+        return array
+    return QuantizedArray.quantize(array, axis=axis)
+
+
+def quantize_weights(layer_weights, mode, min_size=MIN_QUANTIZE_SIZE):
+    """ Quantizes weights in the format returned by get_weights_from_hdf5.
+
+    # Returns:
+        List of [layer name, weight names, weight values], where the values
+        are float16/float32 arrays or QuantizedArray objects.
+    """
+    quantized = []
+    for l_name, weight_names, weight_values in layer_weights:
+        axis = 0 if l_name in ROW_SCALED_LAYERS else -1
+        quantized.append([l_name, weight_names,
+                          [quantize_array(w, mode, axis=axis, min_size=min_size)
+                           for w in weight_values]])
+    return quantized
+
+
+def quantized_path(model_path, mode):
+    """ Path of the quantized weights belonging to a Keras model file,
+        e.g. twitter_ss.hdf5 -> twitter_ss.int8.npz.
+    """
+    return '{}.{}.npz'.format(os.path.splitext(model_path)[0], mode)
+
+
+def save_quantized_weights(path, layer_weights, mode, model_config=None):
+    """ Saves quantized weights to an .npz file.
+
+    # Arguments:
+        path: Target .npz file.
+        layer_weights: Output of quantize_weights.
+        mode: Quantization mode, stored in the metadata.
+        model_config: Keras model JSON, needed to rebuild a Keras model with
+            load_quantized_keras_model.
+    """
+    arrays = {}
+    layers = []
+    for l_name, weight_names, weight_values in layer_weights:
+        layers.append([l_name, weight_names])
+        for i, w in enumerate(weight_values):
+            key = '{}/{}'.format(l_name, i)
+            if isinstance(w, QuantizedArray):
+                arrays[key + '/values'] = w.values
+                arrays[key + '/scale'] = w.scale
+            else:
+                arrays[key] = w
+    metadata = {'mode': mode, 'layers': layers, 'model_config': model_config}
+    arrays['metadata'] = np.array(json.dumps(metadata))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def read_quantized_metadata(path):
+    """ Returns the metadata dictionary (mode, layers, model_config) of a
+        quantized weight file.
+    """
+    with np.load(path) as data:
+        return json.loads(str(data['metadata']))
+
+
+def load_quantized_weights(path, dequantize_weights=True):
+    """ Loads weights saved by save_quantized_weights.
+
+    # Arguments:
+        path: Quantized .npz file.
+        dequantize_weights: If True, all arrays are returned as float32.
+            Otherwise int8 arrays are returned as QuantizedArray and float16
+            arrays stay float16.
+
+    # Returns:
+        List of [layer name, weight names, weight values], the same format
+        as get_weights_from_hdf5.
+    """
+    with np.load(path) as data:
+        metadata = json.loads(str(data['metadata']))
+        layer_weights = []
+        for l_name, weight_names in metadata['layers']:
+            weight_values = []
+            for i in range(len(weight_names)):
+                key = '{}/{}'.format(l_name, i)
+                if key in data:
+                    w = data[key]
+                else:
+                    w = QuantizedArray(data[key + '/values'], data[key + '/scale'])
+                weight_values.append(dequantize(w) if dequantize_weights else w)
+            layer_weights.append([l_name, weight_names, weight_values])
+    return layer_weights
+
+
+def _read_model_config(filepath):
+    with h5py.File(filepath, mode='r') as f:
+        config = f.attrs.get('model_config')
+    if isinstance(config, bytes):
+        config = config.decode('utf8')
+    return config
+
+
+def quantize_hdf5(model_path, mode, target_path=None, min_size=MIN_QUANTIZE_SIZE):
+    """ Quantizes the weights of a saved Keras model file.
+
+    # Arguments:
+        model_path: Keras model or weight file.
+        mode: 'float16' or 'int8'.
+        target_path: Defaults to quantized_path(model_path, mode).
+        min_size: Arrays with fewer elements are kept in float32.
+
+    # Returns:
+        Path of the quantized file.
+    """
+    if target_path is None:
+        target_path = quantized_path(model_path, mode)
+    layer_weights = quantize_weights(get_weights_from_hdf5(model_path), mode, min_size)
+    save_quantized_weights(target_path, layer_weights, mode,
+                           model_config=_read_model_config(model_path))
+    return target_path
+
+
+def load_quantized_keras_model(path, custom_objects=None):
+    """ Rebuilds the Keras model stored in a quantized weight file and sets
+        the dequantized weights. The model is not compiled. All weights are
+        float32 again once loaded, so the model uses as much memory as the
+        unquantized one; only the file on disk is smaller.
+
+    # Arguments:
+        path: Quantized .npz file written by quantize_hdf5 from a full model
+            file (model.save).
+        custom_objects: Passed on to model_from_json.
+
+    # Returns:
+        Keras model.
+    """
+    from keras.models import model_from_json
+
+    config = read_quantized_metadata(path)['model_config']
+    if config is None:
+        raise ValueError('ERROR (load_quantized_keras_model): {} was created '
+                         'from a weight file and has no model config.'.format(path))
+    model = model_from_json(config, custom_objects=custom_objects)
+    for l_name, _, weight_values in load_quantized_weights(path):
+        model.get_layer(name=l_name).set_weights(weight_values)
+    return model
@@ -0,0 +1,84 @@
+""" Pruning of the vocabulary and embedding table to the tokens a domain uses.
+
+The kept tokens are the special tokens plus the most used tokens of a
+tokenized corpus. Kept tokens get new consecutive ids in their original
+order, so the special tokens keep their ids and every other token maps to
+CUSTOM_UNKNOWN.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+from deepmoji.global_variables import SPECIAL_TOKENS
+
+
+def count_token_usage(tokens, nb_tokens):
+    """ Counts how often every token id occurs in a tokenized dataset.
+
+    # Arguments:
+        tokens: Tokenized dataset, padding (0) is not counted.
+        nb_tokens: Size of the vocabulary.
+
+    # Returns:
+        Array of counts of length nb_tokens.
+    """
+    tokens = np.asarray(tokens).ravel()
+    counts = np.bincount(tokens[tokens != 0].astype('int64'), minlength=nb_tokens)
+    return counts[:nb_tokens]
+
+
+def select_kept_tokens(counts, top_k):
+    """ Selects the special tokens and the top_k most used other tokens.
+
+    # Arguments:
+        counts: Output of count_token_usage.
+        top_k: Number of non-special tokens to keep. Tokens that never occur
+            are not kept even if fewer than top_k tokens are used.
+
+    # Returns:
+        Sorted array of kept token ids.
+    """
+    nb_special = len(SPECIAL_TOKENS)
+    counts = np.asarray(counts)[nb_special:]
+    # Stable sort so ties are broken by token id (more frequent in the
+    # pretraining corpus)
+    order = np.argsort(-counts, kind='mergesort')[:top_k]
+    order = order[counts[order] > 0]
+    return np.concatenate([np.arange(nb_special), np.sort(order) + nb_special]).astype('int64')
+
+
+def build_remap(kept_tokens, nb_tokens, unknown_value=1):
+    """ Lookup table from original token ids to pruned token ids.
+
+    # Returns:
+        Array of length nb_tokens, tokens that are not kept map to
+        unknown_value.
+    """
+    remap = np.full(nb_tokens, unknown_value, dtype='uint16')
+    remap[kept_tokens] = np.arange(len(kept_tokens))
+    return remap
+
+
+def prune_vocabulary(vocabulary, kept_tokens):
+    """ Vocabulary with only the kept words, mapped to the pruned ids.
+        Tokenizing with it gives the same result as applying build_remap
+        to the tokens of the full vocabulary.
+
+    # Arguments:
+        vocabulary: Dictionary of word to token id.
+        kept_tokens: Output of select_kept_tokens.
+
+    # Returns:
+        Dictionary of word to pruned token id.
+    """
+    new_ids = {old_id: new_id for new_id, old_id in enumerate(kept_tokens)}
+    return {word: new_ids[i] for word, i in vocabulary.items() if i in new_ids}
+
+
+def kept_tokens_from_vocabulary(vocabulary, pruned_vocabulary):
+    """ Recovers the kept original token ids from a pruned vocabulary.
+    """
+    kept = np.zeros(len(pruned_vocabulary), dtype='int64')
+    for word, new_id in pruned_vocabulary.items():
+        kept[new_id] = vocabulary[word]
+    return kept
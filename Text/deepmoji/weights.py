@@ -0,0 +1,118 @@
+""" Loading of model weights from hdf5 files without importing Keras.
+"""
+
+import os
+import threading
+
+import h5py
+
+
+def _decode(name):
+    return name.decode('utf8') if isinstance(name, bytes) else name
+
+
+def get_weights_from_hdf5(filepath):
+    """ Loads the weights from a saved Keras model into numpy arrays.
+        The weights are saved using Keras 2.0 so we don't need all the
+        conversion functionality for handling old weights.
+
+        Works both for weight files (model.save_weights) and for full
+        model files (model.save), which keep the weights in 'model_weights'.
+    """
+
+    with h5py.File(filepath, mode='r') as f:
+        if 'layer_names' not in f.attrs and 'model_weights' in f:
+            f = f['model_weights']
+        layer_names = [_decode(n) for n in f.attrs['layer_names']]
+        layer_weights = []
+        for k, l_name in enumerate(layer_names):
+            g = f[l_name]
+            weight_names = [_decode(n) for n in g.attrs['weight_names']]
+            weight_values = [g[weight_name][:] for weight_name in weight_names]
+            if len(weight_values):
+                layer_weights.append([l_name, weight_names, weight_values])
+        return layer_weights
+
+
+class WeightStore():
+    """ Process-level cache of parsed weight files. Each file is read once
+        and every model built from it in the process shares the arrays, which
+        are made read-only so that no caller can change them for the others.
+        A file that is rewritten (different size or modification time) is
+        read again.
+    """
+    def __init__(self):
+        self._weights = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.hits = 0
+
+    def _key(self, filepath):
+        stat = os.stat(filepath)
+        return os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns
+
+    def get(self, filepath):
+        """ Returns the weights of a file in the format of
+            get_weights_from_hdf5, reading the file on first use.
+        """
+        key = self._key(filepath)
+        with self._lock:
+            if key in self._weights:
+                self.hits += 1
+                return self._weights[key]
+
+            layer_weights = get_weights_from_hdf5(filepath)
+            for _, _, weight_values in layer_weights:
+                for w in weight_values:
+                    w.flags.writeable = False
+            # Drop stale versions of the same file
+            for old_key in [k for k in self._weights if k[0] == key[0]]:
+                del self._weights[old_key]
+            self._weights[key] = layer_weights
+            self.reads += 1
+            return layer_weights
+
+    def release(self, filepath=None):
+        """ Drops the cached weights of one file, or of all files if
+            filepath is None. Models already built keep their own copies.
+
+        # Returns:
+            Number of bytes released.
+        """
+        with self._lock:
+            if filepath is None:
+                keys = list(self._weights)
+            else:
+                path = os.path.abspath(filepath)
+                keys = [k for k in self._weights if k[0] == path]
+            released = 0
+            for key in keys:
+                released += sum(w.nbytes for _, _, weight_values in self._weights.pop(key)
+                                for w in weight_values)
+            return released
+
+    def nbytes(self):
+        """ Number of bytes held by the store.
+        """
+        with self._lock:
+            return sum(w.nbytes for layer_weights in self._weights.values()
+                       for _, _, weight_values in layer_weights for w in weight_values)
+
+
+WEIGHT_STORE = WeightStore()
+
+
+def get_shared_weights(filepath):
+    """ Weights of a file from the process-level WEIGHT_STORE.
+    """
+    return WEIGHT_STORE.get(filepath)
+
+
+def release_weights(filepath=None):
+    """ Frees the weights of one file (or all files) held by WEIGHT_STORE,
+        e.g. once a long-running trainer has built its models.
+
+    # Returns:
+        Number of bytes released.
+    """
+    return WEIGHT_STORE.release(filepath)
@@ -1,9 +1,42 @@
-from keras.models import load_model
+from keras.models import load_model, Model
+from keras.layers import Input, Average
 import json
+import threading
+import time
+import weakref
+import zlib
+import numpy as np
+from collections import OrderedDict, deque
 from deepmoji.attlayer import AttentionWeightedAverage
 from deepmoji.sentence_tokenizer import SentenceTokenizer
 from deepmoji.global_variables import VOCAB_PATH
 
+TWITTER_MODEL_PATH = 'Text/sentiment/finetuned/twitter_ss.hdf5'
+YOUTUBE_MODEL_PATH = 'Text/sentiment/finetuned/youtube_ss.hdf5'
+ENSEMBLE_MODEL_PATH = 'Text/sentiment/finetuned/ensemble_ss.hdf5'
+
+# Ensemble and vocabulary pruned to the tokens used by our chat domain, see prune_vocabulary.py
+PRUNED_ENSEMBLE_MODEL_PATH = 'Text/sentiment/finetuned/ensemble_ss.pruned.hdf5'
+PRUNED_VOCAB_PATH = 'Text/model/vocabulary_pruned.json'
+
+# Frozen inference-only ensemble written by freeze_models.py, memory-mapped at load
+FROZEN_ENSEMBLE_PATH = 'Text/sentiment/finetuned/ensemble_ss.frozen'
+
+# Model files the frozen ensemble is exported from, it is stale once any of them changes
+FROZEN_ENSEMBLE_SOURCES = [ENSEMBLE_MODEL_PATH, TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]
+
+# Output semantics stored in the frozen artifact
+TEXT_OUTPUT = 'probability of positive sentiment, averaged over the ensemble members'
+
+# Sequence lengths used to batch chat lines of similar token length together
+TEXT_BUCKETS = (8, 16, 30)
+
+# Number of token sequences whose ensemble score is kept in memory
+TEXT_CACHE_SIZE = 10000
+
+# Number of recent score() timings kept by a scorer
+BATCH_TIMES_SIZE = 1000
+
 
 def modify_range(val):
     """
@@ -14,31 +47,538 @@ def modify_range(val):
     return (val * 2) - 1
 
 
-def load_finetuned_models():
+def model_maxlen(model, default=None):
+    """
+    Read the fixed token length a Keras model was built with
+    :param model:
+    :param default: returned if the model input has no fixed length
+    :return: maxlen
+    """
+    try:
+        maxlen = model.input_shape[1]
+    except (AttributeError, IndexError, TypeError):
+        return default
+    return maxlen if maxlen is not None else default
+
+
+def resize_model_input(model, maxlen):
+    """
+    Build a view of a Keras model for a different token length
+    The layers of model are called on a new input, so the view shares their weight variables
+    instead of holding a copy of the ensemble weights
+    Masked timesteps do not change the DeepMoji output, so trimming padding is lossless
+    :param model:
+    :param maxlen: new token length
+    :return: Keras model
+    """
+    # Embedding layers report their build length as output length, unset it while calling them
+    embeddings = [layer for layer in _iter_layers(model) if getattr(layer, 'input_length', None) is not None]
+    input_lengths = [layer.input_length for layer in embeddings]
+    for layer in embeddings:
+        layer.input_length = None
+    try:
+        model_input = Input(shape=(maxlen,), dtype='int32')
+        resized = Model(inputs=[model_input], outputs=model(model_input),
+                        name='{}_{}'.format(model.name, maxlen))
+    finally:
+        for layer, input_length in zip(embeddings, input_lengths):
+            layer.input_length = input_length
+    return resized
+
+
+def bucket_rows(tokens, buckets, masking_value=0):
+    """
+    Group the rows of a padded token matrix into length buckets
+    Rows are sorted by their true (unpadded) length before grouping
+    :param tokens: token matrix of shape (n_sentences, maxlen)
+    :param buckets: bucket sequence lengths, rows longer than every bucket use the full maxlen
+    :param masking_value: padding token
+    :return: list of (bucket_length, row_indexes)
+    """
+    maxlen = tokens.shape[1]
+    bucket_lengths = sorted(b for b in buckets if b < maxlen) + [maxlen]
+
+    lengths = np.sum(tokens != masking_value, axis=1)
+    order = np.argsort(lengths, kind='stable')
+    bucket_indexes = np.searchsorted(bucket_lengths, lengths[order])
+
+    groups = []
+    for b, bucket_length in enumerate(bucket_lengths):
+        rows = order[bucket_indexes == b]
+        if len(rows):
+            groups.append((bucket_length, rows))
+    return groups
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used mapping with hit/miss/eviction counters
+    Safe to share between threads, e.g. the executor of serve.py and the modality threads of
+    get_sentiments(concurrent=True)
+    """
+
+    def __init__(self, capacity):
+        """
+        :param capacity: maximum number of entries kept
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Return the cached value and mark it as most recently used
+        :param key:
+        :param default: returned on a miss
+        :return: value
+        """
+        with self._lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store value, evicting the least recently used entries above capacity
+        :param key:
+        :param value:
+        """
+        with self._lock:
+            self.entries.pop(key, None)
+            self.entries[key] = value
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        :return: dict of size, capacity, hits, misses and evictions
+        """
+        with self._lock:
+            return {'size': len(self.entries), 'capacity': self.capacity, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+
+def _iter_layers(model):
+    for layer in model.layers:
+        if hasattr(layer, 'layers'):
+            yield from _iter_layers(layer)
+        else:
+            yield layer
+
+
+def _iter_models(model):
+    yield model
+    for layer in getattr(model, 'layers', []):
+        if hasattr(layer, 'layers'):
+            yield from _iter_models(layer)
+
+
+def weights_fingerprint(models):
+    """
+    Checksum of the ensemble members and all of their weights, used to invalidate cached scores
+    Every weight is read, so this is only computed at load time and by explicit checks
+    :param models: list of Keras models or NumpyDeepMoji engines
+    :return: checksum
+    """
+    checksum = 0
+    for model in models:
+        checksum = zlib.crc32(str(id(model)).encode(), checksum)
+        for weights in model.get_weights():
+            checksum = zlib.crc32(np.ascontiguousarray(weights).tobytes(), checksum)
+    return checksum
+
+
+class TextSentimentScorer:
+    """
+    Long-lived text scoring engine
+    Owns the parsed vocabulary, the tokenizers and the model ensemble so that per-call
+    work is limited to tokenizing and predicting.
+    Members are grouped by their (vocabulary, maxlen) signature and each distinct token
+    matrix is built once per batch and shared by every member that accepts it.
+    If buckets are given, rows are grouped by true length and each group is run at its
+    own sequence length instead of always paying for maxlen LSTM timesteps.
+    If cache_size is given, scores are cached on the token id sequences, so texts that only
+    differ in case, elongation or variation selectors share one entry. The weights are
+    fingerprinted once when the members are added; deepmoji finetune/finetune_multihead
+    invalidate the cache of the scorers using the finetuned model, call invalidate() after
+    changing weights in any other way, e.g. set_weights or load_weights
+    """
+
+    def __init__(self, models, vocabulary=None, maxlen=30, buckets=None, cache_size=None,
+                 source_paths=None):
+        """
+        :param models: list of Keras models, predictions are averaged
+        :param vocabulary: parsed vocabulary, loaded from VOCAB_PATH if None
+        :param maxlen: token length for models whose input length cannot be inferred
+        :param buckets: bucket sequence lengths, e.g. TEXT_BUCKETS; None disables bucketing
+        :param cache_size: number of cached token sequences, e.g. TEXT_CACHE_SIZE; None disables caching
+        :param source_paths: files the models and vocabulary were loaded from, used to key the
+                             persistent sentiment cache
+        """
+        start = time.perf_counter()
+        self.source_paths = list(source_paths or [])
+        if vocabulary is None:
+            with open(VOCAB_PATH, 'r') as f:
+                vocabulary = json.load(f)
+            self.source_paths.append(VOCAB_PATH)
+        self.vocabulary = vocabulary
+        self.maxlen = maxlen
+        self.models = []
+        self.signatures = []
+        self.tokenizers = {}
+        self.buckets = buckets
+        self.bucket_models = {}
+        for model in models:
+            self.add_model(model)
+        # SentenceTokenizer of the shared vocabulary and maxlen
+        self._tokenizer_key = self._signature(vocabulary, maxlen)
+        self.tokenizer = self.tokenizers[self._tokenizer_key]
+        self.cache = LRUCache(cache_size) if cache_size else None
+        self.fingerprint = None
+        if self.cache is not None:
+            self.check_weights()
+        self.setup_time = time.perf_counter() - start
+        self.batch_times = deque(maxlen=BATCH_TIMES_SIZE)
+
+    def __len__(self):
+        return len(self.models)
+
+    def __getitem__(self, index):
+        # Keep indexing working for callers that treat the ensemble as a list of models
+        return self.models[index]
+
+    @property
+    def last_batch_time(self):
+        return self.batch_times[-1] if self.batch_times else None
+
+    def _signature(self, vocabulary, maxlen):
+        """
+        Create the tokenizer of a (vocabulary, maxlen) pair on first use
+        :return: signature the tokenizer is stored under in self.tokenizers
+        """
+        signature = (id(vocabulary), maxlen)
+        if signature not in self.tokenizers:
+            self.tokenizers[signature] = SentenceTokenizer(vocabulary, maxlen)
+        return signature
+
+    def add_model(self, model, vocabulary=None, maxlen=None):
+        """
+        Add an ensemble member
+        :param model: Keras model
+        :param vocabulary: vocabulary the model was trained with, defaults to the shared one
+        :param maxlen: token length, inferred from the model input if None
+        """
+        if vocabulary is None:
+            vocabulary = self.vocabulary
+        if maxlen is None:
+            maxlen = model_maxlen(model, self.maxlen)
+        self.models.append(model)
+        self.signatures.append(self._signature(vocabulary, maxlen))
+        # Cached scores are checked against the new ensemble before the next cached score
+        self.fingerprint = None
+        # Let finetuning of the member, or of a model nested in it, invalidate the cache
+        for member in _iter_models(model):
+            if not hasattr(member, 'weights_changed_callbacks'):
+                member.weights_changed_callbacks = []
+            member.weights_changed_callbacks.append(weakref.WeakMethod(self.invalidate))
+
+    def tokenize(self, texts):
+        """
+        Tokenize texts once per distinct (vocabulary, maxlen) signature used by the members
+        :param texts:
+        :return: dict of signature -> token matrix
+        """
+        tokenized = {}
+        for signature in self.signatures:
+            if signature not in tokenized:
+                tokenized[signature], _, _ = self.tokenizers[signature].tokenize_sentences(texts)
+        return tokenized
+
+    def _bucket_model(self, index, length):
+        if not hasattr(self.models[index], 'get_config'):
+            # NumpyDeepMoji accepts any token length
+            return self.models[index]
+        key = (index, length)
+        if key not in self.bucket_models:
+            self.bucket_models[key] = resize_model_input(self.models[index], length)
+        return self.bucket_models[key]
+
+    def predict(self, index, tokens):
+        """
+        Run one ensemble member on a token matrix, bucketed by length if enabled
+        Results are returned in input order
+        :param index: member index
+        :param tokens: token matrix
+        :return: predictions
+        """
+        model = self.models[index]
+        if not self.buckets or len(tokens) == 0:
+            return model.predict(tokens)
+
+        predictions = None
+        for length, rows in bucket_rows(tokens, self.buckets):
+            bucket_model = model if length == tokens.shape[1] else self._bucket_model(index, length)
+            bucket_predictions = bucket_model.predict(tokens[rows, :length])
+            if predictions is None:
+                predictions = np.zeros((len(tokens),) + bucket_predictions.shape[1:],
+                                       dtype=bucket_predictions.dtype)
+            predictions[rows] = bucket_predictions
+        return predictions
+
+    def invalidate(self):
+        """
+        Drop all cached scores, the weights are fingerprinted again before the next cached score
+        """
+        if self.cache is not None:
+            self.cache.clear()
+        self.fingerprint = None
+
+    def check_weights(self):
+        """
+        Clear the cache if the ensemble members or their weights changed since the last check
+        The weights are fingerprinted when the members are added, call this after changing
+        them in place, e.g. after finetuning or load_weights
+        """
+        fingerprint = weights_fingerprint(self.models)
+        if fingerprint != self.fingerprint:
+            if self.cache is not None:
+                self.cache.clear()
+            self.fingerprint = fingerprint
+
+    def _score_tokens(self, tokenized):
+        predictions = [self.predict(i, tokenized[signature])
+                       for i, signature in enumerate(self.signatures)]
+        average_predictions = sum(predictions) / len(predictions)
+        return [modify_range(prediction)[0] for prediction in average_predictions]
+
+    def _score_cached(self, tokenized, n_texts):
+        if self.fingerprint is None:
+            self.check_weights()
+        keys = [tuple(tokens[i].tobytes() for tokens in tokenized.values()) for i in range(n_texts)]
+
+        scores = [self.cache.get(key) for key in keys]
+        missing = OrderedDict()
+        for i, key in enumerate(keys):
+            if scores[i] is None and key not in missing:
+                missing[key] = i
+
+        if missing:
+            rows = list(missing.values())
+            missing_scores = self._score_tokens({signature: tokens[rows]
+                                                 for signature, tokens in tokenized.items()})
+            new_scores = dict(zip(missing, missing_scores))
+            for key, score in new_scores.items():
+                self.cache.put(key, score)
+            scores = [new_scores[key] if score is None else score for key, score in zip(keys, scores)]
+        return scores
+
+    def score(self, texts):
+        """
+        Get sentiment scores for list of texts
+        :param texts:
+        :return: average_sentiment_prediction in range -1, 1
+        """
+        if len(texts) == 0:
+            return []
+        start = time.perf_counter()
+        tokenized = self.tokenize(texts)
+
+        if self.cache is None:
+            average_sentiment_prediction = self._score_tokens(tokenized)
+        else:
+            average_sentiment_prediction = self._score_cached(tokenized, len(texts))
+
+        self.batch_times.append(time.perf_counter() - start)
+        return average_sentiment_prediction
+
+
+def build_ensemble_model(models, maxlen=30):
+    """
+    Wrap ensemble members in a single Keras model with a shared input and an averaging output
+    so that one predict call per batch returns the final probability
+    :param models: list of Keras models accepting a (maxlen,) int token input
+    :param maxlen: token length of the shared input
+    :return: Keras model
+    """
+    model_input = Input(shape=(maxlen,), dtype='int32')
+    outputs = []
+    for i, model in enumerate(models):
+        # DeepMoji models are all named "Text", layer names must be unique inside the ensemble
+        model.name = 'member_{}'.format(i)
+        outputs.append(model(model_input))
+
+    if len(outputs) > 1:
+        output = Average(name='ensemble_average')(outputs)
+    else:
+        output = outputs[0]
+    return Model(inputs=[model_input], outputs=[output], name='TextEnsemble')
+
+
+def save_ensemble_model(model, path=ENSEMBLE_MODEL_PATH):
+    """
+    Save fused ensemble model as a single hdf5 artifact
+    :param model: model returned by build_ensemble_model
+    :param path:
+    """
+    model.save(path)
+
+
+def load_ensemble_model(path=ENSEMBLE_MODEL_PATH):
+    """
+    Load fused ensemble model saved by save_ensemble_model
+    :param path:
+    :return: Keras model
+    """
+    return load_model(path, custom_objects={'AttentionWeightedAverage': AttentionWeightedAverage})
+
+
+def load_frozen_ensemble(path=FROZEN_ENSEMBLE_PATH):
+    """
+    Load the frozen ensemble written by freeze_models.py
+    The artifact is rejected if it was exported with a different vocabulary or if the finetuned
+    models it was exported from changed since
+    :param path:
+    :return: TextSentimentScorer wrapping the frozen ensemble
+    """
+    from deepmoji.frozen import read_frozen_metadata, load_frozen_keras_model, file_hash, stale_sources
+
+    metadata = read_frozen_metadata(path)
+    if metadata.get('vocabulary_hash') != file_hash(VOCAB_PATH):
+        raise ValueError(f"{path} was exported with a different vocabulary, re-run freeze_models.py")
+    if 'sources' not in metadata:
+        raise ValueError(f"{path} does not record its source models, re-run freeze_models.py")
+    stale = stale_sources(metadata)
+    if stale:
+        raise ValueError(f"{path} is older than {', '.join(stale)}, re-run freeze_models.py")
+    model, metadata = load_frozen_keras_model(path, custom_objects={'AttentionWeightedAverage': AttentionWeightedAverage})
+    return TextSentimentScorer([model], maxlen=metadata['maxlen'], buckets=TEXT_BUCKETS,
+                               cache_size=TEXT_CACHE_SIZE, source_paths=[path])
+
+
+def _load_quantized_finetuned_models(quantization):
+    """
+    Load the finetuned models from the weight files written by quantize_models.py
+    :param quantization: 'float16' or 'int8'
+    :return: [twitter_model, youtube_model], their weight files
+    """
+    import os
+    from deepmoji.quantization import quantized_path, load_quantized_keras_model
+
+    custom_objects = {'AttentionWeightedAverage': AttentionWeightedAverage}
+    paths = [quantized_path(path, quantization) for path in [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Quantized model not found at {path}, run quantize_models.py --mode {quantization}"
+            )
+    return [load_quantized_keras_model(path, custom_objects) for path in paths], paths
+
+
+def load_finetuned_models(quantization=None, pruned=False, frozen=True, fallback=True):
     """
     Load finetuned Keras models
+    Prefers the frozen ensemble artifact, then the fused ensemble artifact, then the separate
+    finetuned models
     Falls back to base model if finetuned models are missing
-    :return: [twitter_model, youtube_model]
+    :param quantization: 'float16' or 'int8' to load the quantized finetuned models instead,
+                         the weights are dequantized to float32 at load time, so this saves disk
+                         space but not memory; use load_numpy_models to keep int8 weights in memory.
+                         Falls back to the unquantized models if they are missing
+    :param pruned: load the vocabulary-pruned ensemble written by prune_vocabulary.py instead,
+                   words outside the pruned vocabulary are scored as unknown. Falls back to the
+                   unpruned models if it is missing
+    :param frozen: use the frozen ensemble written by freeze_models.py if present
+    :param fallback: use the base model with untrained sentiment heads if the finetuned models are
+                     missing, otherwise raise FileNotFoundError
+    :return: TextSentimentScorer wrapping the fused [twitter_model, youtube_model] ensemble
     """
     import os
-    from deepmoji.model_def import deepmoji_transfer
+    from deepmoji.model_def import deepmoji_multihead, deepmoji_inference_model
     from deepmoji.global_variables import PRETRAINED_PATH
-    
-    twitter_path = 'Text/sentiment/finetuned/twitter_ss.hdf5'
-    youtube_path = 'Text/sentiment/finetuned/youtube_ss.hdf5'
+    from deepmoji.weights import release_weights
+
+    if pruned:
+        if os.path.exists(PRUNED_ENSEMBLE_MODEL_PATH) and os.path.exists(PRUNED_VOCAB_PATH):
+            try:
+                with open(PRUNED_VOCAB_PATH, 'r') as f:
+                    vocabulary = json.load(f)
+                return TextSentimentScorer([load_ensemble_model(PRUNED_ENSEMBLE_MODEL_PATH)], vocabulary=vocabulary,
+                                           buckets=TEXT_BUCKETS, cache_size=TEXT_CACHE_SIZE,
+                                           source_paths=[PRUNED_ENSEMBLE_MODEL_PATH, PRUNED_VOCAB_PATH])
+            except Exception as e:
+                print(f"Warning: Could not load pruned ensemble: {e}")
+        else:
+            print(f"Warning: Pruned ensemble not found at {PRUNED_ENSEMBLE_MODEL_PATH} and "
+                  f"{PRUNED_VOCAB_PATH}, run prune_vocabulary.py")
+        print("Loading unpruned models...")
+
+    if quantization is not None:
+        try:
+            (twitter_model, youtube_model), paths = _load_quantized_finetuned_models(quantization)
+            return TextSentimentScorer([build_ensemble_model([deepmoji_inference_model(twitter_model),
+                                                              deepmoji_inference_model(youtube_model)])],
+                                       buckets=TEXT_BUCKETS, cache_size=TEXT_CACHE_SIZE, source_paths=paths)
+        except Exception as e:
+            print(f"Warning: Could not load quantized models: {e}")
+            print("Loading unquantized models...")
+
+    if frozen and os.path.exists(FROZEN_ENSEMBLE_PATH):
+        try:
+            return load_frozen_ensemble(FROZEN_ENSEMBLE_PATH)
+        except Exception as e:
+            print(f"Warning: Could not load frozen ensemble: {e}")
+            print("Loading ensemble model...")
+
+    if os.path.exists(ENSEMBLE_MODEL_PATH):
+        try:
+            return TextSentimentScorer([load_ensemble_model(ENSEMBLE_MODEL_PATH)],
+                                       buckets=TEXT_BUCKETS, cache_size=TEXT_CACHE_SIZE,
+                                       source_paths=[ENSEMBLE_MODEL_PATH])
+        except Exception as e:
+            print(f"Warning: Could not load ensemble model: {e}")
+            print("Loading separate finetuned models...")
     
     # Try to load finetuned models
-    if os.path.exists(twitter_path) and os.path.exists(youtube_path):
+    if os.path.exists(TWITTER_MODEL_PATH) and os.path.exists(YOUTUBE_MODEL_PATH):
         try:
-            twitter_model = load_model(twitter_path,
+            twitter_model = load_model(TWITTER_MODEL_PATH,
                                        custom_objects={'AttentionWeightedAverage': AttentionWeightedAverage})
-            youtube_model = load_model(youtube_path,
+            youtube_model = load_model(YOUTUBE_MODEL_PATH,
                                        custom_objects={'AttentionWeightedAverage': AttentionWeightedAverage})
-            return [twitter_model, youtube_model]
+            # Fold the embedding tanh into the table and drop dropout once at load time
+            twitter_model = deepmoji_inference_model(twitter_model)
+            youtube_model = deepmoji_inference_model(youtube_model)
+            return TextSentimentScorer([build_ensemble_model([twitter_model, youtube_model])],
+                                       buckets=TEXT_BUCKETS, cache_size=TEXT_CACHE_SIZE,
+                                       source_paths=[TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH])
         except Exception as e:
             print(f"Warning: Could not load finetuned models: {e}")
             print("Falling back to base model...")
     
+    if not fallback:
+        raise FileNotFoundError(
+            f"Finetuned models not found at {ENSEMBLE_MODEL_PATH} or {TWITTER_MODEL_PATH} and {YOUTUBE_MODEL_PATH}"
+        )
+
     # Fallback: Use base model with sentiment head
     print("=" * 60)
     print("WARNING: Finetuned models not found!")
@@ -64,35 +604,60 @@ def load_finetuned_models():
     maxlen = 30
     nb_classes = 2
     
-    twitter_model = deepmoji_transfer(nb_classes, maxlen, PRETRAINED_PATH)
-    youtube_model = deepmoji_transfer(nb_classes, maxlen, PRETRAINED_PATH)
-    
-    return [twitter_model, youtube_model]
+    # Both heads share one encoder, so the base weights are loaded and run once
+    model = deepmoji_multihead([('twitter_softmax', nb_classes),
+                                ('youtube_softmax', nb_classes)],
+                               maxlen, PRETRAINED_PATH)
+    # The model holds its own copy of the weights, the parsed file is no longer needed
+    release_weights(PRETRAINED_PATH)
+    ensemble_output = Average(name='ensemble_average')(model.outputs)
+    ensemble_model = Model(inputs=model.inputs, outputs=[ensemble_output], name='TextEnsemble')
 
+    return TextSentimentScorer([ensemble_model], maxlen=maxlen, buckets=TEXT_BUCKETS,
+                               cache_size=TEXT_CACHE_SIZE, source_paths=[PRETRAINED_PATH])
 
-def get_texts_sentiment(texts, model_ensemble):
+
+def load_numpy_models(quantization=None):
     """
-    Get sentiment scores for list of texts
-    :param texts:
-    :param model_ensemble:
-    :return: average_sentiment_prediction
+    Load the finetuned models into the NumPy inference engine, no Keras session is needed to predict
+    :param quantization: 'float16' or 'int8' to load the quantized finetuned models instead,
+                         an int8 embedding table stays int8 in memory
+    :return: TextSentimentScorer wrapping [twitter_model, youtube_model]
     """
-    with open(VOCAB_PATH, 'r') as f:
-        vocabulary = json.load(f)
-
-    twitter_maxlen = 30
-    youtube_maxlen = 30
-
-    twitter_st = SentenceTokenizer(vocabulary, twitter_maxlen)
-    youtube_st = SentenceTokenizer(vocabulary, youtube_maxlen)
+    import os
+    from deepmoji.numpy_model import NumpyDeepMoji
+    from deepmoji.quantization import quantized_path
+    from deepmoji.weights import release_weights
 
-    twitter_tokenized, _, _ = twitter_st.tokenize_sentences(texts)
-    youtube_tokenized, _, _ = youtube_st.tokenize_sentences(texts)
+    paths = [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]
+    if quantization is not None:
+        paths = [quantized_path(path, quantization) for path in paths]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Finetuned model not found at {path}\n"
+                "The NumPy engine needs the finetuned sentiment heads, train them first"
+            )
 
-    twitter_predictions = model_ensemble[0].predict(twitter_tokenized)
-    youtube_predictions = model_ensemble[1].predict(youtube_tokenized)
+    if quantization is not None:
+        twitter_model, youtube_model = [NumpyDeepMoji.from_quantized(path) for path in paths]
+    else:
+        twitter_model, youtube_model = [NumpyDeepMoji.from_hdf5(path) for path in paths]
+        # The engines keep a tanh-activated copy of the embedding, the raw one in the store is
+        # no longer needed
+        for path in paths:
+            release_weights(path)
+    return TextSentimentScorer([twitter_model, youtube_model], buckets=TEXT_BUCKETS,
+                               cache_size=TEXT_CACHE_SIZE, source_paths=paths)
 
-    average_predictions = (twitter_predictions + youtube_predictions) / 2
-    average_sentiment_prediction = [modify_range(prediction)[0] for prediction in average_predictions]
 
-    return average_sentiment_prediction
+def get_texts_sentiment(texts, model_ensemble):
+    """
+    Get sentiment scores for list of texts
+    :param texts:
+    :param model_ensemble: TextSentimentScorer, or a plain list of models
+    :return: average_sentiment_prediction
+    """
+    if not isinstance(model_ensemble, TextSentimentScorer):
+        model_ensemble = TextSentimentScorer(model_ensemble)
+    return model_ensemble.score(texts)
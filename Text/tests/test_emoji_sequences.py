@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+import test_helper
+
+import emoji
+
+from deepmoji.emoji_sequences import (
+    EMOJI_SEQUENCES,
+    build_emoji_regex,
+    emoji_components,
+    extract_emojis_and_text)
+from deepmoji.filter_utils import separate_emojis_and_text
+
+FACEPALM = u'\U0001F926\U0001F3FF\u200d\u2642\ufe0f'
+FAMILY = u'\U0001F468\u200d\U0001F469\u200d\U0001F467'
+
+
+def test_sequences_are_extracted_whole():
+    """ Skin-toned and ZWJ sequences are returned as one emoji and removed
+        from the text completely.
+    """
+    emojis, text = extract_emojis_and_text(u'not again' + FACEPALM + FACEPALM + u' ' + FAMILY + u'!')
+    assert emojis == [FACEPALM, FACEPALM, FAMILY]
+    assert text == u'not again !'
+
+
+def test_single_emojis_match_per_character_lookup():
+    """ Texts without sequences give the same emojis and text as testing
+        every character against the emoji library.
+    """
+    sentence = u'we lost \U0001F612 \U0001F605\U0001F60D \u2764 text'
+    emojis, text = extract_emojis_and_text(sentence)
+    assert emojis == [c for c in sentence if c in emoji.UNICODE_EMOJI]
+    assert text == u''.join(c for c in sentence if c not in emoji.UNICODE_EMOJI)
+
+
+def test_every_library_sequence_is_matched_whole():
+    """ Every emoji and sequence of the emoji library is one match.
+    """
+    for sequence in EMOJI_SEQUENCES:
+        assert extract_emojis_and_text(sequence) == ([sequence], u''), repr(sequence)
+
+
+def test_emojis_newer_than_the_library():
+    """ Bases missing from the emoji library are matched by their
+        Extended_Pictographic codepoint and keep their sequences whole.
+    """
+    climber = u'\U0001F9D7\U0001F3FD\u200d\u2642\ufe0f'
+    assert u'\U0001F9D7' not in emoji.UNICODE_EMOJI
+    assert extract_emojis_and_text(climber) == ([climber], u'')
+    assert extract_emojis_and_text(u'wow\U0001F929\U0001F970!') == ([u'\U0001F929', u'\U0001F970'], u'wow!')
+    assert emoji_components(climber) == [u'\U0001F9D7', u'\u2642']
+
+
+def test_text_style_symbols_need_emoji_presentation():
+    """ Pictographic symbols of the BMP that the library does not know are
+        only emojis with the emoji presentation selector.
+    """
+    assert extract_emojis_and_text(u'5\u2605 review') == ([], u'5\u2605 review')
+    assert extract_emojis_and_text(u'5\u2605\ufe0f review') == ([u'\u2605\ufe0f'], u'5 review')
+
+
+def test_text_without_emojis_is_unchanged():
+    """ Texts without emojis are returned as they are.
+    """
+    assert extract_emojis_and_text(u'plain text') == ([], u'plain text')
+    assert extract_emojis_and_text(u'') == ([], u'')
+
+
+def test_custom_sequences():
+    """ The extractor can be built from any list of emojis, with skin tones,
+        variation selectors and ZWJ joins added to them.
+    """
+    regex = build_emoji_regex([u'\U0001F926', u'\u2642', u'\U0001F602'], pictographs=())
+    emojis, text = extract_emojis_and_text(u'x' + FACEPALM + u'\U0001F600\U0001F602y', regex)
+    assert emojis == [FACEPALM, u'\U0001F602']
+    assert text == u'x\U0001F600y'
+
+
+def test_emoji_components():
+    """ Components drop joiners, skin tones and variation selectors.
+    """
+    assert emoji_components(FACEPALM) == [u'\U0001F926', u'\u2642']
+    assert emoji_components(FAMILY) == [u'\U0001F468', u'\U0001F469', u'\U0001F467']
+    assert emoji_components(u'\U0001F3FD') == []
+    assert emoji_components(u'\u200d\ufe0f') == []
+    assert emoji_components(u'#\ufe0f\u20e3') == [u'#']
+
+
+def test_separate_emojis_and_text():
+    """ separate_emojis_and_text keeps sequences whole.
+    """
+    assert separate_emojis_and_text(u'ok' + FACEPALM + u'\U0001F602') == (FACEPALM + u'\U0001F602', u'ok')
@@ -12,14 +12,20 @@ from deepmoji.finetuning import (
     change_trainable,
     relabel,
     finetune,
+    finetune_multihead,
     load_benchmark
     )
 from deepmoji.model_def import (
     deepmoji_transfer,
     deepmoji_architecture,
     deepmoji_feature_encoding,
-    deepmoji_emojis
+    deepmoji_emojis,
+    deepmoji_multihead,
+    deepmoji_multihead_architecture,
+    deepmoji_inference_model,
+    get_weights_from_hdf5
     )
+from deepmoji import weights
 from deepmoji.global_variables import (
     PRETRAINED_PATH,
     NB_TOKENS,
@@ -74,6 +80,66 @@ def test_deepmoji_transfer_extend_embedding():
     assert embedding_layer.input_dim == NB_TOKENS + extend_with
 
 
+def test_deepmoji_inference_model():
+    """ Inference model has no tanh or dropout nodes and gives the same predictions.
+    """
+    model = deepmoji_transfer(2, 30, weight_path=PRETRAINED_PATH)
+    inference_model = deepmoji_inference_model(model)
+
+    layer_types = [type(layer).__name__ for layer in inference_model.layers]
+    assert 'Activation' not in layer_types
+    assert 'Dropout' not in layer_types
+    assert 'SpatialDropout1D' not in layer_types
+
+    tokens = np.random.RandomState(0).randint(1, NB_TOKENS, size=(8, 30))
+    tokens[:, 10:] = 0
+    assert np.allclose(model.predict(tokens), inference_model.predict(tokens), atol=1e-6)
+
+
+def test_deepmoji_multihead():
+    """ Multi-head model shares one encoder and has one output per head.
+    """
+    model = deepmoji_multihead([('twitter_softmax', 2), ('softmax', 64)], 30,
+                               weight_path=PRETRAINED_PATH)
+    assert len(model.outputs) == 2
+    assert len([l for l in model.layers if 'bi_lstm' in l.name]) == 2
+
+    tokens = np.zeros((1, 30))
+    tokens[0, :3] = [4, 5, 6]
+    twitter_pred, emoji_pred = model.predict(tokens)
+    assert twitter_pred.shape == (1, 1)
+    assert emoji_pred.shape == (1, 64)
+
+
+def test_finetune_multihead():
+    """ finetune_multihead() trains the given heads on a frozen shared encoder.
+    """
+    maxlen = 10
+    model = deepmoji_multihead_architecture([('twitter_softmax', 2), ('youtube_softmax', 2)],
+                                            nb_tokens=100, maxlen=maxlen)
+    weights_before = {layer.name: layer.get_weights() for layer in model.layers}
+
+    rng = np.random.RandomState(0)
+    texts = [rng.randint(1, 100, size=(n, maxlen)) for n in [40, 10, 10]]
+    labels = [rng.randint(0, 2, size=n) for n in [40, 10, 10]]
+    model, results = finetune_multihead(model, {'twitter_softmax': (texts, labels, 2)},
+                                        batch_size=10, method='last', epoch_size=40,
+                                        nb_epochs=1, verbose=0)
+
+    assert list(results) == ['twitter_softmax']
+    for layer in model.layers:
+        unchanged = all(np.array_equal(before, after) for before, after
+                        in zip(weights_before[layer.name], layer.get_weights()))
+        # Only the trained head is updated, the encoder and the other head are frozen
+        assert unchanged == (layer.name != 'twitter_softmax'), layer.name
+
+
+def test_get_weights_from_hdf5_reexported():
+    """ get_weights_from_hdf5 can still be imported from model_def.
+    """
+    assert get_weights_from_hdf5 is weights.get_weights_from_hdf5
+
+
 def test_deepmoji_return_attention():
     # test the output of the normal model
     model = deepmoji_emojis(maxlen=30, weight_path=PRETRAINED_PATH)
@@ -0,0 +1,73 @@
+from __future__ import print_function, division
+import test_helper
+
+import os
+import tempfile
+import numpy as np
+
+from deepmoji.frozen import (
+    save_frozen,
+    load_frozen,
+    read_frozen_metadata,
+    source_identities,
+    stale_sources,
+    ALIGNMENT)
+
+
+def test_round_trip_is_memory_mapped():
+    """ Arrays are restored bit-exact as aligned, read-only views of the file.
+    """
+    rng = np.random.RandomState(0)
+    layer_weights = [['embedding', ['embedding/embeddings:0'], [rng.normal(size=(50, 7)).astype('float32')]],
+                     ['softmax', ['softmax/kernel:0', 'softmax/bias:0'],
+                      [rng.normal(size=(7, 3)).astype('float32'), np.zeros(3, dtype='float16')]],
+                     ['counts', ['counts:0'], [np.arange(5, dtype='int64')]]]
+    metadata = {'maxlen': 30, 'vocabulary_hash': 'abc'}
+    path = os.path.join(tempfile.mkdtemp(), 'model.frozen')
+    save_frozen(path, layer_weights, metadata)
+
+    loaded, loaded_metadata = load_frozen(path)
+    assert loaded_metadata == metadata
+    assert read_frozen_metadata(path) == metadata
+    for (name, names, values), (l_name, l_names, l_values) in zip(layer_weights, loaded):
+        assert (name, names) == (l_name, l_names)
+        for w, l in zip(values, l_values):
+            assert w.dtype == l.dtype
+            assert np.array_equal(w, l)
+            assert not l.flags.writeable
+            assert l.ctypes.data % ALIGNMENT == 0
+
+
+def test_rejects_other_files():
+    """ Files without the artifact header are rejected.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'model.hdf5')
+    with open(path, 'wb') as f:
+        f.write(b'\x89HDF\r\n\x1a\n' + b'\0' * 64)
+    try:
+        read_frozen_metadata(path)
+    except ValueError:
+        return
+    assert False, 'Expected ValueError'
+
+
+def test_stale_sources():
+    """ Retrained, added or removed source models make an artifact stale.
+    """
+    directory = tempfile.mkdtemp()
+    weights = os.path.join(directory, 'twitter_ss.hdf5')
+    missing = os.path.join(directory, 'ensemble_ss.hdf5')
+    with open(weights, 'wb') as f:
+        f.write(b'v1')
+    metadata = {'sources': source_identities([weights, missing])}
+    assert stale_sources(metadata) == []
+    assert stale_sources({}) == []
+
+    with open(weights, 'wb') as f:
+        f.write(b'v2 retrained')
+    assert stale_sources(metadata) == [weights]
+
+    metadata = {'sources': source_identities([weights, missing])}
+    with open(missing, 'wb') as f:
+        f.write(b'fused')
+    assert stale_sources(metadata) == [missing]
@@ -0,0 +1,108 @@
+from __future__ import print_function, division
+import test_helper
+
+import csv
+import json
+import numpy as np
+from os.path import dirname, join
+
+from deepmoji.numpy_model import NumpyDeepMoji
+from deepmoji.global_variables import PRETRAINED_PATH, VOCAB_PATH
+
+TEST_SENTENCES_PATH = join(dirname(dirname(__file__)), 'examples', 'test_sentences.csv')
+
+
+def random_layer_weights(nb_tokens=20, embed_dim=6, units=4, nb_classes=1, seed=0):
+    """ Random weights with the layout Keras uses for the Text model.
+    """
+    rng = np.random.RandomState(seed)
+
+    def lstm(input_dim):
+        return [rng.normal(size=(input_dim, 4 * units)).astype('float32'),
+                rng.normal(size=(units, 4 * units)).astype('float32'),
+                rng.normal(size=(4 * units,)).astype('float32')]
+
+    return {
+        'embedding': [rng.normal(size=(nb_tokens, embed_dim)).astype('float32')],
+        'bi_lstm_0': lstm(embed_dim) + lstm(embed_dim),
+        'bi_lstm_1': lstm(2 * units) + lstm(2 * units),
+        'attlayer': [rng.normal(size=(2 * units + 2 * units + embed_dim, 1)).astype('float32')],
+        'softmax': [rng.normal(size=(2 * units + 2 * units + embed_dim, nb_classes)).astype('float32'),
+                    rng.normal(size=(nb_classes,)).astype('float32')],
+    }
+
+
+def test_padding_and_batching_do_not_change_predictions():
+    """ Extra padding and batch composition do not change the output.
+    """
+    model = NumpyDeepMoji(random_layer_weights())
+    tokens = np.zeros((3, 30), dtype='uint16')
+    tokens[0, :3] = [5, 7, 9]
+    tokens[1, :8] = [1, 2, 3, 4, 5, 6, 7, 8]
+    tokens[2, :1] = [19]
+
+    batched = model.predict(tokens)
+    single = np.concatenate([model.predict(tokens[i:i + 1, :10]) for i in range(3)])
+    assert batched.shape == (3, 1)
+    assert np.allclose(batched, single, atol=1e-6), (batched, single)
+
+
+def test_softmax_output_sums_to_one():
+    """ Multi-class heads return probability distributions.
+    """
+    model = NumpyDeepMoji(random_layer_weights(nb_classes=5))
+    tokens = np.array([[3, 4, 0, 0], [1, 0, 0, 0]], dtype='uint16')
+    assert np.allclose(model.predict(tokens).sum(axis=1), 1.0)
+
+
+def test_missing_layers_raise():
+    """ Weights without the encoder layers are rejected.
+    """
+    weights = random_layer_weights()
+    del weights['bi_lstm_1']
+    try:
+        NumpyDeepMoji(weights)
+    except ValueError:
+        return
+    assert False, 'Expected ValueError'
+
+
+def test_matches_keras_model():
+    """ NumPy forward pass matches the Keras model on the test sentences.
+    """
+    from deepmoji.model_def import deepmoji_architecture
+    from deepmoji.global_variables import NB_TOKENS
+    from deepmoji.sentence_tokenizer import SentenceTokenizer
+
+    with open(VOCAB_PATH, 'r') as f:
+        vocab = json.load(f)
+    with open(TEST_SENTENCES_PATH, 'r') as f:
+        sentences = [row['Text'] for row in csv.DictReader(f)]
+    tokens, _, _ = SentenceTokenizer(vocab, 30).tokenize_sentences(sentences)
+
+    keras_model = deepmoji_architecture(nb_classes=2, nb_tokens=NB_TOKENS, maxlen=30)
+    layer_weights = {l.name: l.get_weights() for l in keras_model.layers if l.get_weights()}
+    numpy_model = NumpyDeepMoji(layer_weights)
+
+    expected = keras_model.predict(tokens)
+    actual = numpy_model.predict(tokens)
+    assert np.allclose(expected, actual, atol=1e-5), np.max(np.abs(expected - actual))
+
+
+def test_matches_reference_emoji_predictions():
+    """ Pretrained emoji predictions match the stored Keras predictions.
+    """
+    from deepmoji.sentence_tokenizer import SentenceTokenizer
+
+    with open(VOCAB_PATH, 'r') as f:
+        vocab = json.load(f)
+    with open(TEST_SENTENCES_PATH, 'r') as f:
+        rows = list(csv.DictReader(f))
+    tokens, _, _ = SentenceTokenizer(vocab, 30).tokenize_sentences([row['Text'] for row in rows])
+
+    model = NumpyDeepMoji.from_hdf5(PRETRAINED_PATH)
+    prob = model.predict(tokens)
+    for row, p in zip(rows, prob):
+        for k in range(1, 6):
+            emoji_id = int(row['Emoji_{}'.format(k)])
+            assert abs(p[emoji_id] - float(row['Pct_{}'.format(k)])) < 1e-4, (row['Text'], k)
@@ -0,0 +1,79 @@
+from __future__ import print_function, division
+import test_helper
+
+import os
+import tempfile
+import numpy as np
+
+from deepmoji.numpy_model import NumpyDeepMoji
+from deepmoji.quantization import (
+    QuantizedArray,
+    quantize_array,
+    quantize_weights,
+    save_quantized_weights,
+    load_quantized_weights
+    )
+from test_numpy_model import random_layer_weights
+
+
+def test_int8_error_is_bounded_by_half_a_step():
+    """ Per-row int8 quantization is within half a quantization step.
+    """
+    array = np.random.RandomState(0).normal(size=(50, 8)).astype('float32')
+    quantized = QuantizedArray.quantize(array, axis=0)
+    assert quantized.values.dtype == np.int8
+    assert quantized.scale.shape == (50, 1)
+    assert np.all(np.abs(quantized.dequantize() - array) <= quantized.scale / 2 + 1e-7)
+
+
+def test_take_matches_dequantize():
+    """ Row lookups give the same rows as dequantizing the whole array.
+    """
+    array = np.random.RandomState(1).normal(size=(20, 6)).astype('float32')
+    tokens = np.array([[1, 5, 0], [19, 2, 2]])
+    for axis in [0, -1]:
+        quantized = QuantizedArray.quantize(array, axis=axis)
+        assert np.allclose(quantized.take(tokens), quantized.dequantize()[tokens])
+
+
+def test_small_arrays_are_kept():
+    """ Arrays below min_size and integer arrays are not quantized.
+    """
+    bias = np.ones(10, dtype='float32')
+    assert quantize_array(bias, 'int8', min_size=100) is bias
+    assert quantize_array(np.ones((20, 20), dtype='int32'), 'float16', min_size=1).dtype == np.int32
+    assert quantize_array(np.ones((20, 20), dtype='float32'), 'float16', min_size=1).dtype == np.float16
+
+
+def test_save_and_load_round_trip():
+    """ Quantized weights are restored with the same layers, names and values.
+    """
+    weights = random_layer_weights()
+    layer_weights = [[name, ['w{}'.format(i) for i in range(len(values))], values]
+                     for name, values in weights.items()]
+    quantized = quantize_weights(layer_weights, 'int8', min_size=16)
+
+    path = os.path.join(tempfile.mkdtemp(), 'weights.int8.npz')
+    save_quantized_weights(path, quantized, 'int8')
+    loaded = load_quantized_weights(path)
+
+    assert [l[0] for l in loaded] == [l[0] for l in layer_weights]
+    assert [l[1] for l in loaded] == [l[1] for l in layer_weights]
+    for (_, _, original), (_, _, restored) in zip(quantized, loaded):
+        for w, r in zip(original, restored):
+            expected = w.dequantize() if isinstance(w, QuantizedArray) else w
+            assert r.dtype == np.float32
+            assert np.array_equal(expected, r)
+
+
+def test_quantized_numpy_model_is_close():
+    """ NumPy model with an int8 embedding predicts close to the float model.
+    """
+    weights = random_layer_weights(nb_tokens=200, embed_dim=16, units=8, nb_classes=3)
+    quantized = dict(weights)
+    quantized['embedding'] = [QuantizedArray.quantize(weights['embedding'][0], axis=0)]
+
+    tokens = np.random.RandomState(2).randint(1, 200, size=(4, 10))
+    expected = NumpyDeepMoji(weights).predict(tokens)
+    predicted = NumpyDeepMoji(quantized).predict(tokens)
+    assert np.allclose(expected, predicted, atol=2e-2), (expected, predicted)
@@ -0,0 +1,194 @@
+from __future__ import print_function, division
+import test_helper
+
+import json
+import threading
+
+import numpy as np
+
+from deepmoji.finetuning import notify_weights_changed
+from deepmoji.global_variables import SPECIAL_TOKENS, VOCAB_PATH
+from deepmoji.model_def import deepmoji_architecture
+from deepmoji.numpy_model import NumpyDeepMoji
+from deepmoji.sentence_tokenizer import SentenceTokenizer
+from sentiment.TextSentiment import (
+    BATCH_TIMES_SIZE,
+    LRUCache,
+    TextSentimentScorer,
+    bucket_rows,
+    get_texts_sentiment,
+    modify_range)
+from test_numpy_model import random_layer_weights
+
+WORDS = ['good', 'bad', 'movie', 'not', 'really', 'great', 'awful', 'day']
+VOCABULARY = {token: i for i, token in enumerate(SPECIAL_TOKENS + WORDS)}
+
+# One empty text, texts inside each bucket and texts longer than the biggest bucket.
+# The empty text has no unmasked timestep and scores NaN with or without bucketing
+TEXTS = ['', 'good', 'not really great', 'bad movie bad day', 'good movie really great good day',
+         'good movie not really awful but a great day', 'awful ' * 12, 'really ' * 40]
+
+
+def numpy_model(seed=0, nb_tokens=len(VOCABULARY)):
+    """ Small random Text model over VOCABULARY.
+    """
+    return NumpyDeepMoji(random_layer_weights(nb_tokens=nb_tokens, seed=seed))
+
+
+def two_model_mean(texts, models, vocabulary):
+    """ Scores as computed before TextSentimentScorer: both members run on
+        their own tokenization of the texts and their predictions are averaged.
+    """
+    predictions = [model.predict(SentenceTokenizer(vocabulary, 30).tokenize_sentences(texts)[0])
+                   for model in models]
+    return [modify_range(prediction)[0] for prediction in (predictions[0] + predictions[1]) / 2]
+
+
+def test_scorer_matches_two_model_mean():
+    """ The ensemble score is the mean of the members, tokenized once.
+    """
+    models = [numpy_model(seed=0), numpy_model(seed=1)]
+    scorer = TextSentimentScorer(models, vocabulary=VOCABULARY)
+    assert len(scorer) == 2 and scorer[1] is models[1]
+    assert len(scorer.tokenizers) == 1
+    assert np.allclose(scorer.score(TEXTS), two_model_mean(TEXTS, models, VOCABULARY),
+                       atol=1e-6, equal_nan=True)
+
+
+def test_get_texts_sentiment_wraps_model_lists():
+    """ A plain list of models is wrapped in a scorer over the default
+        vocabulary, a scorer is used as it is.
+    """
+    with open(VOCAB_PATH, 'r') as f:
+        vocabulary = json.load(f)
+    models = [numpy_model(seed=0, nb_tokens=len(vocabulary)), numpy_model(seed=1, nb_tokens=len(vocabulary))]
+    texts = ['what a great day', 'this is awful']
+    expected = two_model_mean(texts, models, vocabulary)
+    assert np.allclose(get_texts_sentiment(texts, models), expected, atol=1e-6)
+    scorer = TextSentimentScorer(models, vocabulary=vocabulary)
+    assert np.allclose(get_texts_sentiment(texts, scorer), expected, atol=1e-6)
+    assert len(scorer.batch_times) == 1
+
+
+def test_batch_times_window():
+    """ Only the last BATCH_TIMES_SIZE batch times are kept.
+    """
+    scorer = TextSentimentScorer([numpy_model()], vocabulary=VOCABULARY)
+    assert scorer.last_batch_time is None
+    assert scorer.batch_times.maxlen == BATCH_TIMES_SIZE
+    for _ in range(3):
+        scorer.score(['good day'])
+    assert len(scorer.batch_times) == 3
+    assert scorer.last_batch_time == scorer.batch_times[-1] >= 0
+
+
+def test_lru_cache_hits_and_eviction():
+    """ The least recently used entry is evicted first and counted.
+    """
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b', 'missing') == 'missing'
+    assert cache.stats() == {'size': 2, 'capacity': 2, 'hits': 1, 'misses': 1, 'evictions': 1}
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_shared_between_threads():
+    """ Concurrent gets and puts keep the cache bounded and the counters exact.
+    """
+    cache = LRUCache(50)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                cache.put((offset, i % 80), i)
+                cache.get((offset, (i * 7) % 80))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    stats = cache.stats()
+    assert stats['size'] == 50
+    assert stats['hits'] + stats['misses'] == 8 * 2000
+    # 640 distinct keys were stored, all but 50 of them were evicted at least once
+    assert stats['evictions'] >= 8 * 80 - 50
+
+
+def test_scorer_cache_hits():
+    """ Cached scores equal uncached ones, repeated token sequences are hits.
+    """
+    texts = ['good movie', 'bad day', 'GOOD movie', 'not really great']
+    uncached = TextSentimentScorer([numpy_model()], vocabulary=VOCABULARY, maxlen=10)
+    scorer = TextSentimentScorer([numpy_model()], vocabulary=VOCABULARY, maxlen=10, cache_size=10)
+    assert np.allclose(scorer.score(texts), uncached.score(texts))
+    # 'GOOD movie' tokenizes like 'good movie'
+    assert scorer.cache.stats()['size'] == 3
+    scorer.score(texts)
+    assert scorer.cache.stats()['hits'] == 4
+
+
+def test_scorer_cache_invalidated():
+    """ Finetuning notifies the scorer, other weight changes need invalidate().
+    """
+    model = numpy_model()
+    scorer = TextSentimentScorer([model], vocabulary=VOCABULARY, maxlen=10, cache_size=10)
+    before = scorer.score(['good movie'])
+
+    model.output_weights[1] += 1.0
+    # The weights changed in place without telling the scorer
+    assert scorer.score(['good movie']) == before
+    notify_weights_changed(model)
+    assert len(scorer.cache) == 0
+    after = scorer.score(['good movie'])
+    assert after != before
+
+    model.output_weights[1] -= 1.0
+    scorer.invalidate()
+    assert np.allclose(scorer.score(['good movie']), before)
+
+
+def test_bucket_rows():
+    """ Rows are grouped by true length, longer rows keep the full length.
+    """
+    tokens = np.zeros((5, 10), dtype='uint16')
+    tokens[0, :2] = 3
+    tokens[1, :5] = 3
+    tokens[2, :10] = 3
+    tokens[4, :4] = 3
+    groups = bucket_rows(tokens, (4, 8))
+    assert [length for length, _ in groups] == [4, 8, 10]
+    assert [list(rows) for _, rows in groups] == [[3, 0, 4], [1], [2]]
+    # Buckets at or above maxlen are ignored
+    assert [length for length, _ in bucket_rows(tokens, (4, 10, 16))] == [4, 10]
+    assert bucket_rows(np.zeros((0, 10), dtype='uint16'), (4, 8)) == []
+
+
+def test_bucketed_numpy_scores_match_unbucketed():
+    """ Bucketing does not change the scores or their order.
+    """
+    unbucketed = TextSentimentScorer([numpy_model()], vocabulary=VOCABULARY, maxlen=30)
+    bucketed = TextSentimentScorer([numpy_model()], vocabulary=VOCABULARY, maxlen=30, buckets=(4, 8))
+    assert np.allclose(bucketed.score(TEXTS), unbucketed.score(TEXTS), atol=1e-6, equal_nan=True)
+    assert bucketed.score([]) == unbucketed.score([]) == []
+
+
+def test_bucketed_keras_scores_match_unbucketed():
+    """ The resized views of a Keras model share its weights and give the
+        same scores as the full-length model.
+    """
+    model = deepmoji_architecture(nb_classes=2, nb_tokens=len(VOCABULARY), maxlen=30)
+    unbucketed = TextSentimentScorer([model], vocabulary=VOCABULARY)
+    bucketed = TextSentimentScorer([model], vocabulary=VOCABULARY, buckets=(4, 8))
+    assert np.allclose(bucketed.score(TEXTS), unbucketed.score(TEXTS), atol=1e-6, equal_nan=True)
+    assert sorted(length for _, length in bucketed.bucket_models) == [4, 8]
+    assert bucketed.score([]) == []
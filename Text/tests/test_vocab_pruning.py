@@ -0,0 +1,46 @@
+from __future__ import print_function, division
+import test_helper
+
+import numpy as np
+
+from deepmoji.global_variables import SPECIAL_TOKENS
+from deepmoji.vocab_pruning import (
+    count_token_usage,
+    select_kept_tokens,
+    build_remap,
+    prune_vocabulary,
+    kept_tokens_from_vocabulary
+    )
+
+NB_SPECIAL = len(SPECIAL_TOKENS)
+
+
+def test_kept_tokens_include_special_and_most_used():
+    """ Special tokens are always kept, then the most used tokens.
+    """
+    tokens = np.array([[12, 12, 12, 15, 0], [15, 20, 1, 0, 0]])
+    kept = select_kept_tokens(count_token_usage(tokens, 30), top_k=2)
+    assert list(kept) == list(range(NB_SPECIAL)) + [12, 15]
+
+
+def test_unused_tokens_are_not_kept():
+    """ Fewer tokens than top_k are kept if the corpus uses fewer.
+    """
+    kept = select_kept_tokens(count_token_usage(np.array([[11, 0]]), 30), top_k=5)
+    assert list(kept) == list(range(NB_SPECIAL)) + [11]
+
+
+def test_remap_matches_pruned_vocabulary():
+    """ Remapping full-vocabulary tokens equals tokenizing with the pruned vocabulary.
+    """
+    vocabulary = {word: i for i, word in enumerate(SPECIAL_TOKENS)}
+    vocabulary.update({'w{}'.format(i): i for i in range(NB_SPECIAL, 30)})
+    kept = np.array(list(range(NB_SPECIAL)) + [13, 21, 22])
+    remap = build_remap(kept, 30)
+    pruned = prune_vocabulary(vocabulary, kept)
+
+    for word, i in vocabulary.items():
+        assert remap[i] == pruned.get(word, 1)
+    assert pruned['w21'] == NB_SPECIAL + 1
+    assert remap[0] == 0
+    assert list(kept_tokens_from_vocabulary(vocabulary, pruned)) == list(kept)
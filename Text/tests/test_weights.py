@@ -0,0 +1,62 @@
+from __future__ import print_function, division
+import test_helper
+
+import os
+import tempfile
+import h5py
+import numpy as np
+
+from deepmoji.weights import WeightStore
+
+
+def write_weight_file(path, value):
+    """ Weight file in the layout of Keras' model.save_weights.
+    """
+    with h5py.File(path, 'w') as f:
+        f.attrs['layer_names'] = [b'dense']
+        g = f.create_group('dense')
+        g.attrs['weight_names'] = [b'dense/kernel:0']
+        g['dense/kernel:0'] = np.full((4, 3), value, dtype='float32')
+
+
+def test_file_is_read_once_and_shared():
+    """ Repeated lookups return the same read-only arrays.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'weights.hdf5')
+    write_weight_file(path, 1.)
+    store = WeightStore()
+
+    first = store.get(path)
+    second = store.get(path)
+    assert first is second
+    assert (store.reads, store.hits) == (1, 1)
+    assert not first[0][2][0].flags.writeable
+
+
+def test_release_frees_the_weights():
+    """ Released files are read again on the next lookup.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'weights.hdf5')
+    write_weight_file(path, 1.)
+    store = WeightStore()
+    store.get(path)
+
+    assert store.nbytes() == 4 * 3 * 4
+    assert store.release(path) == 4 * 3 * 4
+    assert store.nbytes() == 0
+    store.get(path)
+    assert store.reads == 2
+
+
+def test_rewritten_file_is_reloaded():
+    """ A file rewritten with new weights is not served from the old entry.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'weights.hdf5')
+    write_weight_file(path, 1.)
+    store = WeightStore()
+    store.get(path)
+
+    write_weight_file(path, 2.)
+    os.utime(path, ns=(0, 10 ** 18))
+    assert np.all(store.get(path)[0][2][0] == 2.)
+    assert store.release() == 4 * 3 * 4
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark the single-pass emoji sequence extractor against the per-character loop it replaces
+The per-character loop tests every character against emoji.UNICODE_EMOJI and then removes each
+found emoji from the message, as parse_media did. Also reports how many sequences the loop split.
+
+Usage:
+    python benchmark_emoji_extraction.py --messages 20000
+    python benchmark_emoji_extraction.py --corpus messages.txt
+"""
+import argparse
+import random
+import time
+
+import emoji as emoji_library
+from Text.deepmoji.emoji_sequences import extract_emojis_and_text, get_emoji_regex
+
+SAMPLE_MESSAGES = [
+    "I get in my moods where I don’t be wanting to talk and that’s when everybody got a question 😤",
+    "THANKS GOD FOR WAKING ME UP TODAY. 🙏👆",
+    "It’s Official This Weekend I’m Going To Knoxville Tennessee !!! 🧗🏽‍♂️",
+    "Cavs look terrible Lebron ain’t making it out the first round🤦🏿‍♂️",
+    "My dainty friends don't like beef 🤦🏿‍♂️🤦🏿‍♂️",
+    "EPIC. You actually look really pretty w/the hairstyle &amp; earrings 😩😂   Twinning 🙌🏽🙌🏽",
+    "God has brought me such a loooong way and he’s nowhere near done ❤️ thank you Lord!!",
+    "That’s your headline? 🙄How about crazed man throws car in reverse &amp; hits patrol car.",
+    "we lost 😒 😅 😛 <img>https://media.giphy.com/media/2rtQMJvhzOnRe/giphy.gif</img>",
+    "no emojis in this one, just a long enough message to make the scan do some work",
+]
+
+
+def per_character_extract(sentence):
+    emojis = [c for c in sentence if c in emoji_library.UNICODE_EMOJI]
+    for emoji in emojis:
+        sentence = sentence.replace(emoji, "")
+    return emojis, sentence
+
+
+def read_messages(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def time_extractor(extract, messages, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = [extract(message) for message in messages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare emoji extraction speed')
+    parser.add_argument('--corpus', default=None, help='text file with one message per line')
+    parser.add_argument('--messages', type=int, default=20000, help='number of sample messages')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        messages = read_messages(args.corpus)
+    else:
+        rng = random.Random(0)
+        messages = [rng.choice(SAMPLE_MESSAGES) for _ in range(args.messages)]
+
+    start = time.perf_counter()
+    get_emoji_regex()
+    compile_time = time.perf_counter() - start
+
+    loop_time, loop_results = time_extractor(per_character_extract, messages, args.repeats)
+    regex_time, regex_results = time_extractor(extract_emojis_and_text, messages, args.repeats)
+
+    loop_emojis = sum(len(emojis) for emojis, _ in loop_results)
+    regex_emojis = sum(len(emojis) for emojis, _ in regex_results)
+    sequences = sum(1 for emojis, _ in regex_results for emoji in emojis if len(emoji) > 1)
+
+    print(f"{'='*60}")
+    print(f"{len(messages)} messages, extractor compiled in {compile_time * 1000:.1f}ms")
+    print(f"{'Extractor':22} {'time':>10} {'per msg':>10} {'emojis':>8}")
+    print(f"{'per-character loop':22} {loop_time * 1000:8.1f}ms {loop_time / len(messages) * 1e6:8.2f}us "
+          f"{loop_emojis:8d}")
+    print(f"{'single-pass regex':22} {regex_time * 1000:8.1f}ms {regex_time / len(messages) * 1e6:8.2f}us "
+          f"{regex_emojis:8d}")
+    print(f"Speedup: {loop_time / regex_time:.1f}x, {sequences} multi-codepoint sequences kept whole")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
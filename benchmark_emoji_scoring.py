@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Benchmark the vectorized batch emoji scoring against the list-based get_emoji_sentiments
+Scores random batches of emoji lists drawn from the score table (mostly single emojis), checks that both return the
+same averages and reports the time per batch.
+
+Usage:
+    python benchmark_emoji_scoring.py --messages 1000000 --max-emojis 6
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from Emoji.EmojiSentiment import get_emoji_score_table, get_emoji_sentiments, get_emoji_sentiments_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare list-based and batch emoji scoring')
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--max-emojis', type=int, default=6, help='emojis per message, 0 to this')
+    parser.add_argument('--sequence-ratio', type=float, default=0.1,
+                        help='share of skin tone/ZWJ sequences among the emojis')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    emojis = sorted(get_emoji_score_table())
+    singles = [emoji for emoji in emojis if len(emoji) == 1]
+    sequences = [emoji for emoji in emojis if len(emoji) > 1]
+    batch = [[rng.choice(sequences if rng.random() < args.sequence_ratio else singles)
+              for _ in range(rng.randint(0, args.max_emojis))]
+             for _ in range(args.messages)]
+    get_emoji_sentiments_batch(batch[:10])
+
+    timings = {}
+    for name, score in [('list', get_emoji_sentiments), ('batch', get_emoji_sentiments_batch)]:
+        best = None
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            result = score(batch)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = (best, result)
+
+    expected = np.array([np.nan if s is None else s for s in timings['list'][1]], dtype=np.float64)
+    print(f"{'='*60}")
+    print(f"{args.messages} messages, {sum(len(emoji_list) for emoji_list in batch)} emojis")
+    print(f"  list-based: {timings['list'][0]:.3f}s")
+    print(f"  batch:      {timings['batch'][0]:.3f}s ({timings['list'][0] / timings['batch'][0]:.1f}x)")
+    print(f"  results match: {np.allclose(expected, timings['batch'][1], rtol=0, atol=1e-12, equal_nan=True)}")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Benchmark loading the emoji sentiment scores from Emoji/config.py against the binary table
+Every load runs in a fresh interpreter, the best of several runs is reported.
+
+Usage:
+    python -m Emoji.emoji_table   # rebuild the table if config.py changed
+    python benchmark_emoji_table.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+LOADERS = {
+    'config.py': 'from Emoji.config import emoji2sentiment as table',
+    'config.py (no .pyc)': 'import sys; sys.dont_write_bytecode = True; '
+                           'import runpy; table = runpy.run_path("Emoji/config.py")["emoji2sentiment"]',
+    'binary table': 'from Emoji.emoji_table import load_emoji_table; table = load_emoji_table()',
+}
+
+CHILD_CODE = '''
+import json, time
+start = time.perf_counter()
+{loader}
+load_time = time.perf_counter() - start
+start = time.perf_counter()
+for emoji in list(table)[:200] * 50:
+    table.get(emoji)
+print(json.dumps({{'load': load_time, 'lookup': (time.perf_counter() - start) / 10000, 'size': len(table)}}))
+'''
+
+
+def run(loader, repeats):
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', CHILD_CODE.format(loader=loader)],
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        timings = json.loads(output)
+        if best is None or timings['load'] < best['load']:
+            best = timings
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare emoji table load times')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'='*60}")
+    print(f"{'Source':22} {'emojis':>7} {'load':>10} {'lookup':>10}")
+    for name, loader in LOADERS.items():
+        timings = run(loader, args.repeats)
+        print(f"{name:22} {timings['size']:7d} {timings['load'] * 1000:8.2f}ms {timings['lookup'] * 1e9:8.0f}ns")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Report the import and load time saved by enabling only some modalities in load_models()
+Every configuration runs in a fresh interpreter under python -X importtime, the report lists the
+startup time per configuration and the heaviest top-level imports the smaller configurations avoid.
+
+Usage:
+    python benchmark_imports.py
+    python benchmark_imports.py --modalities emoji emoji,text emoji,text,image
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+CHILD_CODE = '''
+import time
+start = time.perf_counter()
+from SentimentAnalysis import load_models, get_sentiments
+image_model, text_model_ensemble = load_models(modalities={modalities!r})
+get_sentiments(['I got the job 😁'], image_model, text_model_ensemble)
+print('STARTUP', time.perf_counter() - start)
+'''
+
+
+def parse_importtime(stderr):
+    """
+    :param stderr: output of python -X importtime
+    :return: dict of top-level package -> cumulative import time in seconds
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            # One space of indentation marks imports made directly by the script
+            name = match.group(4).split('.')[0]
+            packages[name] = packages.get(name, 0) + int(match.group(2)) / 1e6
+    return packages
+
+
+def run(modalities):
+    """
+    :return: startup seconds (None on failure), dict of top-level package -> import seconds, error
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             CHILD_CODE.format(modalities=tuple(modalities))],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    packages = parse_importtime(result.stderr)
+    startup = [line.split()[1] for line in result.stdout.splitlines() if line.startswith('STARTUP')]
+    if result.returncode != 0 or not startup:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+        return None, packages, error
+    return float(startup[0]), packages, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare startup time of modality selections')
+    parser.add_argument('--modalities', nargs='+', default=['emoji', 'emoji,text', 'emoji,text,image'],
+                        help='comma separated modality sets')
+    parser.add_argument('--top', type=int, default=10, help='number of avoided imports to list')
+    args = parser.parse_args()
+
+    results = [(selection, run(selection.split(','))) for selection in args.modalities]
+
+    print(f"{'='*60}")
+    print(f"{'Modalities':20} {'startup':>10} {'imports':>10}")
+    for selection, (startup, packages, error) in results:
+        startup_text = f"{startup:9.2f}s" if startup is not None else f"{'failed':>10}"
+        print(f"{selection:20} {startup_text} {sum(packages.values()):9.2f}s")
+        if error:
+            print(f"  {error}")
+
+    _, (_, largest, _) = max(results, key=lambda result: sum(result[1][1].values()))
+    _, (_, smallest, _) = min(results, key=lambda result: sum(result[1][1].values()))
+    avoided = sorted(((seconds, name) for name, seconds in largest.items() if name not in smallest), reverse=True)
+    if avoided:
+        print(f"\nHeaviest imports avoided by the smallest selection:")
+        for seconds, name in avoided[:args.top]:
+            print(f"  {name:30} {seconds:7.3f}s")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Benchmark cold start with and without the frozen model artifacts.
+Every configuration runs in a fresh interpreter and reports the import time of SentimentAnalysis,
+the load_models() time and the latency of the first get_sentiments call.
+
+Usage:
+    python freeze_models.py
+    python benchmark_startup.py
+"""
+import json
+import subprocess
+import sys
+import time
+
+SENTENCES = ["I'm so happy today 😁", 'can school be done already?🙄']
+
+
+def measure(frozen):
+    """Run in the child interpreter, prints the timings as JSON"""
+    start = time.perf_counter()
+    from SentimentAnalysis import load_models, get_sentiments
+    import_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image_model, text_model_ensemble = load_models(frozen=frozen)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_sentiments(SENTENCES, image_model, text_model_ensemble)
+    first_prediction = time.perf_counter() - start
+
+    print(json.dumps({'import': import_time, 'load': load_time, 'first_prediction': first_prediction}))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        measure(sys.argv[2] == 'frozen')
+        return
+
+    print(f"{'='*60}")
+    print(f"{'Artifacts':10} {'import':>10} {'load':>10} {'first pred':>12} {'total':>10}")
+    for mode in ['hdf5', 'frozen']:
+        output = subprocess.run([sys.executable, __file__, '--child', mode],
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        total = sum(timings.values())
+        print(f"{mode:10} {timings['import']:9.2f}s {timings['load']:9.2f}s "
+              f"{timings['first_prediction']:11.2f}s {total:9.2f}s")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Benchmark length-bucketed batching of the text ensemble on the nps_chat_2_class texts.
+Reports throughput with and without bucketing and the largest difference in scores.
+"""
+import sys
+import os
+import time
+
+# Add Text directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
+
+import numpy as np
+from Text.sentiment.TextSentiment import load_finetuned_models, bucket_rows, TEXT_BUCKETS
+from Text.sentiment.build.nps_chat_2_class import TEXTS
+
+REPEATS = 3
+
+
+def time_scoring(scorer, texts):
+    """Best-of-REPEATS wall time for scoring texts, after one warm-up run"""
+    scores = scorer.score(texts)
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        scorer.score(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, np.array(scores)
+
+
+def main():
+    texts = list(TEXTS)
+    scorer = load_finetuned_models()
+    # Every text fits in the score cache, so timed runs would only measure cache hits
+    scorer.cache = None
+
+    tokenized = scorer.tokenize(texts)[scorer.signatures[0]]
+    print(f"Texts: {len(texts)}")
+    for length, rows in bucket_rows(tokenized, TEXT_BUCKETS):
+        print(f"  bucket <= {length:2d} tokens: {len(rows)} rows")
+
+    scorer.buckets = None
+    padded_time, padded_scores = time_scoring(scorer, texts)
+    scorer.buckets = TEXT_BUCKETS
+    bucketed_time, bucketed_scores = time_scoring(scorer, texts)
+
+    print(f"\n{'='*60}")
+    print(f"Padded to maxlen: {padded_time:.3f}s ({len(texts) / padded_time:.1f} texts/s)")
+    print(f"Bucketed:         {bucketed_time:.3f}s ({len(texts) / bucketed_time:.1f} texts/s)")
+    print(f"Speedup:          {padded_time / bucketed_time:.2f}x")
+    print(f"Max score diff:   {np.max(np.abs(padded_scores - bucketed_scores)):.2e}")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 """
 Check accuracy of both trained models by loading them and evaluating on test data.
+
+Usage:
+    python check_model_accuracy.py
+    python check_model_accuracy.py --quantization int8   # also report the delta of the quantized models
 """
+import argparse
 import sys
 import os
 import json
@@ -13,6 +18,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
 from keras.models import load_model
 from deepmoji.attlayer import AttentionWeightedAverage
 from deepmoji.sentence_tokenizer import SentenceTokenizer
+from deepmoji.quantization import QUANTIZATION_MODES, quantized_path, load_quantized_keras_model
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
 TWITTER_MODEL_PATH = 'Text/sentiment/finetuned/twitter_ss.hdf5'
@@ -27,8 +33,12 @@ def load_data(data_path):
         data = pickle.load(f)
         return data.get('texts', []), data.get('labels', [])
 
-def evaluate_model(model_path, data_path, model_name):
-    """Load model and evaluate on dataset"""
+def evaluate_model(model_path, data_path, model_name, quantization=None):
+    """Load model and evaluate on dataset, optionally from its quantized weights"""
+    if quantization is not None:
+        model_path = quantized_path(model_path, quantization)
+        model_name = f"{model_name} ({quantization})"
+
     print(f"\n{'='*60}")
     print(f"Evaluating {model_name}")
     print(f"{'='*60}")
@@ -46,8 +56,11 @@ def evaluate_model(model_path, data_path, model_name):
     try:
         # Load model
         print(f"Loading model from {model_path}...")
-        model = load_model(model_path, 
-                          custom_objects={'AttentionWeightedAverage': AttentionWeightedAverage})
+        custom_objects = {'AttentionWeightedAverage': AttentionWeightedAverage}
+        if quantization is not None:
+            model = load_quantized_keras_model(model_path, custom_objects)
+        else:
+            model = load_model(model_path, custom_objects=custom_objects)
         
         # Load data
         print(f"Loading test data from {data_path}...")
@@ -90,6 +103,11 @@ def evaluate_model(model_path, data_path, model_name):
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Evaluate the finetuned text models')
+    parser.add_argument('--quantization', choices=QUANTIZATION_MODES, default=None,
+                        help='also evaluate the models written by quantize_models.py')
+    args = parser.parse_args()
+
     print("="*60)
     print("Model Accuracy Checker")
     print("="*60)
@@ -97,6 +115,13 @@ def main():
     # Evaluate both models
     twitter_results = evaluate_model(TWITTER_MODEL_PATH, TWITTER_DATA_PATH, "Twitter Model")
     youtube_results = evaluate_model(YOUTUBE_MODEL_PATH, YOUTUBE_DATA_PATH, "YouTube Model")
+
+    quantized_results = {}
+    if args.quantization:
+        quantized_results['Twitter Model'] = (twitter_results, evaluate_model(
+            TWITTER_MODEL_PATH, TWITTER_DATA_PATH, "Twitter Model", args.quantization))
+        quantized_results['YouTube Model'] = (youtube_results, evaluate_model(
+            YOUTUBE_MODEL_PATH, YOUTUBE_DATA_PATH, "YouTube Model", args.quantization))
     
     # Summary
     print(f"\n{'='*60}")
@@ -112,6 +137,14 @@ def main():
         print(f"YouTube Model Accuracy:  {youtube_results['accuracy']:.4f} ({youtube_results['accuracy']*100:.2f}%)")
     else:
         print("YouTube Model: Failed to evaluate")
+
+    for model_name, (original, quantized) in quantized_results.items():
+        if original and quantized:
+            delta = quantized['accuracy'] - original['accuracy']
+            print(f"{model_name} {args.quantization} Accuracy: {quantized['accuracy']:.4f} "
+                  f"(delta {delta*100:+.2f} points)")
+        else:
+            print(f"{model_name} {args.quantization}: Failed to evaluate")
     
     print(f"{'='*60}\n")
 
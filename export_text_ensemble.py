@@ -0,0 +1,41 @@
+"""Export the fused text ensemble.
+
+Converts the finetuned Twitter and YouTube models into inference-only
+models (tanh folded into the embedding table, no dropout), wraps them in
+a single Keras model with a shared input and an averaging output and
+saves it as one hdf5 file, which load_finetuned_models() prefers when
+present.
+"""
+
+from __future__ import print_function
+import sys
+import os
+
+# Add Text directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
+
+from keras.models import load_model
+from deepmoji.attlayer import AttentionWeightedAverage
+from deepmoji.model_def import deepmoji_inference_model
+from Text.sentiment.TextSentiment import (
+    TWITTER_MODEL_PATH,
+    YOUTUBE_MODEL_PATH,
+    ENSEMBLE_MODEL_PATH,
+    build_ensemble_model,
+    save_ensemble_model)
+
+for path in [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]:
+    if not os.path.exists(path):
+        print(f"ERROR: Finetuned model not found at {path}")
+        print("Train it first with train_twitter_model.py / train_youtube_model.py")
+        sys.exit(1)
+
+custom_objects = {'AttentionWeightedAverage': AttentionWeightedAverage}
+twitter_model = load_model(TWITTER_MODEL_PATH, custom_objects=custom_objects)
+youtube_model = load_model(YOUTUBE_MODEL_PATH, custom_objects=custom_objects)
+
+ensemble_model = build_ensemble_model([deepmoji_inference_model(twitter_model),
+                                       deepmoji_inference_model(youtube_model)])
+save_ensemble_model(ensemble_model, ENSEMBLE_MODEL_PATH)
+
+print(f"Saved fused ensemble to {ENSEMBLE_MODEL_PATH}")
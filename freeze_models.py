@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Export the text ensemble and the C3D image model as frozen, inference-only artifacts
+The artifacts hold the model config, metadata (maxlen, vocabulary hash, output semantics) and
+the weights as contiguous, memory-mappable arrays, without optimizer state. load_models()
+prefers them over the hdf5 files when present.
+
+The artifacts record the size and modification time of the model files they are exported from,
+and are ignored once those files change, so re-run this script after retraining. The base-weight
+fallback with untrained sentiment heads is never frozen.
+
+Usage:
+    python freeze_models.py
+"""
+import os
+import sys
+
+# Add Text directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
+
+from deepmoji.frozen import freeze_keras_model, file_hash, source_identities
+from deepmoji.global_variables import VOCAB_PATH
+from Image.ImageSentiment import load_c3d_sentiment_model, FROZEN_IMAGE_MODEL_PATH, IMAGE_MODEL_PATH, IMAGE_OUTPUTS
+from Text.sentiment.TextSentiment import (
+    load_finetuned_models,
+    model_maxlen,
+    FROZEN_ENSEMBLE_PATH,
+    FROZEN_ENSEMBLE_SOURCES,
+    TEXT_OUTPUT)
+
+
+def freeze_text_ensemble():
+    try:
+        text_model_ensemble = load_finetuned_models(frozen=False, fallback=False)
+    except FileNotFoundError as e:
+        print(f"{e}\nNot freezing the base-weight fallback, train the models first")
+        return
+    ensemble_model = text_model_ensemble.models[0]
+    metadata = {'model': 'text_ensemble',
+                'maxlen': model_maxlen(ensemble_model, text_model_ensemble.maxlen),
+                'vocabulary_hash': file_hash(VOCAB_PATH),
+                'sources': source_identities(FROZEN_ENSEMBLE_SOURCES),
+                'output': TEXT_OUTPUT}
+    freeze_keras_model(ensemble_model, FROZEN_ENSEMBLE_PATH, metadata)
+    print(f"Saved frozen text ensemble to {FROZEN_ENSEMBLE_PATH} "
+          f"({os.path.getsize(FROZEN_ENSEMBLE_PATH) / 2 ** 20:.1f} MB)")
+
+
+def main():
+    freeze_text_ensemble()
+
+    image_model = load_c3d_sentiment_model(frozen=False)
+    if image_model is None:
+        print("Image model not found, no frozen image model written")
+        return
+    metadata = {'model': 'c3d_sentiment',
+                'input_shape': list(image_model.input_shape[1:]),
+                'sources': source_identities([IMAGE_MODEL_PATH]),
+                'output': IMAGE_OUTPUTS}
+    freeze_keras_model(image_model, FROZEN_IMAGE_MODEL_PATH, metadata)
+    print(f"Saved frozen image model to {FROZEN_IMAGE_MODEL_PATH} "
+          f"({os.path.getsize(FROZEN_IMAGE_MODEL_PATH) / 2 ** 20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
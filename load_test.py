@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Load test for serve.py on localhost
+Sends single-message requests from many concurrent clients and reports throughput and latency.
+
+Usage:
+    python serve.py &
+    python load_test.py --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import time
+
+SAMPLE_MESSAGES = [
+    'lol',
+    'ok 👍',
+    '😂😂😂',
+    "I'm so sad today 😢",
+    'I got the job 😁',
+    'wow that move was 💩',
+    "I'm not that sad today 😊",
+    'This episode 🔥',
+    'can school be done already?🙄',
+    'Happy 28th birthday to you, 🎈',
+]
+
+
+async def _request(reader, writer, host, port, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    head = '{} {} HTTP/1.1\r\nHost: {}:{}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'.format(
+        method, path, host, port, len(body))
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def wait_until_ready(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await _request(reader, writer, host, port, 'GET', '/ready')
+            writer.close()
+            if status == 200:
+                return True
+        except (ConnectionError, OSError):
+            pass
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def client(host, port, counter, total, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            i = counter[0]
+            counter[0] += 1
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, port, 'POST', '/sentiment',
+                                       {'text': SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, total, concurrency, ready_timeout):
+    if not await wait_until_ready(host, port, ready_timeout):
+        print(f"Server at {host}:{port} is not ready")
+        return
+
+    counter = [0]
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, counter, total, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{'='*60}")
+    print(f"Requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"Concurrency: {concurrency}")
+    print(f"Throughput:  {len(latencies) / elapsed:.1f} requests/s")
+    print(f"Latency:     p50 {percentile(0.5):.1f} ms | p90 {percentile(0.9):.1f} ms | "
+          f"p99 {percentile(0.99):.1f} ms")
+    print(f"{'='*60}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the sentiment server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--ready-timeout', type=float, default=120)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.ready_timeout))
+
+
+if __name__ == '__main__':
+    main()
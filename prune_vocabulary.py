@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Prune the text vocabulary and embedding table to the tokens our chat domain uses
+Tokenizes a representative corpus, keeps the special tokens plus the top-K most used tokens and
+writes a pruned vocabulary and a pruned fused ensemble (inference-only, tanh folded into the
+embedding table). load_finetuned_models(pruned=True) loads them. The pruned vocabulary maps
+words straight to the pruned embedding rows, other words become CUSTOM_UNKNOWN, so predictions
+are unchanged for every sentence whose tokens are all kept.
+
+Reports the embedding memory saved and the coverage lost, as computed by coverage().
+
+Usage:
+    python prune_vocabulary.py corpus.txt --top-k 20000 --eval held_out.txt
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import sys
+
+# Add Text directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
+
+from keras.models import load_model
+from deepmoji.attlayer import AttentionWeightedAverage
+from deepmoji.global_variables import VOCAB_PATH, NB_TOKENS
+from deepmoji.model_def import deepmoji_inference_model
+from deepmoji.sentence_tokenizer import SentenceTokenizer, coverage
+from deepmoji.vocab_pruning import count_token_usage, select_kept_tokens, build_remap, prune_vocabulary
+from Text.sentiment.TextSentiment import (
+    TWITTER_MODEL_PATH,
+    YOUTUBE_MODEL_PATH,
+    PRUNED_ENSEMBLE_MODEL_PATH,
+    PRUNED_VOCAB_PATH,
+    build_ensemble_model,
+    save_ensemble_model)
+
+EMBEDDING_DIM = 256
+
+
+def read_messages(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def report_coverage(name, tokens, remap):
+    full = coverage(tokens)
+    pruned = coverage(remap[tokens])
+    print(f"  {name:8} coverage {full:.4f} -> {pruned:.4f} ({(pruned - full) * 100:+.2f} points)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prune the vocabulary and embedding to a corpus')
+    parser.add_argument('corpus', help='text file with one message per line')
+    parser.add_argument('--top-k', type=int, default=20000, help='number of non-special tokens to keep')
+    parser.add_argument('--eval', default=None, help='held-out messages to measure the coverage lost')
+    parser.add_argument('--maxlen', type=int, default=30)
+    args = parser.parse_args()
+
+    with open(VOCAB_PATH, 'r') as f:
+        vocabulary = json.load(f)
+    tokenizer = SentenceTokenizer(vocabulary, args.maxlen)
+
+    corpus_tokens, _, _ = tokenizer.tokenize_sentences(read_messages(args.corpus))
+    kept_tokens = select_kept_tokens(count_token_usage(corpus_tokens, NB_TOKENS), args.top_k)
+    remap = build_remap(kept_tokens, NB_TOKENS)
+
+    removed_rows = NB_TOKENS - len(kept_tokens)
+    print(f"{'='*60}")
+    print(f"Kept {len(kept_tokens)} of {NB_TOKENS} tokens")
+    print(f"  embedding memory saved: {removed_rows * EMBEDDING_DIM * 4 / 2 ** 20:.1f} MB per model")
+    report_coverage('corpus', corpus_tokens, remap)
+    if args.eval:
+        eval_tokens, _, _ = tokenizer.tokenize_sentences(read_messages(args.eval))
+        report_coverage('eval', eval_tokens, remap)
+
+    with open(PRUNED_VOCAB_PATH, 'w') as f:
+        json.dump(prune_vocabulary(vocabulary, kept_tokens), f, ensure_ascii=False)
+    print(f"Saved pruned vocabulary to {PRUNED_VOCAB_PATH}")
+
+    for path in [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]:
+        if not os.path.exists(path):
+            print(f"Finetuned model not found at {path}, not writing the pruned ensemble")
+            print(f"{'='*60}")
+            return
+
+    custom_objects = {'AttentionWeightedAverage': AttentionWeightedAverage}
+    models = [deepmoji_inference_model(load_model(path, custom_objects=custom_objects), kept_tokens)
+              for path in [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH]]
+    save_ensemble_model(build_ensemble_model(models, args.maxlen), PRUNED_ENSEMBLE_MODEL_PATH)
+    print(f"Saved pruned ensemble to {PRUNED_ENSEMBLE_MODEL_PATH}")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
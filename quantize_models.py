@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Quantize the finetuned text models and the C3D image model to float16 or int8 weights
+The quantized weights are written next to each model file (e.g. twitter_ss.int8.npz) and are
+picked up by load_models(quantization=...), load_numpy_models(quantization=...) and
+check_model_accuracy.py --quantization, which reports the accuracy delta on SS-Twitter/SS-Youtube.
+Only load_numpy_models keeps int8 weights in memory, the Keras models are dequantized to float32
+at load time and only gain the smaller files.
+
+Usage:
+    python quantize_models.py --mode int8
+    python check_model_accuracy.py --quantization int8
+"""
+import argparse
+import os
+import sys
+
+# Add Text directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Text'))
+
+from deepmoji.quantization import QUANTIZATION_MODES, MIN_QUANTIZE_SIZE, quantize_hdf5
+from deepmoji.weights import get_weights_from_hdf5
+
+TWITTER_MODEL_PATH = 'Text/sentiment/finetuned/twitter_ss.hdf5'
+YOUTUBE_MODEL_PATH = 'Text/sentiment/finetuned/youtube_ss.hdf5'
+IMAGE_MODEL_PATH = 'Image/c3d_sentiment.hdf5'
+
+
+def weights_nbytes(model_path):
+    """
+    :param model_path: Keras model file
+    :return: size of the float weights in bytes
+    """
+    return sum(w.nbytes for _, _, weight_values in get_weights_from_hdf5(model_path) for w in weight_values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize the model weights')
+    parser.add_argument('--mode', choices=QUANTIZATION_MODES, default='int8')
+    parser.add_argument('--min-size', type=int, default=MIN_QUANTIZE_SIZE,
+                        help='arrays with fewer elements are kept in float32')
+    args = parser.parse_args()
+
+    print(f"{'='*60}")
+    for model_path in [TWITTER_MODEL_PATH, YOUTUBE_MODEL_PATH, IMAGE_MODEL_PATH]:
+        if not os.path.exists(model_path):
+            print(f"Skipping {model_path}, not found")
+            continue
+        target_path = quantize_hdf5(model_path, args.mode, min_size=args.min_size)
+        original = weights_nbytes(model_path)
+        quantized = os.path.getsize(target_path)
+        print(f"{model_path} -> {target_path}")
+        print(f"  weights {original / 2 ** 20:.1f} MB -> {quantized / 2 ** 20:.1f} MB "
+              f"({quantized / original:.0%})")
+    print(f"{'='*60}")
+    print(f"Check the accuracy delta with: python check_model_accuracy.py --quantization {args.mode}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Local HTTP inference server for ChatSentimentAnalysis
+Loads the models once and gathers concurrent requests into micro-batches for get_sentiments.
+
+Endpoints:
+    POST /sentiment   {"text": "..."} -> {"score": ...}
+                      {"texts": ["...", ...]} -> {"scores": [...]}
+    GET  /health      process is up
+    GET  /ready       models are loaded and requests can be served
+
+Usage:
+    python serve.py --port 8000 --max-batch-size 64 --max-wait-ms 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class MicroBatcher:
+    """
+    Gathers sentences from concurrent requests into batches of at most max_batch_size sentences,
+    waiting at most max_wait seconds for a batch to fill.
+    All model calls run on a single worker thread, Keras/TF1 models must stay on the thread
+    that loaded them
+    """
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT_MS / 1000):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.pending = asyncio.Queue()
+        self.models = None
+        self.ready = False
+        self.batches = 0
+        self.sentences = 0
+
+    async def load(self):
+        """
+        Load the models on the inference thread
+        """
+        from SentimentAnalysis import load_models
+        loop = asyncio.get_running_loop()
+        self.models = await loop.run_in_executor(self.executor, load_models)
+        self.ready = True
+
+    async def score(self, sentences):
+        """
+        Queue sentences for the next batch
+        :param sentences: list of sentences
+        :return: list of scores
+        """
+        # Requests larger than a batch are queued in max_batch_size chunks
+        loop = asyncio.get_running_loop()
+        futures = []
+        for start in range(0, len(sentences), self.max_batch_size):
+            future = loop.create_future()
+            await self.pending.put((sentences[start:start + self.max_batch_size], future))
+            futures.append(future)
+        scores = []
+        for chunk_scores in await asyncio.gather(*futures):
+            scores.extend(chunk_scores)
+        return scores
+
+    async def run(self):
+        """
+        Batching loop, runs until cancelled
+        """
+        from SentimentAnalysis import get_sentiments
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            requests = [carry if carry is not None else await self.pending.get()]
+            carry = None
+            size = len(requests[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.pending.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if size + len(request[0]) > self.max_batch_size:
+                    carry = request
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            batch = [sentence for sentences, _ in requests for sentence in sentences]
+            image_model, text_model_ensemble = self.models
+            try:
+                scores = await loop.run_in_executor(self.executor, get_sentiments,
+                                                    batch, image_model, text_model_ensemble)
+            except Exception as e:
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.sentences += len(batch)
+            start = 0
+            for sentences, future in requests:
+                if not future.done():
+                    future.set_result(scores[start:start + len(sentences)])
+                start += len(sentences)
+
+
+def _to_json_score(score):
+    return None if score is None else float(score)
+
+
+async def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [
+        'HTTP/1.1 {} {}'.format(status, STATUS_TEXT.get(status, '')),
+        'Content-Type: application/json',
+        'Content-Length: {}'.format(len(body)),
+        'Connection: {}'.format('keep-alive' if keep_alive else 'close'),
+    ]
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+async def _handle_request(batcher, method, path, body):
+    """
+    :return: status, payload
+    """
+    if path == '/health':
+        return 200, {'status': 'ok'}
+    if path == '/ready':
+        if batcher.ready:
+            return 200, {'status': 'ready', 'batches': batcher.batches, 'sentences': batcher.sentences}
+        return 503, {'status': 'loading'}
+    if path != '/sentiment':
+        return 404, {'error': 'unknown path {}'.format(path)}
+    if method != 'POST':
+        return 405, {'error': 'use POST'}
+    if not batcher.ready:
+        return 503, {'error': 'models are still loading'}
+
+    try:
+        request = json.loads(body.decode('utf-8'))
+    except ValueError:
+        return 400, {'error': 'body must be JSON'}
+
+    if isinstance(request, dict) and isinstance(request.get('text'), str):
+        scores = await batcher.score([request['text']])
+        return 200, {'score': _to_json_score(scores[0])}
+    if isinstance(request, dict) and isinstance(request.get('texts'), list) and \
+            all(isinstance(text, str) for text in request['texts']):
+        if not request['texts']:
+            return 200, {'scores': []}
+        scores = await batcher.score(request['texts'])
+        return 200, {'scores': [_to_json_score(score) for score in scores]}
+    return 400, {'error': 'expected {"text": "..."} or {"texts": ["...", ...]}'}
+
+
+async def handle_connection(batcher, reader, writer):
+    """
+    Serve HTTP/1.1 requests on one connection until the client closes it
+    Malformed requests get an error response and close the connection
+    """
+    try:
+        while True:
+            try:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+            except ValueError:
+                # readline raises ValueError for lines longer than the reader limit (64 KiB)
+                await _write_response(writer, 413, {'error': 'request line or header too long'}, False)
+                break
+            try:
+                method, path, version = request_line.decode('latin-1').split()
+            except ValueError:
+                await _write_response(writer, 400, {'error': 'malformed request line'}, False)
+                break
+
+            try:
+                length = int(headers.get('content-length', 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # The body cannot be skipped without its length, so the connection is closed
+                await _write_response(writer, 400, {'error': 'invalid Content-Length'}, False)
+                break
+            keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+            if length > MAX_BODY_BYTES:
+                await _write_response(writer, 413, {'error': 'body too large'}, False)
+                break
+            try:
+                body = await reader.readexactly(length) if length else b''
+            except asyncio.IncompleteReadError:
+                await _write_response(writer, 400, {'error': 'body shorter than Content-Length'}, False)
+                break
+
+            try:
+                status, payload = await _handle_request(batcher, method, path.split('?')[0], body)
+            except Exception as e:
+                status, payload = 500, {'error': str(e)}
+            await _write_response(writer, status, payload, keep_alive)
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    batcher = MicroBatcher(max_batch_size, max_wait_ms / 1000)
+    server = await asyncio.start_server(lambda r, w: handle_connection(batcher, r, w), host, port)
+    print(f"Listening on http://{host}:{port} (loading models...)")
+
+    start = time.perf_counter()
+    await batcher.load()
+    print(f"Models loaded in {time.perf_counter() - start:.1f}s, ready")
+
+    batching = asyncio.ensure_future(batcher.run())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batching.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve sentiment predictions over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
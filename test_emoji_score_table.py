@@ -0,0 +1,124 @@
+import random
+
+import emoji as emoji_library
+import numpy as np
+from Emoji.config import emoji2sentiment
+from Emoji.EmojiSentiment import (EMOJI_OVERRIDES, EMOJI_SEQUENCES, get_emoji_sentiment_fallback,
+                                  get_emoji_sentiments, get_emoji_sentiments_batch, get_emoji_score_table)
+from Text.deepmoji.emoji_sequences import SKIN_TONES
+
+
+def reference_emoji_sentiments(emojis_list):
+    # Per-call implementation that the precompiled table replaces
+    sentiment_lists = []
+    for emoji_list in emojis_list:
+        sentiment_list = []
+        for emoji in emoji_list:
+            if emoji in EMOJI_OVERRIDES:
+                sentiment = EMOJI_OVERRIDES[emoji]
+            else:
+                sentiment = emoji2sentiment.get(emoji)
+            if sentiment is None:
+                sentiment = get_emoji_sentiment_fallback(emoji)
+            if sentiment is not None:
+                try:
+                    name_lower = emoji_library.demojize(emoji).lower()
+                    negative_override_keys = [
+                        'sad', 'sadness', 'cry', 'crying', 'sob', 'sobbing', 'tear', 'tears',
+                        'disappointed', 'unhappy', 'broken', 'weep', 'weeping', 'angry', 'mad', 'frown'
+                    ]
+                    if any(k in name_lower for k in negative_override_keys):
+                        sentiment = -0.5
+                except Exception:
+                    pass
+                try:
+                    if isinstance(sentiment, (int, float)) and 0.0 <= sentiment <= 1.0:
+                        sentiment = (sentiment * 2) - 1
+                except Exception:
+                    pass
+                sentiment_list.append(sentiment)
+        sentiment_lists.append(sentiment_list)
+    return [sum(s) / len(s) if s else None for s in sentiment_lists]
+
+
+def single_emojis():
+    # Sequences are scored from their emojis, the per-call logic only covers single emojis.
+    # Lone skin tone modifiers are no longer scored
+    return sorted(e for e in get_emoji_score_table() if len(e) == 1 and e not in SKIN_TONES)
+
+
+def test_table_matches_per_call_logic_for_every_emoji():
+    table = get_emoji_score_table()
+    assert EMOJI_SEQUENCES <= set(table)
+    assert set(e for e in emoji_library.UNICODE_EMOJI if len(e) == 1) <= set(table)
+    emojis = single_emojis()
+    assert get_emoji_sentiments([[e] for e in emojis]) == reference_emoji_sentiments([[e] for e in emojis])
+
+
+def test_batches_match_per_call_logic():
+    rng = random.Random(0)
+    emojis = single_emojis() + ['a', '', 'not an emoji']
+    batch = [[rng.choice(emojis) for _ in range(rng.randint(0, 6))] for _ in range(500)]
+    assert get_emoji_sentiments(batch) == reference_emoji_sentiments(batch)
+
+
+def test_emojis_outside_the_table_are_resolved():
+    assert get_emoji_sentiments([['x'], []]) == reference_emoji_sentiments([['x'], []])
+
+
+def test_sequences_average_their_emojis():
+    facepalm, male_sign = '\U0001F926', '\u2642'
+    expected = reference_emoji_sentiments([[facepalm, male_sign]])
+    # Skin tone, ZWJ and variation selector carry no sentiment
+    for sequence in [facepalm + '\U0001F3FF\u200d\u2642\ufe0f', facepalm + '\u200d\u2642']:
+        assert get_emoji_sentiments([[sequence]]) == expected
+    heart = '\u2764'
+    assert get_emoji_sentiments([[heart + '\ufe0f']]) == reference_emoji_sentiments([[heart]])
+    # Flags and keycaps have no scored emojis and are ignored
+    assert get_emoji_sentiments([['\U0001F1FA\U0001F1F8', '#\ufe0f\u20e3']]) == [None]
+
+
+def test_modifiers_carry_no_sentiment():
+    assert get_emoji_sentiments([[tone] for tone in SKIN_TONES]) == [None] * len(SKIN_TONES)
+    assert get_emoji_sentiments([['\U0001F600', '\U0001F3FD']]) == get_emoji_sentiments([['\U0001F600']])
+    assert get_emoji_sentiments([['\u200d'], ['\ufe0f']]) == [None, None]
+    assert np.isnan(get_emoji_sentiments_batch([['\U0001F3FD']])).all()
+
+
+def test_sequences_on_bases_newer_than_the_emoji_library():
+    # Person climbing is not in the emoji library, the ZWJ sequence averages it with the male sign
+    climber, male_sign = '\U0001F9D7', '\u2642'
+    assert climber not in emoji_library.UNICODE_EMOJI
+    expected = get_emoji_sentiments([[climber, male_sign]])
+    assert expected[0] is not None
+    assert get_emoji_sentiments([[climber + '\U0001F3FD\u200d\u2642\ufe0f']]) == expected
+    assert get_emoji_sentiments([[climber + '\U0001F3FD']]) == get_emoji_sentiments([[climber]])
+
+
+def assert_batch_matches(batch):
+    expected = np.array([np.nan if s is None else s for s in get_emoji_sentiments(batch)], dtype=np.float64)
+    result = get_emoji_sentiments_batch(batch)
+    assert np.array_equal(np.isnan(result), np.isnan(expected))
+    assert np.allclose(result, expected, rtol=0, atol=1e-12, equal_nan=True)
+
+
+def test_batch_mode_matches_list_api():
+    rng = random.Random(0)
+    emojis = sorted(get_emoji_score_table()) + ['a', '', 'not an emoji', '\U0001F9D7\U0001F3FD\u200d\u2642\ufe0f']
+    # Long lists as well, reduceat sums them pairwise
+    for max_emojis in [0, 6, 50]:
+        assert_batch_matches([[rng.choice(emojis) for _ in range(rng.randint(0, max_emojis))]
+                              for _ in range(500)])
+    assert_batch_matches([tuple(emoji_list) for emoji_list in [['\U0001F600'], [], ['\U0001F1FA\U0001F1F8']]])
+    assert len(get_emoji_sentiments_batch([])) == 0
+
+
+if __name__ == '__main__':
+    test_table_matches_per_call_logic_for_every_emoji()
+    test_batches_match_per_call_logic()
+    test_emojis_outside_the_table_are_resolved()
+    test_sequences_average_their_emojis()
+    test_modifiers_carry_no_sentiment()
+    test_sequences_on_bases_newer_than_the_emoji_library()
+    test_batch_mode_matches_list_api()
+    print('test_emoji_score_table passed')
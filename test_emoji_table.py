@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+from Emoji.config import emoji2sentiment
+from Emoji.emoji_table import (CONFIG_PATH, EMOJI_TABLE_PATH, build_emoji_table, config_stamp,
+                               load_emoji_table, write_emoji_table)
+
+
+def test_shipped_table_matches_config():
+    table = load_emoji_table(EMOJI_TABLE_PATH, CONFIG_PATH)
+    assert table is not None, 'emoji2sentiment.bin is stale, run python -m Emoji.emoji_table'
+    assert dict(table) == emoji2sentiment
+
+
+def test_lookups():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'table.bin')
+        write_emoji_table({'😁': 0.5, '😢': -0.25, 'a': 1.0}, path)
+        table = load_emoji_table(path, config_path=path + '.missing')
+        assert table['😢'] == -0.25
+        assert table.get('😁') == 0.5
+        assert table.get('🙂') is None
+        assert table.get('😁😁', 'default') == 'default'
+        assert '😁' in table and '🙂' not in table and 5 not in table
+        assert list(table) == ['a', '😁', '😢']
+        del table
+
+
+def test_stale_table_is_ignored():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, 'config.py')
+        path = os.path.join(directory, 'table.bin')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write("emoji2sentiment = {u'\\U0001F601': 0.25}\n")
+        assert build_emoji_table(config_path, path) == 1
+        assert dict(load_emoji_table(path, config_path)) == {'😁': 0.25}
+
+        with open(config_path, 'a', encoding='utf-8') as f:
+            f.write("emoji2sentiment[u'\\U0001F622'] = -0.5\n")
+        assert load_emoji_table(path, config_path) is None
+
+
+def test_touched_config_is_hashed_once():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, 'config.py')
+        path = os.path.join(directory, 'table.bin')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write("emoji2sentiment = {u'\\U0001F601': 0.25}\n")
+        build_emoji_table(config_path, path)
+        # Same content with a new mtime, as after a checkout
+        os.utime(config_path, ns=(0, config_stamp(config_path)[1] + 10 ** 9))
+        assert load_emoji_table(path, config_path).source_stamp != config_stamp(config_path)
+        assert load_emoji_table(path, config_path).source_stamp == config_stamp(config_path)
+
+        # An edit of the same size changes the mtime and is caught by the hash
+        with open(config_path, 'r+', encoding='utf-8') as f:
+            f.write("emoji2sentiment = {u'\\U0001F601': 0.75}\n")
+        os.utime(config_path, ns=(0, config_stamp(config_path)[1] + 10 ** 9))
+        assert load_emoji_table(path, config_path) is None
+
+
+def test_invalid_file_is_ignored():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'table.bin')
+        with open(path, 'wb') as f:
+            f.write(b'not a table')
+        assert load_emoji_table(path, config_path=path + '.missing') is None
+
+
+if __name__ == '__main__':
+    test_shipped_table_matches_config()
+    test_lookups()
+    test_stale_table_is_ignored()
+    test_touched_config_is_hashed_once()
+    test_invalid_file_is_ignored()
+    print('test_emoji_table passed')
@@ -0,0 +1,209 @@
+import threading
+import time
+
+import SentimentAnalysis
+from SentimentAnalysis import DEDUP_SAVED, IMAGE_STATS, _deduplicate, _scatter, get_sentiments, stream_sentiments
+
+
+def test_deduplicate_keeps_first_occurrence_order():
+    saved = DEDUP_SAVED['text']
+    unique_items, inverse = _deduplicate(['a', 'b', 'a', 'c', 'b'], 'text')
+    assert unique_items == ['a', 'b', 'c']
+    assert inverse == [0, 1, 0, 2, 1]
+    assert DEDUP_SAVED['text'] == saved + 2
+
+    unique_items, inverse = _deduplicate([['😂'], ['😢'], ['😂']], 'emoji', key=tuple)
+    assert unique_items == [['😂'], ['😢']]
+    assert inverse == [0, 1, 0]
+
+
+def test_scatter_duplicates():
+    assert _scatter([0.5, -0.5, 0.1], [0, 1, 0, 2, 1]) == [0.5, -0.5, 0.5, 0.1, -0.5]
+    # Stops at the first entry without a score, e.g. when the image model is unavailable
+    assert _scatter([0.5], [0, 1, 0]) == [0.5]
+    assert _scatter([], [0, 0]) == []
+
+
+def test_duplicate_sentences_get_their_own_scores_in_order():
+    sentences = ['😂', 'ok 😢', '😂', '👍 👍', 'ok 😢', 'no emoji', '😂']
+    expected = [get_sentiments([sentence], None, None)[0] for sentence in sentences]
+    assert get_sentiments(sentences, None, None) == expected
+
+
+def test_dedup_counter_is_thread_safe():
+    saved = DEDUP_SAVED['emoji']
+
+    def worker():
+        for _ in range(2000):
+            _deduplicate(['x', 'x'], 'emoji')
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SentimentAnalysis.DEDUP_SAVED['emoji'] == saved + 8 * 2000
+
+
+class StubImageModel:
+    """Records the image urls scored, in place of the C3D stages"""
+
+    def __init__(self, score=0.25):
+        self.score = score
+        self.loaded = []
+        self.scored = []
+        self.load_threads = set()
+
+    def load_images(self, image_urls, image_model):
+        if not image_urls or image_model is None:
+            return {}
+        self.loaded.extend(image_urls)
+        self.load_threads.add(threading.current_thread().name)
+        return {url: url for url in image_urls}
+
+    def score_images(self, image_urls, image_model, loaded_images):
+        if not image_urls or image_model is None:
+            return []
+        self.scored.extend(image_urls)
+        return [self.score for _ in image_urls]
+
+
+def with_stub_images(test):
+    def run():
+        stub = StubImageModel()
+        original = SentimentAnalysis._load_images, SentimentAnalysis._score_images
+        SentimentAnalysis._load_images, SentimentAnalysis._score_images = stub.load_images, stub.score_images
+        try:
+            test(stub)
+        finally:
+            SentimentAnalysis._load_images, SentimentAnalysis._score_images = original
+    run.__name__ = test.__name__
+    return run
+
+
+@with_stub_images
+def test_images_only_scored_for_rows_without_emoji_or_text(stub):
+    sentences = ['😂 <img>a.gif</img>', '<img>b.gif</img>', '<img>b.gif</img>', '<img>c.gif</img> 👍']
+    skipped = IMAGE_STATS['skipped']
+    scores = get_sentiments(sentences, stub, None)
+    assert stub.loaded == [] and stub.scored == ['b.gif']
+    assert scores[1] == scores[2] == stub.score
+    assert scores[0] != stub.score and scores[3] != stub.score
+    assert IMAGE_STATS['skipped'] == skipped + 2
+
+    stub.scored = []
+    get_sentiments(sentences, stub, None, score_all_images=True)
+    assert stub.scored == ['a.gif', 'b.gif', 'c.gif']
+
+
+@with_stub_images
+def test_no_image_work_without_image_urls(stub):
+    get_sentiments(['😂', 'no image', '👍 ok'], stub, None, concurrent=True)
+    assert stub.loaded == [] and stub.scored == []
+
+
+def stub_text_scores(texts, text_model_ensemble):
+    # Deterministic score per text in place of the DeepMoji ensemble
+    if not texts or text_model_ensemble is None:
+        return []
+    return [(len(text) % 7) / 7.0 - 0.5 for text in texts]
+
+
+@with_stub_images
+def test_concurrent_matches_sequential(stub):
+    original = SentimentAnalysis._score_texts
+    SentimentAnalysis._score_texts = stub_text_scores
+    try:
+        sentences = ['😂 lol', 'not sad 😀', '<img>a.gif</img>', 'meh', '<img>a.gif</img>', '😢',
+                     'meh', '<img>b.gif</img> ok', '🎉🎉 <img>c.gif</img>', ''] * 20
+        sequential = get_sentiments(sentences, stub, 'text model')
+        assert stub.load_threads == set()
+        concurrent = get_sentiments(sentences, stub, 'text model', concurrent=True)
+        assert concurrent == sequential
+        # Images needed by rows without emoji or text are prefetched on the modality threads
+        assert stub.loaded == ['a.gif']
+        assert all(name.startswith('modality') for name in stub.load_threads)
+
+        results = [None] * 4
+
+        def worker(i):
+            results[i] = get_sentiments(sentences, stub, 'text model', concurrent=True)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [sequential] * 4
+    finally:
+        SentimentAnalysis._score_texts = original
+
+
+def test_stream_yields_scores_in_order():
+    sentences = ['😂', 'ok 😢', '👍', 'none', '🎉'] * 30
+    expected = get_sentiments(sentences, None, None)
+    streamed = list(stream_sentiments(iter(sentences), None, None, batch_size=16))
+    assert streamed == list(enumerate(expected))
+
+
+def test_stream_flushes_slow_sources_after_max_wait():
+    def slow_source():
+        yield '😂'
+        time.sleep(1.0)
+        yield '😢'
+
+    start = time.monotonic()
+    stream = stream_sentiments(slow_source(), None, None, batch_size=64, max_wait=0.05)
+    assert next(stream)[0] == 0
+    assert time.monotonic() - start < 0.5
+    assert next(stream)[0] == 1
+
+
+def test_stream_reraises_source_errors():
+    def failing_source():
+        yield '😂'
+        raise IOError('connection lost')
+
+    stream = stream_sentiments(failing_source(), None, None, batch_size=4, max_wait=0.05)
+    assert next(stream)[0] == 0
+    try:
+        next(stream)
+        assert False, 'source error swallowed'
+    except IOError:
+        pass
+
+
+def test_abandoned_stream_stops_its_reader():
+    closed = threading.Event()
+
+    def endless_source():
+        try:
+            while True:
+                yield '😂'
+        finally:
+            closed.set()
+
+    threads = threading.active_count()
+    stream = stream_sentiments(endless_source(), None, None, batch_size=4)
+    next(stream)
+    stream.close()
+    assert closed.wait(2.0)
+    deadline = time.monotonic() + 2.0
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == threads
+
+
+if __name__ == '__main__':
+    test_deduplicate_keeps_first_occurrence_order()
+    test_scatter_duplicates()
+    test_duplicate_sentences_get_their_own_scores_in_order()
+    test_dedup_counter_is_thread_safe()
+    test_images_only_scored_for_rows_without_emoji_or_text()
+    test_no_image_work_without_image_urls()
+    test_concurrent_matches_sequential()
+    test_stream_yields_scores_in_order()
+    test_stream_flushes_slow_sources_after_max_wait()
+    test_stream_reraises_source_errors()
+    test_abandoned_stream_stops_its_reader()
+    print('test_get_sentiments passed')
@@ -0,0 +1,104 @@
+from SentimentCache import SentimentCache
+
+
+def test_cache_roundtrip_and_persistence(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = SentimentCache(path, fingerprint='models-v1')
+    assert cache.get_many(['lol 😂']) == [None]
+
+    cache.put_many(['lol 😂'], [{'score': 0.5, 'emoji': 0.6, 'image': None, 'text': 0.4}])
+    cache.close()
+
+    # Entries survive a restart and normalization ignores surrounding whitespace
+    cache = SentimentCache(path, fingerprint='models-v1')
+    result = cache.get_many(['  lol 😂 '])[0]
+    assert result == {'score': 0.5, 'emoji': 0.6, 'image': None, 'text': 0.4}
+    assert cache.hits == 1
+
+
+def test_cache_invalidated_by_fingerprint_and_variant(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = SentimentCache(path, fingerprint='models-v1')
+    cache.put_many(['ok 👍'], [{'score': 0.3}], variant='0.2')
+    assert cache.get_many(['ok 👍'], variant='0.5') == [None]
+    cache.close()
+
+    cache = SentimentCache(path, fingerprint='models-v2')
+    assert cache.get_many(['ok 👍'], variant='0.2') == [None]
+    assert cache.compact() == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SentimentCache(str(tmp_path / 'cache.sqlite'), max_entries=2, fingerprint='models-v1')
+    for i, sentence in enumerate(['a', 'b', 'c']):
+        cache.put_many([sentence], [{'score': float(i)}])
+        cache.connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (i, cache.key(sentence)))
+
+    assert cache.evict() == 1
+    assert cache.get_many(['a', 'b', 'c']) == [None, {'score': 1.0, 'emoji': None, 'image': None, 'text': None},
+                                               {'score': 2.0, 'emoji': None, 'image': None, 'text': None}]
+
+
+def test_put_many_keeps_cache_bounded(tmp_path):
+    cache = SentimentCache(str(tmp_path / 'cache.sqlite'), max_entries=10, fingerprint='models-v1',
+                           evict_interval=5)
+    for i in range(100):
+        cache.put_many([str(i)], [{'score': 0.0}])
+        assert cache.stats()['entries'] <= 10 + 5
+
+
+def test_cache_shared_between_threads(tmp_path):
+    import threading
+
+    cache = SentimentCache(str(tmp_path / 'cache.sqlite'), max_entries=50, fingerprint='models-v1',
+                           evict_interval=10)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(50):
+                sentence = str(offset + i)
+                cache.put_many([sentence], [{'score': float(i)}])
+                cache.get_many([sentence])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in (0, 1000, 2000, 3000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.stats()['entries'] <= 50 + 10
+
+
+class StubModel:
+    def __init__(self, *source_paths):
+        self.source_paths = list(source_paths)
+
+
+def test_get_sentiments_keys_entries_by_model_files_and_options(tmp_path, monkeypatch):
+    import SentimentAnalysis
+    from SentimentAnalysis import get_sentiments
+
+    monkeypatch.setattr(SentimentAnalysis, '_score_texts', lambda texts, model: [0.0 for _ in texts])
+    model_path = tmp_path / 'model.hdf5'
+    model_path.write_bytes(b'weights-v1')
+    cache = SentimentCache(str(tmp_path / 'cache.sqlite'), fingerprint='code-v1')
+    sentences = ['😂', '😢 😢']
+    expected = get_sentiments(sentences, None, StubModel(str(model_path)), cache=cache)
+    assert cache.misses == 2
+    assert get_sentiments(sentences, None, StubModel(str(model_path)), cache=cache) == expected
+    assert cache.hits == 2
+
+    # Another artifact, e.g. a quantized or pruned model, gets its own entries
+    get_sentiments(sentences, None, StubModel(str(tmp_path / 'model.int8.npz')), cache=cache)
+    assert cache.misses == 4
+    # So does a rebuilt model file
+    model_path.write_bytes(b'weights-v2-retrained')
+    get_sentiments(sentences, None, StubModel(str(model_path)), cache=cache)
+    assert cache.misses == 6
+    get_sentiments(sentences, None, StubModel(str(model_path)), cache=cache, score_all_images=True)
+    assert cache.misses == 8
+    assert cache.hits == 2
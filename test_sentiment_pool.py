@@ -0,0 +1,48 @@
+import os
+
+from SentimentAnalysis import get_sentiments
+from SentimentPool import SentimentWorkerPool
+
+SENTENCES = ['😂 lol', 'ok 😢', '👍', 'no emoji here', '🎉🎉', '😀 not sad', '😭'] * 15
+
+
+def stub_loader():
+    # Emoji-only scoring, no model files needed
+    return None, None
+
+
+def check_pool(pool, chunk_size):
+    expected = get_sentiments(SENTENCES, None, None)
+    assert pool.get_sentiments(SENTENCES) == expected
+
+    stats = pool.stats()
+    assert all(pid != os.getpid() for pid in stats)
+    assert sum(s['chunks'] for s in stats.values()) == -(-len(SENTENCES) // chunk_size)
+    assert sum(s['sentences'] for s in stats.values()) == len(SENTENCES)
+    assert all(s['rss_bytes'] > 0 for s in stats.values())
+
+
+def test_forked_pool_keeps_order_and_chunks():
+    with SentimentWorkerPool(2, engine='numpy', loader=stub_loader, chunk_size=8) as pool:
+        check_pool(pool, 8)
+        assert pool.get_sentiments([]) == []
+
+
+def test_spawned_pool_loads_models_in_workers():
+    with SentimentWorkerPool(1, engine='keras', loader=stub_loader, chunk_size=50) as pool:
+        check_pool(pool, 50)
+
+
+def test_unknown_engine():
+    try:
+        SentimentWorkerPool(1, engine='torch', loader=stub_loader)
+        assert False, 'unknown engine accepted'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_forked_pool_keeps_order_and_chunks()
+    test_spawned_pool_loads_models_in_workers()
+    test_unknown_engine()
+    print('test_sentiment_pool passed')
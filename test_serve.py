@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import SentimentAnalysis
+from serve import MicroBatcher, handle_connection
+
+
+def stub_get_sentiments(batches):
+    def get_sentiments(sentences, image_model, text_model_ensemble):
+        batches.append(list(sentences))
+        return [float(len(sentence)) for sentence in sentences]
+    return get_sentiments
+
+
+async def exchange(raw_requests, max_batch_size=4, half_close=False):
+    """
+    Send raw HTTP requests to a server backed by a stub model
+    :param half_close: close the sending side after each request
+    :return: list of (status, payload) responses, list of scored batches
+    """
+    batches = []
+    original = SentimentAnalysis.get_sentiments
+    SentimentAnalysis.get_sentiments = stub_get_sentiments(batches)
+    batcher = MicroBatcher(max_batch_size=max_batch_size, max_wait=0.01)
+    batcher.models = (None, None)
+    batcher.ready = True
+    batching = asyncio.ensure_future(batcher.run())
+    server = await asyncio.start_server(lambda r, w: handle_connection(batcher, r, w), '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        responses = []
+        for raw_request in raw_requests:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(raw_request)
+            await writer.drain()
+            if half_close:
+                writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b'\r\n\r\n')
+            responses.append((int(head.split()[1]), json.loads(body.decode('utf-8'))))
+        return responses, batches
+    finally:
+        server.close()
+        batching.cancel()
+        batcher.executor.shutdown()
+        SentimentAnalysis.get_sentiments = original
+
+
+def post(payload, content_length=None):
+    body = json.dumps(payload).encode('utf-8')
+    if content_length is None:
+        content_length = str(len(body))
+    return ('POST /sentiment HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'
+            .format(content_length).encode('latin-1') + body)
+
+
+def test_invalid_content_length_is_rejected():
+    responses, batches = asyncio.run(exchange([post({'text': 'hi'}, 'abc'), post({'text': 'hi'}, '-5')]))
+    assert [status for status, _ in responses] == [400, 400]
+    assert batches == []
+
+
+def test_oversized_header_line_is_rejected():
+    oversized = ('POST /sentiment HTTP/1.1\r\nX-Padding: {}\r\nConnection: close\r\n\r\n'
+                 .format('a' * 100000).encode('latin-1'))
+    responses, batches = asyncio.run(exchange([oversized, post({'text': 'hi'})]))
+    assert [status for status, _ in responses] == [413, 200]
+    assert batches == [['hi']]
+
+
+def test_truncated_body_is_rejected():
+    truncated = post({'text': 'hello'}, '100')
+    responses, batches = asyncio.run(exchange([truncated], half_close=True))
+    assert responses == [(400, {'error': 'body shorter than Content-Length'})]
+    assert batches == []
+
+
+def test_large_request_is_split_into_batches():
+    texts = ['t' * i for i in range(10)]
+    responses, batches = asyncio.run(exchange([post({'texts': texts})], max_batch_size=4))
+    assert responses == [(200, {'scores': [float(i) for i in range(10)]})]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_single_text_request():
+    responses, batches = asyncio.run(exchange([post({'text': 'hello'})]))
+    assert responses == [(200, {'score': 5.0})]
+    assert batches == [['hello']]
+
+
+if __name__ == '__main__':
+    test_invalid_content_length_is_rejected()
+    test_oversized_header_line_is_rejected()
+    test_truncated_body_is_rejected()
+    test_large_request_is_split_into_batches()
+    test_single_text_request()
+    print('test_serve passed')
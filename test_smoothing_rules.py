@@ -0,0 +1,103 @@
+import random
+import re
+
+from SentimentAnalysis import _postprocess_smoothing
+from SmoothingRules import SmoothingRules, get_smoothing_rules
+
+
+def reference_flags(text, emojis):
+    # Per-message checks that the compiled rules replace
+    flags = set()
+    if emojis:
+        positive = set(list("😁😀😊🙂😃😄😆😎😍🤗👍🎉❤️💕💖✨🥳😺😸"))
+        if isinstance(emojis, str):
+            emojis = [emojis]
+        if any((e in positive) for e in emojis):
+            flags.add('positive_emoji')
+    if text:
+        if re.search(r"\b(sad|depressed|upset|miserable|unhappy|crying|devastated|heartbroken|awful|terrible|horrible)\b",
+                     text, re.IGNORECASE):
+            flags.add('sad_keywords')
+        if re.search(r"\bnot\s+(?:that\s+|so\s+|really\s+|very\s+|too\s+)?(sad|upset|depressed|angry|mad|unhappy|down|bad)",
+                     text, re.IGNORECASE):
+            flags.add('soft_negation')
+    return flags
+
+
+def reference_smoothing(score, flags):
+    if 'positive_emoji' in flags and 'sad_keywords' in flags and 'soft_negation' not in flags:
+        return 0.0
+    if -0.6 < score < -0.05 and 'soft_negation' in flags and 'positive_emoji' in flags:
+        return max(-1.0, min(1.0, (score * 0.4) + 0.1))
+    return score
+
+
+WORDS = ['i', 'am', 'not', 'so', 'really', 'that', 'sad', 'SAD', 'Sad', 'upset', 'down', 'downtown',
+         'bad', 'badly', 'terrible', 'terribleness', 'happy', 'crying', 'mad', 'not  very', ',', '!']
+EMOJIS = ['😀', '😍', '❤', '👍', '😢', '😭', '🐭', '✨']
+
+
+def random_messages(count, seed=0):
+    rng = random.Random(seed)
+    texts = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 8))) or None for _ in range(count)]
+    emojis_list = [[rng.choice(EMOJIS) for _ in range(rng.randint(0, 3))] or None for _ in range(count)]
+    return texts, emojis_list
+
+
+def test_flags_match_per_message_checks():
+    texts, emojis_list = random_messages(3000)
+    rules = get_smoothing_rules()
+    assert rules.match_batch(texts, emojis_list) == [reference_flags(t, e) for t, e in zip(texts, emojis_list)]
+
+
+def test_overlapping_matchers_are_all_flagged():
+    rules = get_smoothing_rules()
+    assert rules.match('not sad', ['😀']) == {'sad_keywords', 'soft_negation', 'positive_emoji'}
+    assert rules.match('NOT really upset at all', None) == {'sad_keywords', 'soft_negation'}
+    assert rules.match('', []) == set()
+    assert rules.match(None, '😀') == {'positive_emoji'}
+
+
+def test_emoji_variants_match_their_base_emoji():
+    rules = get_smoothing_rules()
+    assert rules.match(None, ['❤️']) == {'positive_emoji'}
+    assert rules.match(None, ['\U0001F44D\U0001F3FD']) == {'positive_emoji'}
+    assert rules.match(None, ['\U0001F622']) == set()
+
+
+def test_smoothing_matches_previous_rules():
+    texts, emojis_list = random_messages(3000, seed=1)
+    rng = random.Random(2)
+    scores = [rng.choice([None, -0.9, -0.6, -0.3, -0.05, 0.0, 0.4]) for _ in texts]
+    expected = [None if score is None else reference_smoothing(score, reference_flags(t, e))
+                for score, t, e in zip(scores, texts, emojis_list)]
+    assert _postprocess_smoothing(scores, texts, emojis_list) == expected
+    # Lazy evaluation gives the same scores as applying the rules to all flags
+    rules = get_smoothing_rules()
+    for score, text, emojis in zip(scores, texts, emojis_list):
+        if score is not None:
+            assert rules.smooth(score, text, emojis) == rules.apply(score, rules.match(text, emojis))
+
+
+def test_rules_are_loaded_from_data():
+    rules = SmoothingRules(
+        {'angry_emoji': {'emojis': ['\U0001F620']}, 'rage': {'words': ['furious'], 'ignore_case': True}},
+        [{'name': 'angry', 'when': ['angry_emoji', 'rage'], 'scale': 1.0, 'shift': -0.5}])
+    flags = rules.match('I am FURIOUS', ['\U0001F620'])
+    assert flags == {'angry_emoji', 'rage'}
+    assert rules.apply(-0.7, flags) == -1.0
+    assert rules.apply(-0.7, {'rage'}) == -0.7
+    try:
+        SmoothingRules({}, [{'name': 'broken', 'when': ['missing']}])
+        assert False, 'unknown matcher accepted'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_flags_match_per_message_checks()
+    test_overlapping_matchers_are_all_flagged()
+    test_emoji_variants_match_their_base_emoji()
+    test_smoothing_matches_previous_rules()
+    test_rules_are_loaded_from_data()
+    print('test_smoothing_rules passed')